@@ -0,0 +1,52 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+# Claims which UserTokenObtainPairSerializer adds to tokens.
+USER_CLAIMS = ('is_staff', 'is_active')
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user built from the claims of a token, without the users table.
+    """
+
+    @property
+    def is_active(self):
+        return self.token['is_active']
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication which doesn't load the user on every request.
+
+    Tokens of regular users carry `is_staff` and `is_active`, so a
+    ClaimsUser is built from them. The user is still loaded from the
+    database when:
+
+        - The token is of a staff user, so admin endpoints always see the
+          current permissions.
+        - The token lacks the claims, e.g. it was issued before them.
+
+    For regular users, a change of the user (deactivation, new password)
+    takes effect when their access token expires, after
+    ACCESS_TOKEN_LIFETIME : refresh tokens issued before the change are
+    rejected (see UserTokenRefreshSerializer).
+    """
+
+    def get_user(self, validated_token):
+
+        if self.needs_database(validated_token):
+            return super().get_user(validated_token)
+
+        return ClaimsUser(validated_token)
+
+    def needs_database(self, validated_token):
+
+        if api_settings.USER_ID_CLAIM not in validated_token or any(
+            claim not in validated_token for claim in USER_CLAIMS
+        ):
+            return True
+
+        return validated_token['is_staff'] or not validated_token['is_active']
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='tokens_valid_after',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Refresh tokens issued before this time are rejected. It is set when the staff status, the active status or the password changes.', null=True, verbose_name='tokens valid after'),
+        ),
+    ]
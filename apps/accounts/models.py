@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db.models import EmailField, BooleanField, DateTimeField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from apps.accounts.managers import UserManager
@@ -40,6 +41,17 @@ class User(AbstractBaseUser, PermissionsMixin):
         ),
     )
     date_joined = DateTimeField(_('date joined'), auto_now_add=True)
+    tokens_valid_after = DateTimeField(
+        _('tokens valid after'),
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_(
+            'Refresh tokens issued before this time are rejected. It is set '
+            'when the staff status, the active status or the password '
+            'changes.'
+        ),
+    )
 
     objects = UserManager()
 
@@ -50,6 +62,36 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = _('user')
         verbose_name_plural = _('users')
 
+    # Fields which tokens carry, or whose change should revoke tokens.
+    TOKEN_FIELDS = frozenset(('is_staff', 'is_active', 'password'))
+
+    def save(self, *args, **kwargs):
+
+        update_fields = kwargs.get('update_fields')
+
+        if not self._state.adding and (
+            update_fields is None or
+            self.TOKEN_FIELDS.intersection(update_fields)
+        ) and self._token_fields_changed():
+
+            self.tokens_valid_after = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'tokens_valid_after',
+                }
+
+        super().save(*args, **kwargs)
+
+    def _token_fields_changed(self):
+
+        saved = self.__class__.objects.filter(pk=self.pk).values(
+            *self.TOKEN_FIELDS,
+        ).first()
+
+        return saved is not None and any(
+            getattr(self, name) != value for name, value in saved.items()
+        )
+
     def clean(self):
         super().clean()
         self.email = self.__class__.objects.normalize_email(self.email)
@@ -8,10 +8,20 @@ from rest_framework.serializers import (
     ValidationError,
 )
 
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from config.profiling import ProfiledSerializerMixin
+
 User = get_user_model()
 
 
-class UserSerializer(ModelSerializer):
+class UserSerializer(ProfiledSerializerMixin, ModelSerializer):
 
     confirm_password = CharField(write_only=True)
 
@@ -32,3 +42,52 @@ class UserSerializer(ModelSerializer):
     def create(self, validated_data):
         del validated_data['confirm_password']
         return User.objects.create_user(**validated_data)
+
+
+class UserTokenObtainPairSerializer(
+    ProfiledSerializerMixin,
+    TokenObtainPairSerializer,
+):
+    """
+    Tokens carry the claims which StatelessJWTAuthentication needs to
+    build the user without the database.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+
+        token = super().get_token(user)
+        token['is_staff'] = user.is_staff
+        token['is_active'] = user.is_active
+
+        return token
+
+
+class UserTokenRefreshSerializer(
+    ProfiledSerializerMixin,
+    TokenRefreshSerializer,
+):
+    """
+    Refresh tokens are only honored while their user exists, is active, and
+    hasn't changed since they were issued (see User.tokens_valid_after).
+    It's checked in the database, so a user deactivated by any process, or
+    by QuerySet.update, gets no new access token.
+    """
+
+    def validate(self, attrs):
+
+        refresh = self.token_class(attrs['refresh'])
+
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).values('is_active', 'tokens_valid_after').first()
+
+        # Tokens issued in the second of the change (iat is in seconds) are
+        # still valid, so the login right after a new password is.
+        if user is None or not user['is_active'] or (
+            user['tokens_valid_after'] is not None and
+            refresh['iat'] < int(user['tokens_valid_after'].timestamp())
+        ):
+            raise InvalidToken(_('Token is no longer valid for this user.'))
+
+        return super().validate(attrs)
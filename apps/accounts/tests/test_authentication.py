@@ -0,0 +1,161 @@
+from time import time
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase, APIRequestFactory
+
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.authentication import (
+    ClaimsUser,
+    StatelessJWTAuthentication,
+)
+from apps.accounts.serializers import (
+    UserTokenObtainPairSerializer,
+    UserTokenRefreshSerializer,
+)
+
+User = get_user_model()
+
+
+class TestStatelessJWTAuthentication(APITestCase):
+
+    def setUp(self):
+
+        self.factory = APIRequestFactory()
+        self.authentication = StatelessJWTAuthentication()
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+
+    def authenticate(self, token):
+
+        request = self.factory.get(
+            '/',
+            HTTP_AUTHORIZATION='Bearer {}'.format(token),
+        )
+        user, validated_token = self.authentication.authenticate(request)
+
+        return user
+
+    def obtain(self, user):
+        return UserTokenObtainPairSerializer.get_token(user).access_token
+
+    def test_claims(self):
+
+        token = self.obtain(self.user)
+
+        self.assertIs(token['is_staff'], False)
+        self.assertIs(token['is_active'], True)
+
+    def test_authenticate(self):
+
+        token = self.obtain(self.user)
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.is_staff)
+        self.assertTrue(user.is_authenticated)
+
+    def test_authenticate_staff(self):
+        """
+        This method checks if staff users are loaded from the database.
+        """
+
+        self.user.is_staff = True
+        self.user.save()
+        token = self.obtain(self.user)
+
+        with self.assertNumQueries(1):
+            user = self.authenticate(token)
+
+        self.assertIsInstance(user, User)
+
+    def test_authenticate_without_claims(self):
+        """
+        This method checks if tokens without the claims are resolved from
+        the database.
+        """
+
+        with self.assertNumQueries(1):
+            user = self.authenticate(AccessToken.for_user(self.user))
+
+        self.assertIsInstance(user, User)
+
+
+class TestUserTokenRefreshSerializer(APITestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+        self.refresh = UserTokenObtainPairSerializer.get_token(self.user)
+        # Issued before anything the tests change.
+        self.refresh['iat'] = int(time()) - 10
+
+    def validate(self):
+
+        serializer = UserTokenRefreshSerializer(
+            data={'refresh': str(self.refresh)},
+        )
+        serializer.is_valid(raise_exception=True)
+
+        return serializer.validated_data
+
+    def test_refresh(self):
+
+        access = AccessToken(self.validate()['access'])
+
+        self.assertEqual(access['user_id'], self.user.pk)
+        self.assertIs(access['is_active'], True)
+
+    def test_refresh_changed_user(self):
+        """
+        This method checks if refresh tokens issued before a new password
+        are rejected.
+        """
+
+        self.user.set_password('admin12345WW!!')
+        self.user.save()
+
+        self.assertIsNotNone(self.user.tokens_valid_after)
+        with self.assertRaises(InvalidToken):
+            self.validate()
+
+    def test_refresh_deactivated_user(self):
+        """
+        This method checks if refresh tokens of a user deactivated with
+        QuerySet.update, which doesn't call save, are rejected.
+        """
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(InvalidToken):
+            self.validate()
+
+    def test_refresh_deleted_user(self):
+        """
+        This method checks if refresh tokens of a deleted user are rejected.
+        """
+
+        self.user.delete()
+
+        with self.assertRaises(InvalidToken):
+            self.validate()
+
+    def test_refresh_unrelated_change(self):
+
+        self.user.save(update_fields=('last_login',))
+        self.user.save()
+
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.tokens_valid_after)
+        self.assertIn('access', self.validate())
@@ -1,7 +1,138 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from apps.match.models import Match, MatchSeatInfo
+from apps.match.models import (
+    Match,
+    MatchInventory,
+    MatchSeatInfo,
+    PriceTier,
+    IdempotencyKey,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator which doesn't COUNT(*) a whole large table.
+
+    Without filters, the count is estimated from the table : the planner's
+    row estimate on PostgreSQL, the range of primary keys elsewhere (two
+    index lookups; deleted rows are still counted). With filters, rows are
+    counted exactly, but only up to MAX_COUNT, so a filter which matches
+    most of the table still costs a bounded scan; pages after that many
+    rows aren't listed.
+    """
+
+    MAX_COUNT = 100_000
+
+    @cached_property
+    def count(self):
+
+        queryset = self.object_list
+
+        if queryset.query.where:
+            return queryset.order_by()[:self.MAX_COUNT].count()
+
+        return self.estimate(queryset)
+
+    @staticmethod
+    def estimate(queryset):
+
+        model = queryset.model
+        connection = connections[queryset.db]
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class '
+                    'WHERE oid = %s::regclass',
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 until the table has been analyzed.
+            if row and row[0] >= 0:
+                return row[0]
+
+        pks = model._default_manager.using(queryset.db).order_by(
+            'pk',
+        ).values_list('pk', flat=True)
+        first, last = pks.first(), pks.last()
+
+        if first is None:
+            return 0
+
+        return last - first + 1
+
+
+class MatchListFilter(admin.SimpleListFilter):
+    """
+    Matches with their teams from a single query, latest first, instead of
+    a query per match for its name. Filtering by match uses the indexes
+    which start with the match.
+    """
+
+    title = _('match')
+    parameter_name = 'match'
+
+    def lookups(self, request, model_admin):
+
+        matches = Match.objects.select_related(
+            'host_team',
+            'guest_team',
+        ).only(
+            'datetime',
+            'host_team__name',
+            'guest_team__name',
+        ).order_by('-datetime', '-pk')
+
+        return [
+            (
+                match.pk,
+                f'{match.host_team.name} - {match.guest_team.name} '
+                f'({match.datetime:%d %b %Y})',
+            )
+            for match in matches
+        ]
+
+    def queryset(self, request, queryset):
+
+        if self.value() is not None:
+            return queryset.filter(match_id=self.value())
+
+        return queryset
+
+
+class SeatStateListFilter(admin.SimpleListFilter):
+    """
+    State of the seats, as counted by MatchInventory. Each state has a
+    partial index, so a filter never walks over seats of other states.
+    """
+
+    title = _('state')
+    parameter_name = 'state'
+
+    STATES = {
+        'available': {'is_reserved': False},
+        'held': {'is_reserved': True, 'is_paid': False},
+        'sold': {'is_paid': True},
+    }
+
+    def lookups(self, request, model_admin):
+
+        return (
+            ('available', _('Available')),
+            ('held', _('Held')),
+            ('sold', _('Sold')),
+        )
+
+    def queryset(self, request, queryset):
+
+        if self.value() in self.STATES:
+            return queryset.filter(**self.STATES[self.value()])
+
+        return queryset
 
 
 @admin.register(Match)
@@ -9,11 +140,66 @@ class MatchAdmin(admin.ModelAdmin):
 
     list_display = ('host_team', 'guest_team', 'stadium', 'datetime')
     list_filter = ('stadium',)
+    list_select_related = ('host_team', 'guest_team', 'stadium')
 
 
 @admin.register(MatchSeatInfo)
 class MatchSeatInfoAdmin(admin.ModelAdmin):
+    """
+    The table holds every seat of every match, tens of millions of rows in
+    a season, so the changelist must cost the same whatever its size :
+    related objects are joined in the page query, foreign keys are edited
+    by id instead of select boxes of every row, the count is estimated
+    (see EstimatedCountPaginator) and filters are served by indexes.
+    """
 
     list_display = (
         'match', 'seat', 'price', 'is_reserved', 'is_paid', 'buyer'
     )
+    list_select_related = (
+        'tier',
+        'match__host_team',
+        'match__guest_team',
+        'seat__stadium',
+        'buyer',
+    )
+    list_filter = (MatchListFilter, SeatStateListFilter)
+    raw_id_fields = ('match', 'seat', 'tier', 'buyer')
+    # The order of the indexes starting with (match, seat), so a page is
+    # read in index order instead of sorting every row which matches.
+    ordering = ('-match_id', '-seat_id')
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def delete_queryset(self, request, queryset):
+        """
+        delete_selected deletes the rows at once, without
+        MatchSeatInfo.delete, so the counters, availability bitmaps and
+        seat maps of their matches are brought up to date here.
+        """
+
+        using = queryset.db
+
+        with transaction.atomic(using=using):
+            match_ids = set(
+                queryset.order_by().values_list('match_id', flat=True)
+            )
+            queryset.delete()
+            MatchSeatInfo.objects.using(using).seats_changed(match_ids)
+            MatchInventory.objects.using(using).reconcile(match_ids)
+
+
+@admin.register(PriceTier)
+class PriceTierAdmin(admin.ModelAdmin):
+
+    list_display = ('match', 'price')
+    list_select_related = ('match__host_team', 'match__guest_team')
+    raw_id_fields = ('match',)
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+
+    list_display = ('key', 'user', 'status_code', 'date_created')
+    raw_id_fields = ('user',)
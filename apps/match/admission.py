@@ -0,0 +1,331 @@
+import os
+import shlex
+import sys
+from abc import ABC, abstractmethod
+from argparse import ArgumentParser
+from collections import deque
+from functools import lru_cache
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+HEADER = 'X-Queue-Ticket'
+
+TICKET_SALT = 'apps.match.admission'
+
+
+def is_enabled():
+    return settings.MATCH_ADMISSION['ENABLED']
+
+
+def worker_processes():
+    """
+    Number of gunicorn worker processes, as gunicorn reads it : from
+    -w/--workers of its command line, then of GUNICORN_CMD_ARGS, then
+    WEB_CONCURRENCY. It's 1 outside gunicorn.
+    """
+
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument('-w', '--workers', type=int)
+
+    arguments = shlex.split(os.environ.get('GUNICORN_CMD_ARGS', ''))
+    if os.path.basename(sys.argv[0]) == 'gunicorn':
+        arguments += sys.argv[1:]
+
+    workers, _ = parser.parse_known_args(arguments)
+
+    return workers.workers or int(os.environ.get('WEB_CONCURRENCY', 1))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """
+    Return the backend of MATCH_ADMISSION setting, one per process.
+
+    A backend whose state isn't shared between processes is refused when
+    there are several worker processes : each would admit its own users.
+    """
+
+    admission = settings.MATCH_ADMISSION
+    backend = import_string(admission['BACKEND'])
+    options = admission.get('OPTIONS', {})
+
+    processes = worker_processes()
+    if not backend.shared and processes > 1:
+        raise ImproperlyConfigured(
+            f'{admission["BACKEND"]} keeps queues in one process, but '
+            f'{processes} worker processes are configured. Run a single '
+            f'worker or use a shared backend for MATCH_ADMISSION.'
+        )
+
+    return backend(**{name.lower(): value for name, value in options.items()})
+
+
+def make_ticket(match_id, user_id):
+    """
+    Sign a queue ticket. It lets its owner check the queue without being
+    authenticated, so polling the queue never hits the users table.
+    """
+
+    return signing.dumps(
+        {'match': match_id, 'user': user_id},
+        salt=TICKET_SALT,
+    )
+
+
+def read_ticket(ticket, match_id):
+    """
+    Return the user id of a valid ticket for the match, or None.
+    """
+
+    if not ticket:
+        return None
+
+    try:
+        data = signing.loads(
+            ticket,
+            salt=TICKET_SALT,
+            max_age=settings.MATCH_ADMISSION['TICKET_MAX_AGE'],
+        )
+    except signing.BadSignature:
+        return None
+
+    if data.get('match') != match_id:
+        return None
+
+    return data.get('user')
+
+
+class AdmissionBackend(ABC):
+    """
+    Admission control for the reservation endpoint, keyed by match.
+
+    Users join the queue of a match and are admitted in order, while at most
+    `active_shoppers` users per match are admitted at the same time. The
+    limit adapts to the commit latency of reservations : it shrinks when
+    commits are slower than `target_commit_latency` seconds and grows back
+    slowly when they aren't (additive increase, multiplicative decrease).
+
+    `shared` tells if the queues are shared by every process of the site.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        active_shoppers,
+        min_active_shoppers,
+        max_active_shoppers,
+        session_ttl,
+        target_commit_latency,
+    ):
+        self.active_shoppers = active_shoppers
+        self.min_active_shoppers = min_active_shoppers
+        self.max_active_shoppers = max_active_shoppers
+        self.session_ttl = session_ttl
+        self.target_commit_latency = target_commit_latency
+
+    @abstractmethod
+    def join(self, match_id, user_id):
+        """
+        Put the user in the queue of the match, if not already there.
+        Return the status of the user, like `status`.
+        """
+
+    @abstractmethod
+    def status(self, match_id, user_id):
+        """
+        Return a dict with `admitted`, `position` (0 once admitted) and
+        `estimated_wait` in seconds.
+        """
+
+    @abstractmethod
+    def is_admitted(self, match_id, user_id):
+        """
+        Whether the user may reserve seats now. It also marks the user as
+        still shopping.
+        """
+
+    @abstractmethod
+    def leave(self, match_id, user_id):
+        """
+        Free the place of the user, e.g. after checkout.
+        """
+
+    @abstractmethod
+    def record_commit(self, match_id, seconds):
+        """
+        Feed the duration of a reservation transaction to the pacing.
+        """
+
+
+class _Queue:
+
+    __slots__ = (
+        'limit', 'latency', 'session', 'waiting', 'sequences', 'active',
+        'next_sequence',
+    )
+
+    def __init__(self, limit, session):
+
+        self.limit = float(limit)
+        self.latency = 0.0
+        # Average seconds a shopper stays admitted; used to estimate waits.
+        self.session = float(session)
+        # (sequence, user id) in the order of joining; entries of users who
+        # left the queue are skipped lazily.
+        self.waiting = deque()
+        self.sequences = {}
+        # user id -> (admitted at, last seen)
+        self.active = {}
+        self.next_sequence = 0
+
+
+class InMemoryAdmissionBackend(AdmissionBackend):
+    """
+    Queues kept in the memory of the process.
+
+    Every state change is O(1) and position estimates never leave memory.
+    The state isn't shared, so with several worker processes each of them
+    would admit its own `active_shoppers`; it's meant for a single process
+    and for local tests, and get_backend refuses it otherwise. A shared
+    backend implements the same interface.
+    """
+
+    shared = False
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self._queues = {}
+        self._lock = Lock()
+
+    def _queue(self, match_id):
+
+        queue = self._queues.get(match_id)
+
+        if queue is None:
+            queue = self._queues[match_id] = _Queue(
+                self.active_shoppers,
+                self.session_ttl / 2,
+            )
+
+        return queue
+
+    def _advance(self, queue, now):
+        """
+        Drop idle shoppers, then admit waiting users while there's room.
+        """
+
+        for user_id, (admitted_at, last_seen) in list(queue.active.items()):
+            if now - last_seen > self.session_ttl:
+                del queue.active[user_id]
+
+        while queue.waiting and len(queue.active) < int(queue.limit):
+
+            sequence, user_id = queue.waiting.popleft()
+
+            if queue.sequences.get(user_id) == sequence:
+                del queue.sequences[user_id]
+                queue.active[user_id] = (now, now)
+
+    def _status(self, queue, user_id):
+
+        if user_id in queue.active:
+            return {'admitted': True, 'position': 0, 'estimated_wait': 0}
+
+        sequence = queue.sequences.get(user_id)
+
+        if sequence is None:
+            return {'admitted': False, 'position': None, 'estimated_wait': None}
+
+        # Users who left in between are still counted, so it's an estimate.
+        position = sequence - queue.waiting[0][0] + 1
+        turns = position / max(int(queue.limit), 1)
+
+        return {
+            'admitted': False,
+            'position': position,
+            'estimated_wait': round(turns * queue.session),
+        }
+
+    def join(self, match_id, user_id):
+
+        now = monotonic()
+
+        with self._lock:
+
+            queue = self._queue(match_id)
+
+            if user_id not in queue.active and user_id not in queue.sequences:
+                queue.sequences[user_id] = queue.next_sequence
+                queue.waiting.append((queue.next_sequence, user_id))
+                queue.next_sequence += 1
+
+            self._advance(queue, now)
+
+            return self._status(queue, user_id)
+
+    def status(self, match_id, user_id):
+
+        with self._lock:
+
+            queue = self._queue(match_id)
+            self._advance(queue, monotonic())
+
+            return self._status(queue, user_id)
+
+    def is_admitted(self, match_id, user_id):
+
+        now = monotonic()
+
+        with self._lock:
+
+            queue = self._queue(match_id)
+            self._advance(queue, now)
+
+            if user_id not in queue.active:
+                return False
+
+            admitted_at, last_seen = queue.active[user_id]
+            queue.active[user_id] = (admitted_at, now)
+
+            return True
+
+    def leave(self, match_id, user_id):
+
+        now = monotonic()
+
+        with self._lock:
+
+            queue = self._queue(match_id)
+            queue.sequences.pop(user_id, None)
+            admitted = queue.active.pop(user_id, None)
+
+            if admitted is not None:
+                queue.session = 0.9 * queue.session + 0.1 * (now - admitted[0])
+
+            self._advance(queue, now)
+
+    def record_commit(self, match_id, seconds):
+
+        with self._lock:
+
+            queue = self._queue(match_id)
+            queue.latency = 0.9 * queue.latency + 0.1 * seconds
+
+            if queue.latency > self.target_commit_latency:
+                queue.limit = max(
+                    float(self.min_active_shoppers),
+                    queue.limit * 0.9,
+                )
+            else:
+                queue.limit = min(
+                    float(self.max_active_shoppers),
+                    queue.limit + 1 / queue.limit,
+                )
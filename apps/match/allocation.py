@@ -0,0 +1,354 @@
+from array import array
+from collections import OrderedDict
+from itertools import chain, islice
+from random import choice
+from threading import Lock
+from time import monotonic
+
+from django.apps import apps
+from django.conf import settings
+
+from apps.match.availability import (
+    encode_runs,
+    encode_seat_ranges,
+    seat_availability,
+)
+
+
+class SeatRow:
+    """
+    Seats of a match in one row of a section, ordered by their number.
+
+    `indexes` are positions of the seats in the sorted seat ids of the
+    layout. Seats without a row or a number are kept in one row per section
+    whose `numbers` is None; nothing is contiguous there.
+    """
+
+    __slots__ = ('section', 'row', 'numbers', 'indexes', 'tiers', 'center')
+
+    def __init__(self, section, row, seats):
+        """
+        `seats` are (number, index, tier_id) tuples.
+        """
+
+        self.section = section
+        self.row = row
+
+        seats.sort(key=lambda seat: (seat[0] is None, seat[0] or 0))
+        numbers, self.indexes, self.tiers = (
+            list(field) for field in zip(*seats)
+        )
+
+        if row is None:
+            self.numbers = None
+            self.center = 0
+        else:
+            self.numbers = numbers
+            self.center = (numbers[0] + numbers[-1]) / 2
+
+    def blocks(self, quantity, tier, is_free):
+        """
+        Yield (distance, start) of blocks of `quantity` free, consecutive
+        seats which don't overlap : in each long enough run of free seats,
+        the block closest to the middle of the row and the ones next to it.
+
+        `start` is the position of the first seat of the block in the row,
+        and `distance` is how far the middle of the block is from the
+        middle of the row : the closer, the better the view.
+        """
+
+        indexes, tiers, numbers = self.indexes, self.tiers, self.numbers
+        length = len(indexes)
+
+        def usable(position):
+            return (
+                (tier is None or tiers[position] == tier) and
+                is_free(indexes[position])
+            )
+
+        if numbers is None:
+            if quantity == 1:
+                for position in range(length):
+                    if usable(position):
+                        yield 0, position
+            return
+
+        position = 0
+        while position < length:
+
+            if not usable(position):
+                position += 1
+                continue
+
+            end = position
+            while (
+                end + 1 < length and
+                numbers[end + 1] == numbers[end] + 1 and
+                usable(end + 1)
+            ):
+                end += 1
+
+            if end - position + 1 >= quantity:
+                # The start whose block is centered on the row, moved back
+                # into the run when the run doesn't reach that far.
+                offset = (quantity - 1) / 2
+                start = (
+                    position + round(self.center - offset) - numbers[position]
+                )
+                last = end - quantity + 1
+                best = max(position, min(start, last))
+
+                for start in chain(
+                    range(best, last + 1, quantity),
+                    range(best - quantity, position - 1, -quantity),
+                ):
+                    yield abs(numbers[start] + offset - self.center), start
+
+            position = end + 1
+
+
+class SeatLayout:
+    """
+    Rows of seats of a match, best rows first, i.e. by row number and then
+    by section. Seat ids are sorted like in the availability bitmap, so an
+    index in them is the ordinal of the seat in a bitmap with same seats.
+
+    `tier_ids` has the tier of each seat in the same order, and `tier_runs`
+    the same run-length encoded.
+    """
+
+    def __init__(self, rows, epoch):
+        """
+        `rows` are (seat_id, code, section, row, number, tier_id) tuples,
+        ordered by seat_id.
+        """
+
+        self.seat_ids = []
+        self.codes = []
+        self.tier_ids = array('q')
+        self.epoch = epoch
+        self.built_at = monotonic()
+
+        grouped = {}
+
+        for index, seat in enumerate(rows):
+
+            seat_id, code, section, row, number, tier_id = seat
+            self.seat_ids.append(seat_id)
+            self.codes.append(code)
+            self.tier_ids.append(tier_id)
+
+            if row is None or number is None:
+                row = number = None
+
+            grouped.setdefault((section, row), []).append(
+                (number, index, tier_id),
+            )
+
+        self.seat_ranges = encode_seat_ranges(self.seat_ids)
+        self.tier_runs = encode_runs(self.tier_ids)
+
+        self.rows = sorted(
+            (
+                SeatRow(section, row, seats)
+                for (section, row), seats in grouped.items()
+            ),
+            key=lambda seat_row: (
+                seat_row.row is None,
+                seat_row.row or 0,
+                seat_row.section,
+            ),
+        )
+
+    def bind(self, bitmap):
+        """
+        Return a function telling if the seat at an index is free in the
+        bitmap. The ordinals are only looked up when the bitmap and the
+        layout were built from different seats. Nothing is kept on the
+        layout, which threads share.
+        """
+
+        if bitmap.seat_ranges() == self.seat_ranges:
+            return bitmap.is_free
+
+        ordinals = [bitmap.ordinal(seat_id) for seat_id in self.seat_ids]
+
+        def is_free(index):
+            ordinal = ordinals[index]
+            return ordinal is not None and bitmap.is_free(ordinal)
+
+        return is_free
+
+    def find(self, bitmap, quantity, tier=None, section=None, spread=1):
+        """
+        Return the seats of a block of `quantity` free, contiguous seats,
+        as a list of (seat_id, code, section, row, number), or None.
+
+        The best `spread` blocks are found, rows in order and the most
+        central blocks of a row first, and one of them is picked at random,
+        so concurrent buyers don't all race for the very same seats. With
+        the default `spread` of 1, the best block is always returned.
+        """
+
+        is_free = self.bind(bitmap)
+        candidates = []
+
+        for seat_row in self.rows:
+
+            if section is not None and seat_row.section != section:
+                continue
+
+            blocks = seat_row.blocks(quantity, tier, is_free)
+            if seat_row.numbers is None:
+                # Every free seat is a block there, all equally good.
+                blocks = islice(blocks, spread)
+
+            blocks = sorted(blocks)[:spread - len(candidates)]
+            candidates += ((seat_row, start) for _, start in blocks)
+
+            if len(candidates) >= spread:
+                break
+
+        if not candidates:
+            return None
+
+        seat_row, start = choice(candidates)
+        numbers = seat_row.numbers or [None] * len(seat_row.indexes)
+
+        return [
+            (
+                self.seat_ids[index],
+                self.codes[index],
+                seat_row.section,
+                seat_row.row,
+                number,
+            )
+            for index, number in zip(
+                seat_row.indexes[start:start + quantity],
+                numbers[start:start + quantity],
+            )
+        ]
+
+
+class SeatAllocator:
+    """
+    Picks and holds the best available seats of matches.
+
+    Layouts of matches are kept in the memory of the process, next to their
+    availability bitmaps. Which seats are free comes from the bitmap, so a
+    search costs no query at all; the hold is made with
+    MatchSeatInfoQuerySet.reserve, so the database still decides. When
+    another buyer won some of the seats in the meantime, the bitmap learns
+    it from the reservation and the search is made again.
+
+    A layout is rebuilt when the bitmap epoch of the match moves (seats
+    defined, repriced or freed), or after MATCH_SEAT_LAYOUT_MAX_AGE seconds.
+    Like bitmaps, layouts are only kept for the
+    MATCH_SEAT_AVAILABILITY_MAX_MATCHES matches used last.
+    """
+
+    # Number of best blocks which a block is picked from at random.
+    SPREAD = 8
+
+    # Searches made before giving up when blocks are lost to other buyers.
+    ATTEMPTS = 3
+
+    def __init__(self):
+
+        self._layouts = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _is_fresh(layout, bitmap):
+
+        return (
+            layout is not None and
+            layout.epoch == bitmap.epoch and
+            monotonic() - layout.built_at < settings.MATCH_SEAT_LAYOUT_MAX_AGE
+        )
+
+    def get(self, match_id, bitmap):
+
+        layout = self._layouts.get(match_id)
+
+        if self._is_fresh(layout, bitmap):
+            try:
+                self._layouts.move_to_end(match_id)
+            except KeyError:
+                # Evicted by another thread in the meantime.
+                pass
+            return layout
+
+        with self._lock:
+
+            # Another thread may have built it while this one waited.
+            layout = self._layouts.get(match_id)
+            if self._is_fresh(layout, bitmap):
+                return layout
+
+            match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+            rows = match_seat_info.objects.filter(
+                match_id=match_id,
+            ).order_by('seat_id').values_list(
+                'seat_id',
+                'seat__code',
+                'seat__section',
+                'seat__row',
+                'seat__number',
+                'tier_id',
+            )
+
+            layout = self._layouts[match_id] = SeatLayout(rows, bitmap.epoch)
+            self._layouts.move_to_end(match_id)
+            while (
+                len(self._layouts) >
+                settings.MATCH_SEAT_AVAILABILITY_MAX_MATCHES
+            ):
+                self._layouts.popitem(last=False)
+
+        return layout
+
+    def hold(self, match_id, quantity, buyer_id, now, tier=None, section=None):
+        """
+        Reserve the best block of `quantity` contiguous seats of a match for
+        the buyer, optionally of a price tier and in a section.
+
+        Returns the reserved seats as a list of
+        (seat_id, code, section, row, number), or None if no block is free.
+        """
+
+        match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+
+        for _ in range(self.ATTEMPTS):
+
+            bitmap = seat_availability.get(match_id)
+            seats = self.get(match_id, bitmap).find(
+                bitmap,
+                quantity,
+                tier=tier,
+                section=section,
+                spread=self.SPREAD,
+            )
+
+            if seats is None:
+                return None
+
+            undefined, lost = match_seat_info.objects.reserve(
+                match_id=match_id,
+                seats=[seat[0] for seat in seats],
+                buyer_id=buyer_id,
+                now=now,
+            )
+
+            if not undefined and not lost:
+                return seats
+
+            if undefined:
+                # Seats were removed from the match after the bitmap was
+                # built, which doesn't invalidate it.
+                seat_availability.invalidate((match_id,))
+
+        return None
+
+
+seat_allocator = SeatAllocator()
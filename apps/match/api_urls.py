@@ -2,15 +2,23 @@ from django.urls import path
 
 from apps.match.api_views import (
     MatchCreateAPIView,
+    MatchListAPIView,
     MatchSeatInfoCreateAPIView,
     ListCreateMatchSeatInfoAPIView,
     ListUpdateMatchSeatInfoAPIView,
+    BestAvailableSeatsAPIView,
+    ListCheckoutMatchSeatInfoAPIView,
+    MatchSeatMapAPIView,
+    MatchInventoryAPIView,
+    MatchQueueAPIView,
+    MatchQueueStatusAPIView,
 )
 
 
 api_urls = [
 
     path('', MatchCreateAPIView.as_view(), name='api_create_match'),
+    path('match_list/', MatchListAPIView.as_view(), name='api_list_match'),
     path(
         'match_seat/',
         MatchSeatInfoCreateAPIView.as_view(),
@@ -26,4 +34,34 @@ api_urls = [
         ListUpdateMatchSeatInfoAPIView.as_view(),
         name='api_update_list_match_seat'
     ),
+    path(
+        'match_seat_best_available/<int:match_id>/',
+        BestAvailableSeatsAPIView.as_view(),
+        name='api_best_available_match_seat'
+    ),
+    path(
+        'match_seat_list_checkout/<int:match_id>/',
+        ListCheckoutMatchSeatInfoAPIView.as_view(),
+        name='api_checkout_list_match_seat'
+    ),
+    path(
+        'match_seat_map/<int:match_id>/',
+        MatchSeatMapAPIView.as_view(),
+        name='api_match_seat_map'
+    ),
+    path(
+        'match_inventory/<int:match_id>/',
+        MatchInventoryAPIView.as_view(),
+        name='api_match_inventory'
+    ),
+    path(
+        'match_queue/<int:match_id>/',
+        MatchQueueAPIView.as_view(),
+        name='api_join_match_queue'
+    ),
+    path(
+        'match_queue/<int:match_id>/status/',
+        MatchQueueStatusAPIView.as_view(),
+        name='api_match_queue_status'
+    ),
 ]
@@ -1,23 +1,39 @@
+from time import perf_counter
+
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.utils import timezone
+from django.utils.http import parse_etags
+from django.db.models import Q
 
 from rest_framework.views import APIView, Response
 from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.status import (
 
+    HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_202_ACCEPTED,
+    HTTP_304_NOT_MODIFIED,
     HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
 )
 
-from apps.match.models import Match, MatchSeatInfo
+from apps.match import admission
+from apps.match.allocation import seat_allocator
+from apps.match.models import Match, MatchInventory, MatchSeatInfo
+from apps.match.seat_map import seat_maps
+from apps.match.idempotency import idempotent
+from apps.match.permissions import IsAdmitted
 from apps.match.serializers import (
     MatchSerializer,
+    MatchListSerializer,
+    MatchListQuerySerializer,
     MatchSeatInfoSerializer,
     ListCreateMatchSeatInfoSerializer,
     ListUpdateMatchSeatInfoSerializer,
+    BestAvailableSeatsSerializer,
 )
 
 
@@ -33,6 +49,73 @@ class MatchCreateAPIView(CreateAPIView):
     serializer_class = MatchSerializer
 
 
+class MatchListAPIView(APIView):
+    """
+    List matches, latest first, optionally between two datetimes, in a
+    stadium or of a team.
+    Permission : Everyone has access.
+    Returns : A page of matches, and `next`, the cursor of the next page
+    (null on the last page). Pass it back as `cursor` query parameter.
+    Note : Pages are found by (datetime, id) of the last match instead of
+    an offset, and a page costs two queries whatever its size : the matches
+    with their stadium and teams, and their seat counters.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    serializer_class = MatchListQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+
+        srz_data = self.serializer_class(data=request.query_params)
+
+        if not srz_data.is_valid():
+            return Response(data=srz_data.errors, status=HTTP_400_BAD_REQUEST)
+
+        params = srz_data.validated_data
+        matches = Match.objects.listing()
+
+        if 'date_from' in params:
+            matches = matches.filter(datetime__gte=params['date_from'])
+        if 'date_to' in params:
+            matches = matches.filter(datetime__lte=params['date_to'])
+        if 'stadium' in params:
+            matches = matches.filter(stadium_id=params['stadium'])
+        if 'team' in params:
+            matches = matches.filter(
+                Q(host_team_id=params['team']) |
+                Q(guest_team_id=params['team'])
+            )
+        if 'cursor' in params:
+            matches = matches.after(*params['cursor'])
+
+        page_size = params['page_size']
+        # One more match than the page tells if there's a next page.
+        matches = list(matches[:page_size + 1])
+        next_cursor = None
+
+        if len(matches) > page_size:
+            matches = matches[:page_size]
+            next_cursor = self.serializer_class.cursor_of(matches[-1])
+
+        inventory = MatchInventory.objects.counts(
+            [match.pk for match in matches],
+        )
+
+        return Response(
+            data={
+                'results': MatchListSerializer(
+                    matches,
+                    many=True,
+                    context={'inventory': inventory},
+                ).data,
+                'next': next_cursor,
+            },
+            status=HTTP_200_OK,
+        )
+
+
 class MatchSeatInfoCreateAPIView(CreateAPIView):
     """
     Define a new seat for a match with given price.
@@ -48,6 +131,10 @@ class MatchSeatInfoCreateAPIView(CreateAPIView):
 class ListCreateMatchSeatInfoAPIView(APIView):
     """
     Define several seats for a match with given price.
+    Seats are given by their ids, or as all seats of a section or of the
+    whole stadium, which are defined by a single INSERT ... SELECT.
+    Seats which are already defined for the match are left as they are;
+    given by their ids, they are returned as `existing_seats`.
     Permission : Only admin users have access.
     """
 
@@ -64,24 +151,57 @@ class ListCreateMatchSeatInfoAPIView(APIView):
             vd = srz_data.validated_data
             match = vd['match']
             price = vd['price']
-            seats = vd['seats']
-            seats_number = len(seats)
 
-            MatchSeatInfo.objects.bulk_create(
-                [
-                    MatchSeatInfo(match=match, seat_id=seat, price=price)
-                    for seat in seats
-                ]
-            )
-
-            message = _(
+            data = {}
+
+            if 'seats' in vd:
+
+                seats = vd['seats']
+                existing, foreign = MatchSeatInfo.objects.define_seats(
+                    match,
+                    price,
+                    seats,
+                )
+
+                if foreign:
+                    return Response(
+                        data={
+                            'message': _(
+                                'Stadium of this match, does not have these '
+                                'seats.'
+                            ),
+                            'seats': foreign,
+                        },
+                        status=HTTP_400_BAD_REQUEST,
+                    )
+
+                seats_number = len(seats) - len(existing)
+                data['existing_seats'] = existing
+
+            else:
+
+                seats_number = MatchSeatInfo.objects.define_stadium_seats(
+                    match,
+                    price,
+                    section=vd.get('section'),
+                )
+
+            if not seats_number:
+                return Response(
+                    data={
+                        'message': _(
+                            'All of these seats are already defined for '
+                            'the match.'
+                        ),
+                    },
+                    status=HTTP_400_BAD_REQUEST,
+                )
+
+            data['message'] = _(
                 f'{seats_number} seats were created successfully for the match'
             )
 
-            return Response(
-                data={'message': message},
-                status=HTTP_201_CREATED,
-            )
+            return Response(data=data, status=HTTP_201_CREATED)
 
         return Response(data=srz_data.errors, status=HTTP_400_BAD_REQUEST)
 
@@ -90,35 +210,68 @@ class ListUpdateMatchSeatInfoAPIView(APIView):
     """
     Update several seats for a match.
     Note : This View is used for reserving seats.
-    Permission : Only authenticated users have access.
+    Reserving is all or nothing : if one of seats is taken in the meantime,
+    nothing is reserved and the lost seats are returned with 409 status.
+    Retries with the same Idempotency-Key header get the first response back.
+    Permission : Only authenticated users have access. While the waiting
+    room is enabled, they must be admitted from the queue of the match too.
     """
 
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticated, IsAdmitted)
 
     serializer_class = ListUpdateMatchSeatInfoSerializer
 
+    @idempotent
     def put(self, request, match_id, *args, **kwargs):
 
-        match = get_object_or_404(Match, id=match_id)
-
-        srz_data = self.serializer_class(data=request.data, match=match)
+        srz_data = self.serializer_class(data=request.data)
 
         if srz_data.is_valid():
 
             seats = srz_data.validated_data['seats']
-            seats_number = len(seats)
-            now = timezone.now()
 
-            match_seats = MatchSeatInfo.objects.filter(
-                match=match,
-                seat_id__in=seats,
-            )
-            match_seats.update(
-                is_reserved=True,
-                buyer=request.user,
-                date_reserved=now,
+            start = perf_counter()
+            undefined, lost = MatchSeatInfo.objects.reserve(
+                match_id=match_id,
+                seats=seats,
+                buyer_id=request.user.pk,
+                now=timezone.now(),
             )
 
+            if admission.is_enabled():
+                admission.get_backend().record_commit(
+                    match_id,
+                    perf_counter() - start,
+                )
+
+            if undefined:
+                # The match itself is only looked up on the failure path,
+                # so a successful reservation costs a single UPDATE.
+                get_object_or_404(Match.objects.only('pk'), pk=match_id)
+
+                return Response(
+                    data={
+                        'message': _(
+                            'These seats are not defined for the match.'
+                        ),
+                        'seats': undefined,
+                    },
+                    status=HTTP_400_BAD_REQUEST,
+                )
+
+            if lost:
+                return Response(
+                    data={
+                        'message': _(
+                            'These seats are already reserved for the match.'
+                        ),
+                        'seats': lost,
+                    },
+                    status=HTTP_409_CONFLICT,
+                )
+
+            seats_number = len(seats)
+
             message = _(
                 f'{seats_number} seats were reserved successfully for the match'
             )
@@ -129,3 +282,253 @@ class ListUpdateMatchSeatInfoAPIView(APIView):
             )
 
         return Response(data=srz_data.errors, status=HTTP_400_BAD_REQUEST)
+
+
+class BestAvailableSeatsAPIView(APIView):
+    """
+    Reserve the best available block of contiguous seats for a match.
+    Note : The server picks the seats : the most central block of the front
+    rows, optionally of a price tier and in a section. Seats are reserved
+    like in ListUpdateMatchSeatInfoAPIView; if no block is free, nothing is
+    reserved and 409 status is returned.
+    Retries with the same Idempotency-Key header get the first response back.
+    Permission : Only authenticated users have access. While the waiting
+    room is enabled, they must be admitted from the queue of the match too.
+    """
+
+    permission_classes = (IsAuthenticated, IsAdmitted)
+
+    serializer_class = BestAvailableSeatsSerializer
+
+    @idempotent
+    def post(self, request, match_id, *args, **kwargs):
+
+        srz_data = self.serializer_class(data=request.data)
+
+        if srz_data.is_valid():
+
+            quantity = srz_data.validated_data['quantity']
+
+            start = perf_counter()
+            seats = seat_allocator.hold(
+                match_id=match_id,
+                quantity=quantity,
+                buyer_id=request.user.pk,
+                now=timezone.now(),
+                tier=srz_data.validated_data.get('tier'),
+                section=srz_data.validated_data.get('section'),
+            )
+
+            if admission.is_enabled():
+                admission.get_backend().record_commit(
+                    match_id,
+                    perf_counter() - start,
+                )
+
+            if seats is None:
+                get_object_or_404(Match.objects.only('pk'), pk=match_id)
+
+                return Response(
+                    data={
+                        'message': _(
+                            f'No {quantity} contiguous seats are available '
+                            f'for the match.'
+                        ),
+                    },
+                    status=HTTP_409_CONFLICT,
+                )
+
+            message = _(
+                f'{quantity} seats were reserved successfully for the match'
+            )
+
+            return Response(
+                data={
+                    'message': message,
+                    'seats': [
+                        {
+                            'seat': seat_id,
+                            'code': code,
+                            'section': section,
+                            'row': row,
+                            'number': number,
+                        }
+                        for seat_id, code, section, row, number in seats
+                    ],
+                },
+                status=HTTP_202_ACCEPTED,
+            )
+
+        return Response(data=srz_data.errors, status=HTTP_400_BAD_REQUEST)
+
+
+class ListCheckoutMatchSeatInfoAPIView(APIView):
+    """
+    Pay for all seats which the user has reserved for a match.
+    Note : There is no payment gateway, so this view only confirms the seats
+    whose hold is still valid, i.e. sets is_paid=True for them.
+    Calling it again is harmless; it confirms nothing and returns no seats.
+    Retries with the same Idempotency-Key header get the first response back.
+    Permission : Only authenticated users have access.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    @idempotent
+    def post(self, request, match_id, *args, **kwargs):
+
+        seats = MatchSeatInfo.objects.confirm(
+            match_id=match_id,
+            buyer_id=request.user.pk,
+            now=timezone.now(),
+        )
+
+        if not seats:
+            get_object_or_404(Match.objects.only('pk'), pk=match_id)
+
+        if admission.is_enabled():
+            # Done with shopping; the place goes to the next one in queue.
+            admission.get_backend().leave(match_id, request.user.pk)
+
+        seats_number = len(seats)
+
+        message = _(
+            f'{seats_number} seats were paid successfully for the match'
+        )
+
+        return Response(
+            data={'message': message, 'seats': seats},
+            status=HTTP_200_OK,
+        )
+
+
+class MatchQueueAPIView(APIView):
+    """
+    Join the queue of a match, i.e. its waiting room.
+    Permission : Only authenticated users have access.
+    Returns : A signed ticket, to be sent in X-Queue-Ticket header to the
+    queue status and reservation endpoints, with the status in the queue.
+    Joining again keeps the place in the queue.
+    Note : While the waiting room is disabled, everyone is admitted at once.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, match_id, *args, **kwargs):
+
+        get_object_or_404(Match.objects.only('pk'), pk=match_id)
+
+        user_id = request.user.pk
+
+        if admission.is_enabled():
+            status = admission.get_backend().join(match_id, user_id)
+        else:
+            status = {'admitted': True, 'position': 0, 'estimated_wait': 0}
+
+        return Response(
+            data={
+                'ticket': admission.make_ticket(match_id, user_id),
+                **status,
+            },
+            status=HTTP_200_OK,
+        )
+
+
+class MatchQueueStatusAPIView(APIView):
+    """
+    Status of a queue ticket : whether its user is admitted, and otherwise
+    the estimated position in the queue and wait in seconds.
+    Permission : Everyone with a valid ticket has access.
+    Note : It's meant to be polled, so it's served from the memory of the
+    admission backend; the ticket stands in for authentication.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, match_id, *args, **kwargs):
+
+        user_id = admission.read_ticket(
+            request.headers.get(admission.HEADER),
+            match_id,
+        )
+
+        if user_id is None:
+            return Response(
+                data={
+                    'message': _('The queue ticket is invalid or expired.'),
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        if admission.is_enabled():
+            status = admission.get_backend().status(match_id, user_id)
+        else:
+            status = {'admitted': True, 'position': 0, 'estimated_wait': 0}
+
+        return Response(data=status, status=HTTP_200_OK)
+
+
+class MatchSeatMapAPIView(APIView):
+    """
+    Seats of a match, with their availability and price.
+    Permission : Everyone has access.
+    Returns : A compact seat map (see apps.match.seat_map.build_seat_map),
+    with an ETag. Send it back in If-None-Match header to get 304 status
+    while nothing has changed.
+    Note : Checking the ETag costs one lookup of the match by primary key,
+    and the map itself is only rebuilt when the match's version changes,
+    from the availability bitmap kept in memory.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, match_id, *args, **kwargs):
+
+        version = Match.objects.filter(
+            pk=match_id,
+        ).with_seat_map_version().values_list('version', flat=True).first()
+
+        if version is None:
+            raise Http404
+
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        etag = seat_maps.etag(match_id, version)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+        if etag in etags:
+            return Response(status=HTTP_304_NOT_MODIFIED, headers=headers)
+
+        seat_map, headers['ETag'] = seat_maps.get(match_id, version)
+
+        if headers['ETag'] in etags:
+            return Response(status=HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(data=seat_map, status=HTTP_200_OK, headers=headers)
+
+
+class MatchInventoryAPIView(APIView):
+    """
+    Number of seats of a match which are available, held or sold.
+    Permission : Everyone has access.
+    Note : Numbers come from the counters of MatchInventory, not from
+    counting seats, so it's one indexed lookup whatever the stadium size.
+    """
+
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+
+    def get(self, request, match_id, *args, **kwargs):
+
+        counts = MatchInventory.objects.counts((match_id,)).get(match_id)
+
+        if counts is None:
+            # Matches get counters with their first seat.
+            get_object_or_404(Match.objects.only('pk'), pk=match_id)
+            counts = {'available': 0, 'held': 0, 'sold': 0}
+
+        return Response(
+            data={'match': match_id, **counts},
+            status=HTTP_200_OK,
+        )
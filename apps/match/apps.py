@@ -6,3 +6,12 @@ class MatchConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.match'
     verbose_name = _('Match')
+
+    def ready(self):
+
+        from apps.match import admission
+
+        # Fail at startup, not on the first reservation, when the backend
+        # doesn't fit the number of worker processes.
+        if admission.is_enabled():
+            admission.get_backend()
@@ -0,0 +1,293 @@
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+def encode_runs(values):
+    """
+    Run-length encode a sequence : [a, a, a, b] -> [[a, 3], [b, 1]].
+    """
+
+    runs = []
+
+    for value in values:
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += 1
+        else:
+            runs.append([value, 1])
+
+    return runs
+
+
+def encode_seat_ranges(seats):
+    """
+    Encode sorted seat ids as ranges : [4, 5, 6, 9] -> [[4, 3], [9, 1]].
+    """
+
+    ranges = []
+
+    for seat_id in seats:
+        if ranges and ranges[-1][0] + ranges[-1][1] == seat_id:
+            ranges[-1][1] += 1
+        else:
+            ranges.append([seat_id, 1])
+
+    return ranges
+
+
+class SeatBitmap:
+    """
+    Availability of the seats of a match, in a compact form.
+
+    Seats defined for the match are ordered by id, and the position of a
+    seat in this order is a dense ordinal. Ids are kept as ranges of
+    consecutive ids, which seats of a stadium mostly are : `starts` has the
+    first id of each range and `offsets` the ordinal of that first id. Bit
+    `ordinal` of `bits` is set when the seat is free. For a stadium with
+    80k seats the bits take 10 KB, and the ranges a few bytes each.
+
+    `version` is the seat map version of the match read before the seats,
+    so the bitmap is at least as new as that version.
+    """
+
+    __slots__ = (
+        'starts', 'offsets', 'size', 'bits', 'epoch', 'version', 'built_at',
+    )
+
+    def __init__(self, rows, epoch, version=0):
+        """
+        `rows` are (seat_id, is_reserved) pairs, ordered by seat_id.
+        """
+
+        self.starts = array('q')
+        self.offsets = array('q')
+        self.size = 0
+        self.bits = bytearray()
+        self.epoch = epoch
+        self.version = version
+        self.built_at = monotonic()
+
+        last = None
+
+        for ordinal, (seat_id, is_reserved) in enumerate(rows):
+
+            if last is None or seat_id != last + 1:
+                self.starts.append(seat_id)
+                self.offsets.append(ordinal)
+            last = seat_id
+
+            if ordinal % 8 == 0:
+                self.bits.append(0)
+            if not is_reserved:
+                self.bits[ordinal >> 3] |= 1 << (ordinal & 7)
+
+            self.size = ordinal + 1
+
+    def ordinal(self, seat_id):
+
+        index = bisect_right(self.starts, seat_id) - 1
+
+        if index < 0:
+            return None
+
+        ordinal = self.offsets[index] + seat_id - self.starts[index]
+        end = (
+            self.offsets[index + 1] if index + 1 < len(self.offsets)
+            else self.size
+        )
+
+        return ordinal if ordinal < end else None
+
+    def seat_ids(self):
+        """
+        Seat ids, in the order of their ordinals.
+        """
+
+        for start, count in self.seat_ranges():
+            yield from range(start, start + count)
+
+    def seat_ranges(self):
+        """
+        Seat ids as [first id, count] ranges (see encode_seat_ranges).
+        """
+
+        ends = (*self.offsets[1:], self.size)
+
+        return [
+            [start, end - offset]
+            for start, offset, end in zip(self.starts, self.offsets, ends)
+        ]
+
+    def is_free(self, ordinal):
+        return bool(self.bits[ordinal >> 3] & (1 << (ordinal & 7)))
+
+    def set_reserved(self, ordinal):
+        self.bits[ordinal >> 3] &= ~(1 << (ordinal & 7))
+
+    def check(self, seats):
+        """
+        Return the sorted lists of undefined seats and reserved seats.
+        """
+
+        undefined, reserved = [], []
+
+        for seat_id in sorted(set(seats)):
+
+            ordinal = self.ordinal(seat_id)
+
+            if ordinal is None:
+                undefined.append(seat_id)
+            elif not self.is_free(ordinal):
+                reserved.append(seat_id)
+
+        return undefined, reserved
+
+
+class SeatAvailability:
+    """
+    Bitmaps of matches, kept in the memory of the process.
+
+    They are used to reject seats which are surely taken without going to
+    the database; the database still decides for the others, so a bitmap
+    which thinks a taken seat is free is harmless. The opposite isn't, so:
+
+        - Reservations only clear bits, incrementally, once committed.
+        - Anything which may free or define a seat (expiry, admin changes,
+          defining seats) invalidates the bitmaps of the match, by bumping
+          an epoch in the Django cache. Every process rebuilds on its next
+          check. With a per-process cache (the default LocMemCache) other
+          processes don't see the epoch, so a bitmap is never trusted for
+          longer than MATCH_SEAT_AVAILABILITY_MAX_AGE seconds either.
+
+    Bitmaps are kept by database alias and match, for the
+    MATCH_SEAT_AVAILABILITY_MAX_MATCHES matches used last. Matches without
+    seats, e.g. ids which don't exist, aren't kept.
+    """
+
+    def __init__(self):
+
+        self._bitmaps = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _epoch_key(match_id, using):
+        return f'match:{using}:{match_id}:availability_epoch'
+
+    @staticmethod
+    def _is_fresh(bitmap, epoch):
+
+        return (
+            bitmap is not None and
+            bitmap.epoch == epoch and
+            monotonic() - bitmap.built_at <
+            settings.MATCH_SEAT_AVAILABILITY_MAX_AGE
+        )
+
+    def get(self, match_id, using=None):
+
+        using = using or DEFAULT_DB_ALIAS
+        key = (using, match_id)
+        epoch = cache.get(self._epoch_key(match_id, using), 0)
+        bitmap = self._bitmaps.get(key)
+
+        if self._is_fresh(bitmap, epoch):
+            try:
+                self._bitmaps.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread in the meantime.
+                pass
+            return bitmap
+
+        with self._lock:
+
+            # Another thread may have built it while this one waited.
+            bitmap = self._bitmaps.get(key)
+            if self._is_fresh(bitmap, epoch):
+                return bitmap
+
+            match = apps.get_model('match', 'Match')
+            version = match.objects.using(using).filter(
+                pk=match_id,
+            ).with_seat_map_version().values_list('version', flat=True).first()
+
+            match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+            rows = match_seat_info.objects.using(using).filter(
+                match_id=match_id,
+            ).order_by('seat_id').values_list('seat_id', 'is_reserved')
+
+            bitmap = SeatBitmap(rows, epoch, version or 0)
+
+            if bitmap.size:
+                self._bitmaps[key] = bitmap
+                self._bitmaps.move_to_end(key)
+                while (
+                    len(self._bitmaps) >
+                    settings.MATCH_SEAT_AVAILABILITY_MAX_MATCHES
+                ):
+                    self._bitmaps.popitem(last=False)
+            else:
+                self._bitmaps.pop(key, None)
+
+        return bitmap
+
+    def check(self, match_id, seats, using=None):
+        """
+        Return the sorted lists of undefined seats and reserved seats.
+        """
+
+        return self.get(match_id, using=using).check(seats)
+
+    def mark_reserved(self, match_id, seats, using=None):
+
+        bitmap = self._bitmaps.get((using or DEFAULT_DB_ALIAS, match_id))
+
+        if bitmap is None:
+            return
+
+        for seat_id in seats:
+            ordinal = bitmap.ordinal(seat_id)
+            if ordinal is not None:
+                bitmap.set_reserved(ordinal)
+
+    def invalidate(self, match_ids, using=None):
+        """
+        Drop the bitmaps of the matches, in every process sharing the cache.
+
+        It's done at once, and once more when the current transaction is
+        committed, so no process can keep a bitmap built from the state
+        before the commit.
+        """
+
+        match_ids = set(match_ids)
+        using = using or DEFAULT_DB_ALIAS
+
+        self._invalidate(match_ids, using)
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(
+                lambda: self._invalidate(match_ids, using),
+                using=using,
+            )
+
+    def _invalidate(self, match_ids, using):
+
+        for match_id in match_ids:
+
+            self._bitmaps.pop((using, match_id), None)
+
+            key = self._epoch_key(match_id, using)
+            cache.add(key, 0, timeout=None)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # The key was evicted in the meantime.
+                cache.set(key, 1, timeout=None)
+
+
+seat_availability = SeatAvailability()
@@ -0,0 +1,202 @@
+import json
+from functools import wraps
+from hashlib import sha256
+from threading import Event, Lock
+from time import monotonic, sleep
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.views import Response
+from rest_framework.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+from apps.match.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+
+# Longest key accepted, the length of IdempotencyKey.key.
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+# Requests which are running in this process, by (user id, key). Duplicates
+# arriving in the same process wait on the event instead of polling.
+_running = {}
+_running_lock = Lock()
+
+
+def _fingerprint(request):
+
+    body = json.dumps(request.data, sort_keys=True, default=str)
+
+    return sha256(
+        f'{request.method} {request.path} {body}'.encode()
+    ).hexdigest()
+
+
+def _claim(user_id, key, fingerprint):
+    """
+    Return the record of the key, and whether this request created it.
+    """
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+            )
+        return record, True
+
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(
+            user_id=user_id,
+            key=key,
+        ).first()
+
+    now = timezone.now()
+
+    if record is None or (
+        record.date_created < now - settings.IDEMPOTENCY_KEY_TTL
+    ) or (
+        record.status_code is None and
+        record.date_created < now - settings.IDEMPOTENCY_KEY_LEASE
+    ):
+        # The key is free again; it was expired, its request failed, or its
+        # request died before finishing.
+        if record is not None:
+            record.delete()
+        return _claim(user_id, key, fingerprint)
+
+    return record, False
+
+
+def _wait(record, event):
+    """
+    Wait for the first request with the key to finish, and return its record.
+    """
+
+    deadline = monotonic() + settings.IDEMPOTENCY_KEY_WAIT
+
+    while record is not None and record.status_code is None:
+
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            break
+
+        if event is not None:
+            event.wait(remaining)
+        else:
+            sleep(min(0.05, remaining))
+
+        record = IdempotencyKey.objects.filter(pk=record.pk).first()
+
+    return record
+
+
+def _replay(record):
+
+    return Response(
+        data=record.response,
+        status=record.status_code,
+        headers={'Idempotent-Replayed': 'true'},
+    )
+
+
+def idempotent(handler):
+    """
+    Make a handler of an APIView idempotent for the Idempotency-Key header.
+
+    The first response of a (user, key) pair is stored for
+    IDEMPOTENCY_KEY_TTL and replayed to retries without running the handler
+    again. Retries which arrive while the first request is still running
+    wait for it, up to IDEMPOTENCY_KEY_WAIT seconds. Server errors aren't
+    stored, so a request which failed can be retried with the same key, and
+    neither are requests still running after IDEMPOTENCY_KEY_LEASE, whose
+    key a retry takes over. Requests without the header are handled as
+    usual, and keys longer than MAX_KEY_LENGTH are rejected.
+    """
+
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+
+        key = request.headers.get(HEADER)
+
+        if not key or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                data={
+                    'message': _(
+                        f'{HEADER} is longer than {MAX_KEY_LENGTH} '
+                        f'characters.'
+                    ),
+                },
+                status=HTTP_400_BAD_REQUEST,
+            )
+
+        user_id = request.user.pk
+        fingerprint = _fingerprint(request)
+        record, created = _claim(user_id, key, fingerprint)
+
+        if not created:
+
+            if record.fingerprint != fingerprint:
+                return Response(
+                    data={
+                        'message': _(
+                            f'{HEADER} was already used for another request.'
+                        ),
+                    },
+                    status=HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+
+            record = _wait(record, _running.get((user_id, record.key)))
+
+            if record is None or record.status_code is None:
+                return Response(
+                    data={
+                        'message': _(
+                            f'A request with this {HEADER} is in progress.'
+                        ),
+                    },
+                    status=HTTP_409_CONFLICT,
+                )
+
+            return _replay(record)
+
+        event = Event()
+        with _running_lock:
+            _running[(user_id, record.key)] = event
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+
+            if response.status_code >= 500:
+                record.delete()
+            else:
+                # Nothing is stored when a retry took the key over, after
+                # the lease of this request ran out.
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    status_code=response.status_code,
+                    response=response.data,
+                )
+
+            return response
+
+        except Exception:
+            record.delete()
+            raise
+
+        finally:
+            with _running_lock:
+                _running.pop((user_id, record.key), None)
+            event.set()
+
+    return wrapper
@@ -0,0 +1,8 @@
+"""
+Load test of the booking flow, run by `python manage.py loadtest`.
+
+    - seed : creates stadiums, seats, teams, matches and users.
+    - client : a tiny HTTP client and latency statistics, stdlib only.
+    - runner : drives signup, login, match creation and booking traffic
+      against a running server and reports it per endpoint.
+"""
@@ -0,0 +1,133 @@
+import json
+from http.client import HTTPConnection, HTTPException
+from statistics import quantiles
+from threading import Lock
+from time import perf_counter
+from urllib.parse import urlsplit
+
+
+class Client:
+    """
+    A keep-alive HTTP client for JSON endpoints, one per thread.
+    """
+
+    def __init__(self, base_url, timeout=30):
+
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.token = None
+        self.connection = None
+
+    def request(self, method, path, data=None, headers=None):
+        """
+        Return the status, the decoded body and the latency in milliseconds.
+        The status is 0 when the request didn't get a response.
+        """
+
+        body = None if data is None else json.dumps(data).encode()
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        start = perf_counter()
+
+        # A kept-alive connection may have been closed by the server in the
+        # meantime; then the request is sent once more on a new one.
+        while True:
+
+            reused = self.connection is not None
+
+            try:
+                if self.connection is None:
+                    self.connection = HTTPConnection(
+                        self.host,
+                        self.port,
+                        timeout=self.timeout,
+                    )
+                self.connection.request(
+                    method,
+                    self.prefix + path,
+                    body=body,
+                    headers=headers,
+                )
+                response = self.connection.getresponse()
+                content = response.read()
+                status = response.status
+                break
+
+            except (OSError, HTTPException):
+                self.close()
+                if not reused:
+                    return 0, None, (perf_counter() - start) * 1000
+
+        if response.will_close:
+            self.close()
+
+        latency = (perf_counter() - start) * 1000
+
+        try:
+            content = json.loads(content) if content else None
+        except ValueError:
+            content = None
+
+        return status, content, latency
+
+    def close(self):
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Recorder:
+    """
+    Latencies and statuses of requests, by endpoint; shared by threads.
+    """
+
+    def __init__(self):
+
+        self._samples = {}
+        self._lock = Lock()
+
+    def add(self, endpoint, status, latency):
+
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append((status, latency))
+
+    def summary(self, endpoint, seconds):
+        """
+        `seconds` is the wall time of the phase of the endpoint.
+        """
+
+        samples = self._samples.get(endpoint, [])
+        latencies = sorted(latency for status, latency in samples)
+        statuses = {}
+        for status, latency in samples:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        requests = len(samples)
+        errors = sum(
+            1 for status, latency in samples if status == 0 or status >= 500
+        )
+
+        if requests > 1:
+            percentiles = quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0
+
+        return {
+            'requests': requests,
+            'seconds': round(seconds, 3),
+            'throughput_rps': round(requests / seconds, 1) if seconds else 0,
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+            'p99_ms': round(p99, 2),
+            'statuses': statuses,
+            'conflict_rate': round(statuses.get('409', 0) / requests, 4)
+            if requests else 0,
+            'error_rate': round(errors / requests, 4) if requests else 0,
+        }
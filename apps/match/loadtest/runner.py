@@ -0,0 +1,272 @@
+import random
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import accumulate
+from threading import local
+from time import perf_counter
+
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.match.loadtest.client import Client, Recorder
+
+
+class Skewed:
+    """
+    Pick items with a Zipf-like skew : the item of rank r is picked with a
+    probability proportional to 1 / r ** skew. A skew of 0 is uniform, and
+    the higher it is, the more buyers fight for the same few items.
+    """
+
+    def __init__(self, items, skew):
+
+        self.items = list(items)
+        self.cumulative = list(
+            accumulate(
+                1 / rank ** skew for rank in range(1, len(self.items) + 1)
+            )
+        )
+
+    def pick(self, rand):
+
+        point = rand.random() * self.cumulative[-1]
+
+        return self.items[bisect_left(self.cumulative, point)]
+
+    def sample(self, rand, number):
+        """
+        Pick `number` distinct items.
+        """
+
+        number = min(number, len(self.items))
+        picked = set()
+
+        while len(picked) < number:
+            picked.add(self.pick(rand))
+
+        return sorted(picked)
+
+
+class LoadTest:
+    """
+    Drive the booking flow against a running server, phase by phase :
+
+        - signup : `signups` new users sign up.
+        - login : the admin and `concurrency` seeded users log in.
+        - create_match : the admin defines `create_matches` matches.
+        - book / checkout : for `duration` seconds, every logged in user
+          books `seats_per_booking` seats of a match, and pays for them
+          when the booking is accepted. Matches and seats are picked with
+          the given skew.
+
+    `data` is what apps.match.loadtest.seed.seed returned; the server must
+    use the same database.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        data,
+        password,
+        tag,
+        concurrency=16,
+        duration=10,
+        signups=50,
+        create_matches=20,
+        seats_per_booking=2,
+        skew=1.0,
+        seed=0,
+    ):
+        self.base_url = base_url
+        self.data = data
+        self.password = password
+        self.tag = tag
+        self.concurrency = concurrency
+        self.duration = duration
+        self.signups = signups
+        self.create_matches = create_matches
+        self.seats_per_booking = seats_per_booking
+        self.skew = skew
+        self.seed = seed
+
+        self.recorder = Recorder()
+        self.phases = {}
+        self._local = local()
+
+    def client(self, token=None):
+        """
+        The client of the current thread which sends the token; clients
+        aren't shared by threads.
+        """
+
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+
+        client = clients.get(token)
+        if client is None:
+            client = clients[token] = Client(self.base_url)
+            client.token = token
+
+        return client
+
+    def call(self, endpoint, client, method, path, data=None):
+
+        status, content, latency = client.request(method, path, data)
+        self.recorder.add(endpoint, status, latency)
+
+        return status, content
+
+    def phase(self, name, function, items):
+        """
+        Run `function` for every item on `concurrency` threads, and return
+        the results in order.
+        """
+
+        start = perf_counter()
+
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            results = list(executor.map(function, items))
+
+        self.phases[name] = perf_counter() - start
+
+        return results
+
+    def run(self):
+
+        self.phase('signup', self.signup, range(self.signups))
+
+        emails = [self.data['admin']] + self.data['users'][:self.concurrency]
+        clients = self.phase('login', self.login, emails)
+        admin, buyers = clients[0], [
+            client for client in clients[1:] if client.token
+        ]
+
+        if admin.token:
+            self.phase(
+                'create_match',
+                lambda number: self.create_match(admin.token, number),
+                range(self.create_matches),
+            )
+
+        self.phase(
+            'booking',
+            lambda index: self.book(buyers[index], index),
+            range(len(buyers)),
+        )
+
+        for client in clients:
+            client.close()
+
+        phase_of = {
+            'signup': 'signup',
+            'login': 'login',
+            'create_match': 'create_match',
+            'book': 'booking',
+            'checkout': 'booking',
+        }
+
+        return {
+            'endpoints': {
+                endpoint: self.recorder.summary(
+                    endpoint,
+                    self.phases.get(phase, 0),
+                )
+                for endpoint, phase in phase_of.items()
+                if phase in self.phases
+            },
+        }
+
+    def signup(self, number):
+
+        self.call(
+            'signup',
+            self.client(),
+            'POST',
+            reverse('accounts:api_register'),
+            {
+                'email': f'{self.tag}-signup-{number}@loadtest.local',
+                'password': self.password,
+                'confirm_password': self.password,
+            },
+        )
+
+    def login(self, email):
+        """
+        Return a client of its own, authenticated as the user.
+        """
+
+        client = Client(self.base_url)
+        status, content = self.call(
+            'login',
+            client,
+            'POST',
+            reverse('accounts:api_login'),
+            {'email': email, 'password': self.password},
+        )
+
+        if status == 200:
+            client.token = content['access']
+
+        return client
+
+    def create_match(self, token, number):
+
+        stadiums = self.data['stadiums']
+        teams = self.data['teams']
+        # Far from the seeded matches, so (stadium, datetime) stays unique.
+        moment = timezone.now() + timedelta(days=3650, minutes=number)
+
+        self.call(
+            'create_match',
+            self.client(token),
+            'POST',
+            reverse('match:api_create_match'),
+            {
+                'stadium': stadiums[number % len(stadiums)],
+                'host_team': teams[number % len(teams)],
+                'guest_team': teams[(number + 1) % len(teams)],
+                'datetime': moment.isoformat(),
+            },
+        )
+
+    def book(self, client, index):
+
+        rand = random.Random(self.seed * 1000 + index)
+        matches = Skewed(self.data['matches'], self.skew)
+        seats = {
+            match_id: Skewed(seat_ids, self.skew)
+            for match_id, seat_ids in self.data['matches'].items()
+        }
+        deadline = perf_counter() + self.duration
+
+        while perf_counter() < deadline:
+
+            match_id = matches.pick(rand)
+            status, content = self.call(
+                'book',
+                client,
+                'PUT',
+                reverse(
+                    'match:api_update_list_match_seat',
+                    kwargs={'match_id': match_id},
+                ),
+                {
+                    'seats': seats[match_id].sample(
+                        rand,
+                        self.seats_per_booking,
+                    ),
+                },
+            )
+
+            if status == 202:
+                self.call(
+                    'checkout',
+                    client,
+                    'POST',
+                    reverse(
+                        'match:api_checkout_list_match_seat',
+                        kwargs={'match_id': match_id},
+                    ),
+                )
@@ -0,0 +1,46 @@
+from django.db import transaction
+
+from apps.match.models import MatchSeatInfo
+from apps.match.seeding import Seeder
+
+
+def seed(tag, stadiums, seats, matches, users, password):
+    """
+    Create the data of a load test, with names made unique by `tag`.
+
+    Every match is defined with all seats of its stadium, and users log in
+    with `password`.
+
+    Returns a dict with:
+        - admin : email of a staff user
+        - users : emails of the other users
+        - stadiums : ids of stadiums
+        - teams : ids of teams
+        - matches : {match id : sorted seat ids}
+    """
+
+    seeder = Seeder(tag)
+
+    with transaction.atomic():
+
+        stadium_ids = seeder.stadiums(stadiums)
+        seeder.seats(stadium_ids, seats)
+        team_ids = seeder.teams(max(2, matches + 1))
+        match_ids = seeder.matches(stadium_ids, team_ids, matches)
+        seeder.match_seats(match_ids)
+        seeder.users(1, password, staff=True)
+        seeder.users(users, password)
+
+    seats_of_match = {match_id: [] for match_id in match_ids}
+    for match_id, seat_id in MatchSeatInfo.objects.filter(
+        match_id__in=match_ids,
+    ).order_by('seat_id').values_list('match_id', 'seat_id'):
+        seats_of_match[match_id].append(seat_id)
+
+    return {
+        'admin': seeder.user_email(0, staff=True),
+        'users': [seeder.user_email(index) for index in range(users)],
+        'stadiums': stadium_ids,
+        'teams': team_ids,
+        'matches': seats_of_match,
+    }
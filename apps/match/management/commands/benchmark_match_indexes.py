@@ -0,0 +1,348 @@
+import json
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import timedelta
+from itertools import islice
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.sqlite3.base import FORMAT_QMARK_REGEX
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from apps.match.models import MatchSeatInfo
+
+
+class Command(BaseCommand):
+    """
+    Compare the original indexes of MatchSeatInfo with the current ones.
+
+    A throwaway SQLite file is seeded with `--matches` x `--seats` rows
+    (250 x 80000 = 20 million by default), then every hot query is timed
+    and explained twice : once with the original schema (only the unique
+    constraint and the foreign key indexes) and once with the indexes
+    declared in MatchSeatInfo.Meta. The queries are compiled by the ORM,
+    so they are exactly the ones which the application runs.
+    """
+
+    help = 'Benchmark the indexes of MatchSeatInfo on a seeded table.'
+
+    chunk_size = 100_000
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--path',
+            help='SQLite file to seed (a temporary one by default).',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help="Don't delete the seeded file at the end.",
+        )
+        parser.add_argument('--matches', type=int, default=250)
+        parser.add_argument(
+            '--seats',
+            type=int,
+            default=80_000,
+            help='Seats of each match.',
+        )
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--reserved-ratio', type=float, default=0.3)
+        parser.add_argument(
+            '--paid-ratio',
+            type=float,
+            default=0.7,
+            help='Ratio of reserved seats which are paid.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Runs of each query in each phase.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON.',
+        )
+
+    def handle(self, *args, **options):
+
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.now = timezone.now()
+
+        path = options['path']
+        if not path:
+            descriptor, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(descriptor)
+        if os.path.exists(path):
+            os.remove(path)
+
+        table_sql, index_sql = self.schema()
+        db = sqlite3.connect(path, isolation_level=None)
+
+        try:
+            report = {
+                'rows': options['matches'] * options['seats'],
+                'seed_seconds': self.seed(db, table_sql),
+                'phases': {},
+            }
+
+            # The schema before the deliberate index set.
+            start = perf_counter()
+            db.execute(
+                f'CREATE INDEX "bench_match_id" ON "{self.table}" ("match_id")'
+            )
+            db.execute(
+                f'CREATE INDEX "bench_buyer_id" ON "{self.table}" ("buyer_id")'
+            )
+            db.execute('ANALYZE')
+            report['phases']['original'] = self.measure(
+                db,
+                perf_counter() - start,
+            )
+
+            start = perf_counter()
+            db.execute('DROP INDEX "bench_match_id"')
+            db.execute('DROP INDEX "bench_buyer_id"')
+            for sql in index_sql:
+                db.execute(sql)
+            db.execute('ANALYZE')
+            report['phases']['current'] = self.measure(
+                db,
+                perf_counter() - start,
+            )
+
+        finally:
+            db.close()
+            if not options['keep']:
+                os.remove(path)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    @property
+    def table(self):
+        return MatchSeatInfo._meta.db_table
+
+    def schema(self):
+        """
+        Return the SQL of the table without the indexes declared in Meta,
+        and the SQL of those indexes, as Django would create them.
+        """
+
+        with connection.schema_editor(collect_sql=True) as editor:
+            editor.create_model(MatchSeatInfo)
+
+        names = {f'"{index.name}"' for index in MatchSeatInfo._meta.indexes}
+        table_sql, index_sql = [], []
+
+        for sql in editor.collected_sql:
+            if any(name in sql for name in names):
+                index_sql.append(sql)
+            else:
+                table_sql.append(sql)
+
+        return table_sql, index_sql
+
+    def seed(self, db, table_sql):
+
+        start = perf_counter()
+
+        db.execute('PRAGMA journal_mode = OFF')
+        db.execute('PRAGMA synchronous = OFF')
+        for sql in table_sql:
+            db.execute(sql)
+
+        insert = (
+            f'INSERT INTO "{self.table}" '
+            '("match_id", "seat_id", "tier_id", "is_reserved", "is_paid", '
+            '"date_reserved", "buyer_id") VALUES (?, ?, ?, ?, ?, ?, ?)'
+        )
+        rows = self.rows()
+
+        db.execute('BEGIN')
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            db.executemany(insert, chunk)
+        db.execute('COMMIT')
+
+        return round(perf_counter() - start, 2)
+
+    def rows(self):
+
+        options = self.options
+        rand = self.random.random
+        randint = self.random.randint
+        users = options['users']
+        reserved_ratio = options['reserved_ratio']
+        paid_ratio = options['paid_ratio']
+
+        # Holds are spread over the last 20 minutes, so with the default
+        # hold time about half of the unpaid ones are expired.
+        adapt = connection.ops.adapt_datetimefield_value
+        dates = [
+            adapt(self.now - timedelta(seconds=second))
+            for second in range(0, 1200, 3)
+        ]
+        choice = self.random.choice
+
+        for match_id in range(1, options['matches'] + 1):
+            for seat_id in range(1, options['seats'] + 1):
+
+                # Five price tiers per match.
+                tier_id = (match_id - 1) * 5 + 1 + seat_id % 5
+
+                if rand() < reserved_ratio:
+                    yield (
+                        match_id, seat_id, tier_id,
+                        1, int(rand() < paid_ratio),
+                        choice(dates), randint(1, users),
+                    )
+                else:
+                    yield match_id, seat_id, tier_id, 0, 0, None, None
+
+    def queries(self):
+        """
+        Hot queries of the application, with random parameters.
+        """
+
+        options = self.options
+        match_id = self.random.randint(1, options['matches'])
+        buyer_id = self.random.randint(1, options['users'])
+        seats = self.random.sample(
+            range(1, options['seats'] + 1),
+            min(10, options['seats']),
+        )
+        objects = MatchSeatInfo.objects
+
+        reserve = objects.filter(
+            match_id=match_id,
+            seat_id__in=seats,
+            is_reserved=False,
+        )
+
+        return {
+            'availability': reserve.values_list('seat_id'),
+            'reserve (update)': self.update_sql(
+                reserve,
+                is_reserved=True,
+                buyer_id=buyer_id,
+                date_reserved=self.now,
+            ),
+            'checkout': objects.held(self.now).filter(
+                match_id=match_id,
+                buyer_id=buyer_id,
+            ).values_list('seat_id'),
+            'expiry sweep': objects.expired(self.now).order_by(
+                'date_reserved',
+            ).values('pk')[:500],
+            'free seats of match': objects.filter(
+                match_id=match_id,
+                is_reserved=False,
+            ).values_list('seat_id'),
+            'seat map': objects.filter(match_id=match_id).order_by(
+                'seat',
+            ).values_list('seat_id', 'is_reserved', 'is_paid', 'tier_id'),
+            'seats of buyer': objects.filter(
+                buyer_id=buyer_id,
+            ).values_list('match_id', 'seat_id'),
+        }
+
+    def update_sql(self, queryset, **values):
+
+        query = queryset.query.chain(UpdateQuery)
+        query.add_update_values(values)
+
+        return query.get_compiler(connection=connection).as_sql()
+
+    def compile(self, query):
+
+        if isinstance(query, tuple):
+            sql, params = query
+        else:
+            sql, params = query.query.get_compiler(
+                connection=connection,
+            ).as_sql()
+
+        # The ORM uses "format" placeholders, sqlite3 the "qmark" ones.
+        return FORMAT_QMARK_REGEX.sub('?', sql).replace('%%', '%'), params
+
+    def measure(self, db, index_seconds):
+
+        timings = {}
+        plans = {}
+
+        for _ in range(self.options['repeat']):
+            for name, query in self.queries().items():
+
+                sql, params = self.compile(query)
+
+                if name not in plans:
+                    plans[name] = [
+                        row[3] for row in
+                        db.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    ]
+
+                # Writes are rolled back, so every run sees the same data.
+                db.execute('BEGIN')
+                start = perf_counter()
+                db.execute(sql, params).fetchall()
+                timings.setdefault(name, []).append(perf_counter() - start)
+                db.execute('ROLLBACK')
+
+        queries = {}
+        for name, values in timings.items():
+            milliseconds = [value * 1000 for value in values]
+            queries[name] = {
+                'median_ms': round(median(milliseconds), 3),
+                'p95_ms': round(
+                    quantiles(milliseconds, n=20)[-1]
+                    if len(milliseconds) > 1 else milliseconds[0],
+                    3,
+                ),
+                'plan': plans[name],
+            }
+
+        return {
+            'index_seconds': round(index_seconds, 2),
+            'queries': queries,
+        }
+
+    def print_report(self, report):
+
+        self.stdout.write(
+            f"{report['rows']} rows seeded in {report['seed_seconds']} s"
+        )
+
+        original = report['phases']['original']
+        current = report['phases']['current']
+
+        self.stdout.write(
+            f"Indexes built in {original['index_seconds']} s (original), "
+            f"{current['index_seconds']} s (current)"
+        )
+
+        for name, before in original['queries'].items():
+
+            after = current['queries'][name]
+
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                f"  median {before['median_ms']} -> {after['median_ms']} ms, "
+                f"p95 {before['p95_ms']} -> {after['p95_ms']} ms"
+            )
+            self.stdout.write(f"  original : {'; '.join(before['plan'])}")
+            self.stdout.write(f"  current  : {'; '.join(after['plan'])}")
@@ -0,0 +1,335 @@
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+from statistics import quantiles
+from time import perf_counter, sleep, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, OperationalError
+from django.db.utils import ConnectionHandler
+from django.utils import timezone
+
+from apps.match.models import (
+    Match,
+    MatchInventory,
+    MatchSeatInfo,
+    PriceTier,
+)
+
+
+ALIAS = 'benchmark'
+
+MATCH_ID = 1
+
+
+def _profiles():
+    """
+    Database settings to compare : the ones of base_settings and the ones
+    of production_settings.
+    """
+
+    from config.settings import production_settings
+
+    return {
+        'default': settings.DATABASES['default'],
+        'production': production_settings.DATABASES['default'],
+    }
+
+
+def _connect(settings_dict, path):
+
+    settings_dict = {**settings_dict, 'NAME': path, 'CONN_MAX_AGE': None}
+    # The handler fills in the defaults; it needs a 'default' database.
+    wrapper = ConnectionHandler(
+        {'default': settings_dict, ALIAS: settings_dict},
+    )[ALIAS]
+    connections[ALIAS] = wrapper
+
+    with wrapper.cursor() as cursor:
+        # The seeded file only has the tables of matches and their seats.
+        cursor.execute('PRAGMA foreign_keys = OFF')
+
+    return wrapper
+
+
+def _count_error(stats, error):
+
+    if 'locked' in str(error) or 'busy' in str(error):
+        stats['lock_errors'] += 1
+    else:
+        raise error
+
+
+def _book(settings_dict, path, seats, deadline, seed):
+    """
+    Book and pay for random seats until the deadline, like buyers do.
+    """
+
+    wrapper = _connect(settings_dict, path)
+    rand = random.Random(seed)
+    objects = MatchSeatInfo.objects.using(ALIAS)
+    stats = {
+        'bookings': 0, 'conflicts': 0, 'lock_errors': 0, 'latencies': [],
+    }
+
+    while time() < deadline:
+
+        wanted = rand.sample(range(1, seats + 1), rand.randint(1, 4))
+        buyer_id = rand.randrange(1, 2 ** 31)
+        now = timezone.now()
+        start = perf_counter()
+
+        try:
+            # What the booking and checkout endpoints run, including the
+            # availability bitmap of the worker; checkout reads before it
+            # writes.
+            undefined, lost = objects.reserve(MATCH_ID, wanted, buyer_id, now)
+
+            if not undefined and not lost:
+                objects.confirm(MATCH_ID, buyer_id, now)
+                stats['bookings'] += 1
+            else:
+                stats['conflicts'] += 1
+
+        except OperationalError as error:
+            _count_error(stats, error)
+
+        stats['latencies'].append((perf_counter() - start) * 1000)
+
+    wrapper.close()
+
+    return stats
+
+
+def _read(settings_dict, path, deadline):
+    """
+    Read the seat map of the match until the deadline, like polling clients.
+    """
+
+    wrapper = _connect(settings_dict, path)
+    stats = {'reads': 0, 'lock_errors': 0}
+    rows = MatchSeatInfo.objects.using(ALIAS).filter(
+        match_id=MATCH_ID,
+    ).order_by('seat_id').values_list('seat_id', 'is_reserved', 'tier_id')
+
+    while time() < deadline:
+        try:
+            list(rows.all())
+            stats['reads'] += 1
+        except OperationalError as error:
+            _count_error(stats, error)
+
+    wrapper.close()
+
+    return stats
+
+
+class Command(BaseCommand):
+    """
+    Compare SQLite settings under concurrent bookings.
+
+    For each profile, a throwaway SQLite file is seeded with one match of
+    `--seats` seats. Then `--writers` processes book and pay for random
+    seats (the statements of the booking and checkout endpoints) while
+    `--readers` processes read the seat map, for `--duration` seconds.
+    Every process has its own connection with the settings of the
+    profile, as gunicorn workers do.
+    """
+
+    help = 'Benchmark bookings per second and lock errors of SQLite settings.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--profiles',
+            nargs='+',
+            default=('default', 'production'),
+            choices=('default', 'production'),
+        )
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=2)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds of each profile.',
+        )
+        parser.add_argument('--seats', type=int, default=100_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the report as JSON.',
+        )
+
+    def handle(self, *args, **options):
+
+        self.options = options
+        profiles = _profiles()
+        report = {}
+
+        for name in options['profiles']:
+
+            descriptor, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(descriptor)
+
+            try:
+                self.seed(path)
+                report[name] = self.run(profiles[name], path)
+            finally:
+                for suffix in ('', '-wal', '-shm', '-journal'):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.print_report(report)
+
+    def seed(self, path):
+
+        with connection.schema_editor(collect_sql=True) as editor:
+            editor.create_model(Match)
+            editor.create_model(PriceTier)
+            editor.create_model(MatchSeatInfo)
+            editor.create_model(MatchInventory)
+
+        db = sqlite3.connect(path, isolation_level=None)
+
+        try:
+            for statement in editor.collected_sql:
+                db.execute(statement)
+
+            db.execute('BEGIN')
+            db.execute(
+                f'INSERT INTO "{Match._meta.db_table}" ("id", "stadium_id", '
+                '"host_team_id", "guest_team_id", "datetime", '
+                '"seat_map_version", "inventory_shards") '
+                'VALUES (?, 1, 1, 2, ?, 0, 1)',
+                (
+                    MATCH_ID,
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                ),
+            )
+            db.executemany(
+                f'INSERT INTO "{PriceTier._meta.db_table}" ("id", '
+                '"match_id", "price") VALUES (?, ?, ?)',
+                (
+                    (tier_id, MATCH_ID, 10_000 * tier_id)
+                    for tier_id in range(1, 6)
+                ),
+            )
+            db.executemany(
+                f'INSERT INTO "{MatchSeatInfo._meta.db_table}" '
+                '("match_id", "seat_id", "tier_id", "is_reserved", "is_paid") '
+                'VALUES (?, ?, ?, 0, 0)',
+                (
+                    (MATCH_ID, seat_id, 1 + seat_id % 5)
+                    for seat_id in range(1, self.options['seats'] + 1)
+                ),
+            )
+            db.execute(
+                f'INSERT INTO "{MatchInventory._meta.db_table}" ("match_id", '
+                '"shard", "available", "held", "sold", "version") '
+                'VALUES (?, 0, ?, 0, 0, 0)',
+                (MATCH_ID, self.options['seats']),
+            )
+            db.execute('COMMIT')
+            db.execute('ANALYZE')
+
+        finally:
+            db.close()
+
+    def run(self, settings_dict, path):
+
+        options = self.options
+        writers = options['writers']
+        readers = options['readers']
+        context = multiprocessing.get_context('fork')
+
+        with context.Pool(writers + readers) as pool:
+
+            # Let every process start before the clock does.
+            deadline = time() + 0.5 + options['duration']
+            writes = [
+                pool.apply_async(
+                    _book,
+                    (
+                        settings_dict,
+                        path,
+                        options['seats'],
+                        deadline,
+                        options['seed'] * 1000 + number,
+                    ),
+                )
+                for number in range(writers)
+            ]
+            reads = [
+                pool.apply_async(_read, (settings_dict, path, deadline))
+                for _ in range(readers)
+            ]
+
+            while time() < deadline:
+                sleep(0.1)
+
+            writes = [result.get() for result in writes]
+            reads = [result.get() for result in reads]
+
+        duration = options['duration']
+        latencies = sorted(
+            latency for stats in writes for latency in stats['latencies']
+        )
+        attempts = len(latencies)
+        bookings = sum(stats['bookings'] for stats in writes)
+        lock_errors = sum(stats['lock_errors'] for stats in writes)
+
+        if len(latencies) > 1:
+            percentiles = quantiles(latencies, n=100)
+            p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0
+
+        return {
+            'attempts': attempts,
+            'bookings': bookings,
+            'bookings_per_second': round(bookings / duration, 1),
+            'conflicts': sum(stats['conflicts'] for stats in writes),
+            'lock_errors': lock_errors,
+            'lock_error_rate': round(lock_errors / attempts, 4)
+            if attempts else 0,
+            'p50_ms': round(p50, 2),
+            'p95_ms': round(p95, 2),
+            'p99_ms': round(p99, 2),
+            'reads_per_second': round(
+                sum(stats['reads'] for stats in reads) / duration,
+                1,
+            ),
+            'read_lock_errors': sum(stats['lock_errors'] for stats in reads),
+        }
+
+    def print_report(self, report):
+
+        for name, stats in report.items():
+
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                f"  {stats['bookings_per_second']} bookings/s, "
+                f"{stats['reads_per_second']} seat map reads/s"
+            )
+            self.stdout.write(
+                f"  {stats['attempts']} attempts : {stats['bookings']} booked, "
+                f"{stats['conflicts']} conflicts, "
+                f"{stats['lock_errors']} lock errors "
+                f"({stats['lock_error_rate']:.2%})"
+            )
+            self.stdout.write(
+                f"  latency p50 {stats['p50_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms"
+            )
+            self.stdout.write(
+                f"  {stats['read_lock_errors']} lock errors of readers"
+            )
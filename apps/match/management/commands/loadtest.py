@@ -0,0 +1,166 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+from time import monotonic, perf_counter, sleep
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.match.loadtest.runner import LoadTest
+from apps.match.loadtest.seed import seed
+
+
+class Command(BaseCommand):
+    """
+    Load test the booking flow against a running server.
+
+    Data is seeded at the given scale in the database of the current
+    settings, which the server must share. Then signup, login, match
+    creation and booking traffic is driven by `--concurrency` threads (see
+    apps.match.loadtest.runner.LoadTest), and the report is printed as JSON:
+    requests, throughput, p50/p95/p99 latency, statuses, conflict rate and
+    error rate per endpoint. Same options and `--seed` give the same
+    traffic, so reports of two versions of the code can be compared.
+
+    With `--spawn`, the command starts gunicorn itself on `--url`.
+    """
+
+    help = 'Load test signup, login, match creation and seat booking.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--spawn',
+            action='store_true',
+            help='Start gunicorn on --url for the test.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='gunicorn workers, with --spawn.',
+        )
+        parser.add_argument('--stadiums', type=int, default=2)
+        parser.add_argument(
+            '--seats',
+            type=int,
+            default=2000,
+            help='Seats of each stadium.',
+        )
+        parser.add_argument('--matches', type=int, default=4)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Seconds of booking traffic.',
+        )
+        parser.add_argument('--signups', type=int, default=50)
+        parser.add_argument('--create-matches', type=int, default=20)
+        parser.add_argument('--seats-per-booking', type=int, default=2)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.0,
+            help='Contention skew of matches and seats; 0 is uniform.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--password', default='loadtest12345QQ!!')
+        parser.add_argument(
+            '--tag',
+            help='Prefix of seeded names (the current time by default).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the report to this file.',
+        )
+
+    def handle(self, *args, **options):
+
+        tag = options['tag'] or timezone.now().strftime('lt%Y%m%d%H%M%S')
+
+        start = perf_counter()
+        data = seed(
+            tag=tag,
+            stadiums=options['stadiums'],
+            seats=options['seats'],
+            matches=options['matches'],
+            users=max(options['users'], options['concurrency']),
+            password=options['password'],
+        )
+        seed_seconds = perf_counter() - start
+
+        server = self.spawn(options) if options['spawn'] else None
+
+        try:
+            report = LoadTest(
+                base_url=options['url'],
+                data=data,
+                password=options['password'],
+                tag=tag,
+                concurrency=options['concurrency'],
+                duration=options['duration'],
+                signups=options['signups'],
+                create_matches=options['create_matches'],
+                seats_per_booking=options['seats_per_booking'],
+                skew=options['skew'],
+                seed=options['seed'],
+            ).run()
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+        report = {
+            'config': {
+                name: options[name] for name in (
+                    'url', 'spawn', 'workers', 'stadiums', 'seats', 'matches',
+                    'users', 'concurrency', 'duration', 'signups',
+                    'create_matches', 'seats_per_booking', 'skew', 'seed',
+                )
+            },
+            'tag': tag,
+            'seed_seconds': round(seed_seconds, 2),
+            **report,
+        }
+        output = json.dumps(report, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+
+        self.stdout.write(output)
+
+    def spawn(self, options):
+
+        url = urlsplit(options['url'])
+        address = (url.hostname, url.port or 80)
+
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn', 'config.wsgi',
+                '--bind', f'{address[0]}:{address[1]}',
+                '--workers', str(options['workers']),
+            ],
+            env=os.environ.copy(),
+        )
+
+        deadline = monotonic() + 30
+        while monotonic() < deadline:
+
+            if server.poll() is not None:
+                raise CommandError('gunicorn exited; is it installed?')
+
+            try:
+                socket.create_connection(address, timeout=1).close()
+                return server
+            except OSError:
+                sleep(0.2)
+
+        server.terminate()
+        raise CommandError(f'gunicorn did not listen on {options["url"]}.')
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.match.models import Match, MatchInventory
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the seat counters of matches which don't agree with their seats.
+
+    Counters are kept in the same transaction as the seats, but writes which
+    bypass the models (raw SQL, QuerySet.update() or delete() on seats, a
+    seat deleted with its stadium) don't update them, so this is the way to
+    fix the drift. Matches are reconciled `--batch-size` at a time, each
+    batch in a short transaction of its own.
+
+    With `--shards`, the counters of the given matches are split over that
+    many rows, e.g. before a hot match goes on sale.
+    """
+
+    help = 'Rebuild seat counters of matches from their seats.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--match',
+            type=int,
+            action='append',
+            dest='matches',
+            help='Id of a match; all matches when not given. Repeatable.',
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            help='Split the counters of the given matches over that many rows.',
+        )
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+
+        match_ids = options['matches']
+        shards = options['shards']
+
+        if shards is not None:
+
+            if not match_ids or shards < 1:
+                raise CommandError(
+                    '--shards needs at least one --match, and 1 or more rows.'
+                )
+
+            for match_id in match_ids:
+                MatchInventory.objects.set_shards(match_id, shards)
+
+            self.stdout.write(
+                f'Counters of {len(match_ids)} matches are split over '
+                f'{shards} rows'
+            )
+            return
+
+        if match_ids is None:
+            match_ids = list(
+                Match.objects.order_by('pk').values_list('pk', flat=True)
+            )
+
+        batch_size = options['batch_size']
+        drifted = []
+
+        for start in range(0, len(match_ids), batch_size):
+            drifted += MatchInventory.objects.reconcile(
+                match_ids[start:start + batch_size],
+            )
+
+        for match_id in drifted:
+            self.stdout.write(f'Rebuilt counters of match {match_id}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Checked {len(match_ids)} matches, rebuilt {len(drifted)}'
+            )
+        )
@@ -0,0 +1,94 @@
+from time import monotonic, sleep
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+
+from apps.match.models import MatchSeatInfo, IdempotencyKey
+
+
+class Command(BaseCommand):
+    """
+    Release seats which are reserved but not paid in time.
+
+    Without `--loop`, one sweep is done and the command exits, so it can be
+    run by cron. With `--loop`, it's a long-running worker which sweeps every
+    `--interval` seconds; the database is the only state it needs, so several
+    workers can run at the same time without releasing a seat twice.
+    """
+
+    help = 'Release seats which are reserved but not paid in time.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MATCH_SEAT_RELEASE_BATCH_SIZE,
+            help='Maximum number of seats released by one UPDATE.',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep sweeping every --interval seconds.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.MATCH_SEAT_RELEASE_INTERVAL,
+            help='Seconds between two sweeps when --loop is given.',
+        )
+
+    def handle(self, *args, **options):
+
+        batch_size = options['batch_size']
+
+        while True:
+
+            self.sweep(batch_size)
+
+            if not options['loop']:
+                break
+
+            sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        """
+        Release expired holds batch by batch, until fewer than a batch of
+        them are found. A full batch may release fewer seats, when some
+        were paid in the meantime, and more may still be waiting.
+        """
+
+        # All batches of a sweep use the same moment, so holds that expire
+        # during the sweep can't keep it running forever.
+        now = timezone.now()
+        total = 0
+
+        while True:
+
+            start = monotonic()
+            found, released = MatchSeatInfo.objects.release_expired(
+                now=now,
+                batch_size=batch_size,
+            )
+            elapsed = (monotonic() - start) * 1000
+            total += released
+
+            self.stdout.write(
+                f'Released {released} seats in {elapsed:.1f} ms'
+            )
+
+            if found < batch_size:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f'Released {total} seats'))
+
+        # Expired keys are useless; the worker is the place to drop them,
+        # since requests never pay for it.
+        deleted, _ = IdempotencyKey.objects.filter(
+            date_created__lt=now - settings.IDEMPOTENCY_KEY_TTL,
+        ).delete()
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} expired idempotency keys')
+
+        return total
@@ -0,0 +1,114 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.match.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """
+    Seed synthetic stadiums, seats, teams, matches and users.
+
+    The defaults are a full season : 16 teams with a 40000 seat stadium
+    each, 240 matches defined with every seat of their stadium (9.6 million
+    seats for sale) and 200000 users. See apps.match.seeding.Seeder for how
+    it's made fast. Everything is one transaction, so a failed seeding
+    leaves nothing behind.
+    """
+
+    help = 'Seed synthetic data at the scale of a full season.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument('--stadiums', type=int, default=16)
+        parser.add_argument(
+            '--seats',
+            type=int,
+            default=40_000,
+            help='Seats of each stadium.',
+        )
+        parser.add_argument('--teams', type=int, default=16)
+        parser.add_argument('--matches', type=int, default=240)
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument(
+            '--staff',
+            type=int,
+            default=1,
+            help='Staff users, besides --users.',
+        )
+        parser.add_argument(
+            '--password',
+            default='seed12345QQ!!',
+            help='Password of all seeded users.',
+        )
+        parser.add_argument(
+            '--tag',
+            default='seed',
+            help='Prefix of names and emails; must differ between seedings.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+
+        if options['stadiums'] < 1 or options['teams'] < 2:
+            raise CommandError('At least 1 stadium and 2 teams are needed.')
+
+        seeder = Seeder(options['tag'], chunk_size=options['chunk_size'])
+        start = perf_counter()
+
+        with transaction.atomic():
+
+            stadium_ids = self.step(
+                'stadiums',
+                lambda: seeder.stadiums(options['stadiums']),
+            )
+            self.step(
+                'seats',
+                lambda: seeder.seats(stadium_ids, options['seats']),
+            )
+            team_ids = self.step(
+                'teams',
+                lambda: seeder.teams(options['teams']),
+            )
+            match_ids = self.step(
+                'matches',
+                lambda: seeder.matches(
+                    stadium_ids,
+                    team_ids,
+                    options['matches'],
+                ),
+            )
+            self.step(
+                'seats of matches',
+                lambda: seeder.match_seats(match_ids) if match_ids else 0,
+            )
+            self.step(
+                'staff users',
+                lambda: seeder.users(
+                    options['staff'],
+                    options['password'],
+                    staff=True,
+                ),
+            )
+            self.step(
+                'users',
+                lambda: seeder.users(options['users'], options['password']),
+            )
+
+        self.stdout.write(
+            f'Seeded in {perf_counter() - start:.1f} s; users log in as '
+            f'{seeder.user_email(0)} with the given password.'
+        )
+
+    def step(self, name, function):
+
+        start = perf_counter()
+        result = function()
+        number = result if isinstance(result, int) else len(result)
+
+        self.stdout.write(
+            f'Created {number} {name} in {perf_counter() - start:.1f} s'
+        )
+
+        return result
@@ -0,0 +1,214 @@
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from config.slow_queries import JsonLinesFile
+
+
+def _datetime(value):
+
+    if value is None:
+        return None
+
+    parsed = parse_datetime(value)
+    if parsed is None or parsed.tzinfo is None:
+        raise CommandError(
+            f'{value!r} is not an ISO datetime with a timezone.'
+        )
+
+    return parsed
+
+
+def _percentile(durations, percent):
+    return durations[min(int(len(durations) * percent), len(durations) - 1)]
+
+
+def _summarize(records):
+    """
+    Return {fingerprint : stats} of the records, with durations in ms.
+    """
+
+    groups = {}
+
+    for record in records:
+        groups.setdefault(record['fingerprint'], []).append(record)
+
+    summary = {}
+
+    for key, group in groups.items():
+
+        durations = sorted(record['duration'] for record in group)
+        origins = Counter(
+            record['origin'][0] for record in group if record.get('origin')
+        )
+        views = Counter(record['view'] for record in group if record['view'])
+        plans = [record['plan'] for record in group if record.get('plan')]
+
+        summary[key] = {
+            'count': len(group),
+            'total_ms': round(sum(durations), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'p95_ms': _percentile(durations, 0.95),
+            'max_ms': durations[-1],
+            'errors': sum('error' in record for record in group),
+            'origin': origins.most_common(1)[0][0] if origins else None,
+            'view': views.most_common(1)[0][0] if views else None,
+            'sql': group[-1]['sql'],
+            'plan': plans[-1] if plans else None,
+        }
+
+    return summary
+
+
+class Command(BaseCommand):
+    """
+    Summarize the slow query log (see config/slow_queries.py) by statement.
+
+    Statements which only differ by their values have the same fingerprint;
+    for each one, the number of slow runs, their durations, the code and
+    the view they mostly come from, and the latest plan are printed, the
+    statements costing the most time first.
+
+    With `--split`, runs before and after that time (e.g. of a deploy) are
+    compared : statements which weren't slow before, or whose p95 is
+    `--ratio` times what it was, are flagged as regressions.
+    """
+
+    help = 'Summarize the slow query log by statement.'
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            '--path',
+            default=settings.SLOW_QUERIES['PATH'],
+            help='Slow query log (SLOW_QUERIES["PATH"] by default).',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only runs from this ISO datetime on.',
+        )
+        parser.add_argument(
+            '--until',
+            help='Only runs before this ISO datetime.',
+        )
+        parser.add_argument(
+            '--split',
+            help='Compare runs before and after this ISO datetime.',
+        )
+        parser.add_argument(
+            '--ratio',
+            type=float,
+            default=1.5,
+            help='Ratio of p95 after --split to before which is a regression.',
+        )
+        parser.add_argument(
+            '--sort',
+            default='total_ms',
+            choices=('total_ms', 'count', 'mean_ms', 'p95_ms', 'max_ms'),
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Number of statements printed.',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the summary as JSON.',
+        )
+
+    def handle(self, *args, **options):
+
+        self.options = options
+        since, until, split = (
+            _datetime(options[name]) for name in ('since', 'until', 'split')
+        )
+        before, after = [], []
+
+        file = JsonLinesFile(
+            options['path'],
+            settings.SLOW_QUERIES['MAX_BYTES'],
+            settings.SLOW_QUERIES['BACKUP_COUNT'],
+        )
+
+        for record in file.read():
+
+            time = parse_datetime(record['time'])
+            if since is not None and time < since:
+                continue
+            if until is not None and time >= until:
+                continue
+
+            if split is not None and time < split:
+                before.append(record)
+            else:
+                after.append(record)
+
+        summary = _summarize(after)
+        if split is not None:
+            self.compare(summary, _summarize(before))
+
+        statements = sorted(
+            summary.items(),
+            key=lambda item: item[1][options['sort']],
+            reverse=True,
+        )[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(statements), indent=2))
+        else:
+            self.print_summary(statements, len(after))
+
+    def compare(self, summary, previous):
+        """
+        Add the stats of the runs before --split to each statement, and
+        whether it regressed.
+        """
+
+        for key, stats in summary.items():
+
+            old = previous.get(key)
+            stats['before'] = {
+                'count': old['count'], 'p95_ms': old['p95_ms'],
+            } if old else None
+            stats['regression'] = old is None or (
+                stats['p95_ms'] >= old['p95_ms'] * self.options['ratio']
+            )
+
+    def print_summary(self, statements, runs):
+
+        self.stdout.write(
+            f'{runs} slow runs, {len(statements)} statements printed'
+        )
+
+        for key, stats in statements:
+
+            self.stdout.write('')
+            heading = f"{key} : {stats['count']} runs"
+            if stats.get('regression'):
+                heading += ' (regression)'
+            self.stdout.write(
+                self.style.ERROR(heading) if stats.get('regression')
+                else self.style.MIGRATE_HEADING(heading)
+            )
+
+            self.stdout.write(
+                f"  total {stats['total_ms']} ms, mean {stats['mean_ms']} ms, "
+                f"p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms"
+                + (f", {stats['errors']} errors" if stats['errors'] else '')
+            )
+            if 'before' in stats:
+                old = stats['before']
+                self.stdout.write(
+                    f"  before : {old['count']} runs, p95 {old['p95_ms']} ms"
+                    if old else '  before : never slow'
+                )
+            self.stdout.write(f"  view   : {stats['view']}")
+            self.stdout.write(f"  origin : {stats['origin']}")
+            self.stdout.write(f"  sql    : {stats['sql'][:300]}")
+            if stats['plan']:
+                self.stdout.write(f"  plan   : {'; '.join(stats['plan'])}")
@@ -0,0 +1,827 @@
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from random import randrange
+
+from django.apps import apps
+from django.db.models import (
+    QuerySet,
+    F,
+    Q,
+    Count,
+    Sum,
+    Value,
+    OuterRef,
+    Subquery,
+    PositiveBigIntegerField,
+)
+from django.db.models.functions import Coalesce, Mod
+from django.db.models.constants import OnConflict
+from django.db import connections, transaction
+from django.conf import settings
+
+from apps.match.availability import seat_availability
+from config.metrics import metrics
+
+
+@contextmanager
+def write_atomic(using):
+    """
+    transaction.atomic for the hot paths which write seats. With the SQLite
+    backend of config/db_backends, the transaction begins IMMEDIATE, so it
+    waits for the write lock up to busy_timeout instead of failing when it
+    reads before it writes. Other transactions keep the default mode, so
+    read-only ones never take the lock.
+    """
+
+    immediate = getattr(connections[using], 'immediate', nullcontext)
+
+    with immediate(), transaction.atomic(using=using):
+        yield
+
+
+def seat_state(is_reserved, is_paid):
+    """
+    The counter of MatchInventory which a seat in this state is counted in.
+    """
+
+    if not is_reserved:
+        return 'available'
+
+    return 'sold' if is_paid else 'held'
+
+
+class MatchQuerySet(QuerySet):
+
+    def bump_seat_map_version(self, match_ids):
+        """
+        Mark the seat maps of the matches as changed, on the rows of the
+        matches. Changes counted in MatchInventory move the version there
+        instead (see with_seat_map_version).
+
+        It must run in the same transaction as the change of seats, so a
+        client never keeps a version whose seats have changed.
+        """
+
+        return self.filter(pk__in=match_ids).update(
+            seat_map_version=F('seat_map_version') + 1,
+        )
+
+    def with_seat_map_version(self):
+        """
+        Annotate `version`, the version of the seat map of each match : the
+        changes marked on the match itself (bump_seat_map_version) and the
+        ones counted on its inventory rows (MatchInventoryQuerySet.add).
+        Reservations only move the latter, so buyers of a hot match update
+        one of its inventory shards instead of all queuing on its row.
+        """
+
+        counted = apps.get_model('match', 'MatchInventory').objects.filter(
+            match=OuterRef('pk'),
+        ).order_by().values('match').annotate(
+            total=Sum('version'),
+        ).values('total')
+
+        return self.annotate(
+            version=F('seat_map_version') + Coalesce(
+                Subquery(counted),
+                0,
+                output_field=PositiveBigIntegerField(),
+            ),
+        )
+
+    def listing(self):
+        """
+        Matches for the public listing, in the order of Match.Meta.ordering
+        and then by id, so (datetime, id) is a key of the order.
+
+        Stadium and teams are joined in the same query, and only the
+        columns which the listing shows are loaded, so a page is one query
+        whatever its size.
+        """
+
+        return self.select_related(
+            'stadium',
+            'host_team',
+            'guest_team',
+        ).only(
+            'datetime',
+            'stadium__name',
+            'host_team__name',
+            'guest_team__name',
+        ).order_by('-datetime', '-pk')
+
+    def after(self, datetime, pk):
+        """
+        Matches which come after the match with (datetime, pk) in the
+        listing order, i.e. the next page of a keyset pagination. Unlike an
+        OFFSET, the cost doesn't grow with the number of pages before.
+
+        The redundant `datetime <=` lets the database seek the listing index
+        to where the page starts, which it can't do with the OR alone.
+        """
+
+        return self.filter(
+            Q(datetime__lt=datetime) | Q(pk__lt=pk),
+            datetime__lte=datetime,
+        )
+
+
+class PriceTierQuerySet(QuerySet):
+
+    def for_price(self, match_id, price):
+        """
+        Return the tier of the match with the given price, created when
+        the match doesn't have it yet.
+        """
+
+        return self.get_or_create(match_id=match_id, price=price)[0]
+
+    def reprice(self, match_id, price, new_price):
+        """
+        Change a price of the match for all seats which have it.
+
+        It's one UPDATE of the tier, whatever the number of its seats. When
+        the match already has a tier with the new price, seats are moved
+        to it instead, so a match never has two tiers of the same price.
+
+        Returns the tier which has the seats now, or None when the match
+        has no tier with `price`.
+        """
+
+        with transaction.atomic(using=self.db):
+
+            tier = self.filter(match_id=match_id, price=price).first()
+
+            if tier is None or price == new_price:
+                return tier
+
+            target = self.filter(match_id=match_id, price=new_price).first()
+
+            if target is None:
+                self.filter(pk=tier.pk).update(price=new_price)
+                tier.price = new_price
+                target = tier
+
+                self.model.match.field.related_model.objects.using(
+                    self.db,
+                ).bump_seat_map_version((match_id,))
+            else:
+                tier.seats.update(tier=target)
+                tier.delete()
+
+                # Seats moved to another tier, which seat layouts kept for
+                # best available seats must see too.
+                apps.get_model('match', 'MatchSeatInfo').objects.using(
+                    self.db,
+                ).seats_changed((match_id,))
+
+        return target
+
+
+class MatchInventoryQuerySet(QuerySet):
+
+    def add(self, match_id, available=0, held=0, sold=0):
+        """
+        Add to the counters of the match, and move the version of its seat
+        map (see MatchQuerySet.with_seat_map_version).
+
+        It must run in the same transaction as the change of seats. It's
+        one UPDATE of one of the counter rows of the match, picked at
+        random among its `inventory_shards` rows by a subquery, so a hot
+        match doesn't queue all its writers on a single row. When the row
+        isn't there (e.g. the match's first seats, or shards were changed),
+        counters of the match are rebuilt from its seats, which already
+        include the change.
+        """
+
+        Match = self.model.match.field.related_model
+        shards = Match.objects.filter(pk=match_id).values('inventory_shards')
+
+        updated = self.filter(
+            match_id=match_id,
+            shard=Mod(Value(randrange(1 << 16)), Subquery(shards)),
+        ).update(
+            available=F('available') + available,
+            held=F('held') + held,
+            sold=F('sold') + sold,
+            version=F('version') + 1,
+        )
+
+        if not updated:
+            self.reconcile((match_id,))
+
+    def seats_added(self, seats):
+        """
+        Count new seats, given as (match_id, is_reserved, is_paid).
+        """
+
+        counters = {}
+        for match_id, is_reserved, is_paid in seats:
+            counters.setdefault(match_id, Counter())[
+                seat_state(is_reserved, is_paid)
+            ] += 1
+
+        for match_id, counter in counters.items():
+            self.add(match_id, **counter)
+
+    def seat_changed(self, old, new):
+        """
+        Count a seat which was in state `old` and is in state `new` now,
+        both (match_id, is_reserved, is_paid), or None when the seat didn't
+        or doesn't exist.
+        """
+
+        if old == new:
+            return
+
+        counters = {}
+        if old is not None:
+            counters.setdefault(old[0], Counter())[seat_state(*old[1:])] -= 1
+        if new is not None:
+            counters.setdefault(new[0], Counter())[seat_state(*new[1:])] += 1
+
+        for match_id, counter in counters.items():
+            self.add(match_id, **counter)
+
+    def counts(self, match_ids):
+        """
+        Return {match id : {available, held, sold}}; matches which have no
+        counters are left out.
+        """
+
+        rows = self.filter(match_id__in=match_ids).values(
+            'match_id',
+        ).annotate(
+            available_sum=Sum('available'),
+            held_sum=Sum('held'),
+            sold_sum=Sum('sold'),
+        ).order_by()
+
+        return {
+            row['match_id']: {
+                'available': row['available_sum'],
+                'held': row['held_sum'],
+                'sold': row['sold_sum'],
+            }
+            for row in rows
+        }
+
+    def reconcile(self, match_ids=None):
+        """
+        Rebuild the counters of the matches (all matches when None) which
+        don't agree with their seats, or don't have `inventory_shards` rows.
+        All of a match's counts are put in its first row, with the sum of
+        the versions of its rows plus one, so the version of its seat map
+        still moves forward.
+
+        Matches, then their counter rows are locked first. A reservation
+        writes one of those rows after its seats (see add), so on databases
+        with row locks, it either commits before the seats are counted, or
+        waits and then finds its row gone and rebuilds the counters itself.
+        SQLite locks the whole database for the writes anyway.
+
+        Returns the sorted ids of matches whose counters were rebuilt.
+        """
+
+        Match = self.model.match.field.related_model
+        MatchSeatInfo = apps.get_model('match', 'MatchSeatInfo')
+
+        matches = Match.objects.using(self.db).select_for_update()
+        if match_ids is not None:
+            matches = matches.filter(pk__in=match_ids)
+
+        with transaction.atomic(using=self.db):
+
+            shards_of = dict(
+                matches.order_by().values_list('pk', 'inventory_shards')
+            )
+            if connections[self.db].features.has_select_for_update:
+                list(
+                    self.select_for_update().filter(
+                        match_id__in=shards_of,
+                    ).values_list('pk', flat=True)
+                )
+
+            seats = MatchSeatInfo.objects.using(self.db).filter(
+                match_id__in=shards_of,
+            ).values('match_id').annotate(
+                available=Count('pk', filter=Q(is_reserved=False)),
+                held=Count('pk', filter=Q(is_reserved=True, is_paid=False)),
+                sold=Count('pk', filter=Q(is_paid=True)),
+            ).order_by()
+            expected = {
+                row['match_id']: (row['available'], row['held'], row['sold'])
+                for row in seats
+            }
+
+            rows = self.filter(match_id__in=shards_of).values(
+                'match_id',
+            ).annotate(
+                shards=Count('pk'),
+                available_sum=Sum('available'),
+                held_sum=Sum('held'),
+                sold_sum=Sum('sold'),
+                version_sum=Sum('version'),
+            ).order_by()
+            versions = {row['match_id']: row['version_sum'] for row in rows}
+            actual = {
+                row['match_id']: (
+                    row['available_sum'], row['held_sum'], row['sold_sum'],
+                    row['shards'],
+                )
+                for row in rows
+            }
+
+            drifted = sorted(
+                match_id for match_id, shards in shards_of.items()
+                if actual.get(match_id) !=
+                (*expected.get(match_id, (0, 0, 0)), max(shards, 1))
+            )
+
+            self.filter(match_id__in=drifted).delete()
+            self.bulk_create(
+                self.model(
+                    match_id=match_id,
+                    shard=shard,
+                    **(
+                        dict(
+                            zip(
+                                ('available', 'held', 'sold'),
+                                expected.get(match_id, (0, 0, 0)),
+                            ),
+                            version=versions.get(match_id, 0) + 1,
+                        )
+                        if shard == 0 else {}
+                    ),
+                )
+                for match_id in drifted
+                for shard in range(max(shards_of[match_id], 1))
+            )
+
+        return drifted
+
+    def set_shards(self, match_id, shards):
+        """
+        Split the counters of the match over `shards` rows.
+        """
+
+        Match = self.model.match.field.related_model
+
+        with transaction.atomic(using=self.db):
+            Match.objects.using(self.db).filter(pk=match_id).update(
+                inventory_shards=shards,
+            )
+            self.reconcile((match_id,))
+
+
+class MatchSeatInfoQuerySet(QuerySet):
+
+    def inventory(self):
+        return apps.get_model('match', 'MatchInventory').objects.using(
+            self.db,
+        )
+
+    def seats_changed(self, match_ids, freed=True, counted=False):
+        """
+        Must be called whenever seats of the matches change.
+
+        `freed` tells if seats may have been freed or defined, in which case
+        availability bitmaps of the matches are rebuilt; otherwise seats
+        were only taken, which bitmaps learn incrementally.
+
+        `counted` tells if the change was counted with
+        MatchInventoryQuerySet.add, which moves the version of the seat
+        maps already; otherwise it's moved on the rows of the matches.
+        """
+
+        match_ids = set(match_ids)
+
+        if not counted:
+            self.model.match.field.related_model.objects.using(
+                self.db,
+            ).bump_seat_map_version(match_ids)
+
+        if freed:
+            seat_availability.invalidate(match_ids, using=self.db)
+
+    def reserve(self, match_id, seats, buyer_id, now):
+        """
+        Reserve the given seats of a match for the buyer.
+
+        The reservation is a single conditional UPDATE which only touches
+        seats that are still free, so two buyers racing for the same seat
+        can't both win: the database decides. If fewer rows than requested
+        were updated, the whole reservation is rolled back.
+
+        Seats are first checked against the availability bitmap of the
+        match, so seats which are surely taken are rejected without any
+        query; the bitmap learns about the others from the result.
+
+        Returns a tuple of two sorted lists of seat ids:
+            - seats which are not defined for the match at all
+            - seats which were already reserved by someone else
+        Both of them are empty when the reservation succeeded.
+        """
+
+        seats = set(seats)
+
+        undefined, lost = seat_availability.check(
+            match_id,
+            seats,
+            using=self.db,
+        )
+        if undefined or lost:
+            if lost:
+                metrics.inc('match_reservation_conflicts_total')
+            return undefined, lost
+
+        with write_atomic(self.db):
+
+            reserved_number = self.filter(
+                match_id=match_id,
+                seat_id__in=seats,
+                is_reserved=False,
+            ).update(
+                is_reserved=True,
+                buyer_id=buyer_id,
+                date_reserved=now,
+            )
+
+            if reserved_number == len(seats):
+                self.seats_changed((match_id,), freed=False, counted=True)
+                self.inventory().add(
+                    match_id,
+                    available=-reserved_number,
+                    held=reserved_number,
+                )
+                transaction.on_commit(
+                    lambda: seat_availability.mark_reserved(
+                        match_id,
+                        seats,
+                        using=self.db,
+                    ),
+                    using=self.db,
+                )
+                transaction.on_commit(
+                    lambda: metrics.inc(
+                        'match_seats_reserved_total',
+                        reserved_number,
+                    ),
+                    using=self.db,
+                )
+                return [], []
+
+            # Only the failure path pays for this query. Rows stamped with
+            # our buyer and reservation date are the ones we just won.
+            rows = self.filter(
+                match_id=match_id,
+                seat_id__in=seats,
+            ).values_list('seat_id', 'buyer_id', 'date_reserved')
+
+            defined = set()
+            won = set()
+            for seat_id, row_buyer_id, date_reserved in rows:
+                defined.add(seat_id)
+                if row_buyer_id == buyer_id and date_reserved == now:
+                    won.add(seat_id)
+
+            transaction.set_rollback(True, using=self.db)
+
+        lost = defined - won
+        seat_availability.mark_reserved(match_id, lost, using=self.db)
+        if lost:
+            metrics.inc('match_reservation_conflicts_total')
+
+        return sorted(seats - defined), sorted(lost)
+
+    def expired(self, now):
+        """
+        Seats which are reserved but not paid, and their hold is over.
+        """
+
+        return self.filter(
+            is_reserved=True,
+            is_paid=False,
+            date_reserved__lt=now - settings.MATCH_SEAT_HOLD_TTL,
+        )
+
+    def held(self, now):
+        """
+        Seats which are reserved but not paid, and their hold is still valid.
+        """
+
+        return self.filter(
+            is_reserved=True,
+            is_paid=False,
+            date_reserved__gte=now - settings.MATCH_SEAT_HOLD_TTL,
+        )
+
+    def confirm(self, match_id, buyer_id, now):
+        """
+        Mark all valid holds of the buyer for a match as paid.
+
+        The transition is one conditional UPDATE for all seats, not a lock
+        per seat. Conditions are repeated on the UPDATE, so a hold released
+        between the two statements is never paid. Confirming twice is
+        harmless : the second call finds nothing to confirm.
+
+        Returns the sorted list of seat ids which were confirmed.
+        """
+
+        held = self.held(now).filter(match_id=match_id, buyer_id=buyer_id)
+
+        with write_atomic(self.db):
+
+            seats = list(held.values_list('seat_id', flat=True))
+
+            if not seats:
+                return []
+
+            confirmed_number = held.filter(seat_id__in=seats).update(
+                is_paid=True,
+            )
+
+            self.seats_changed((match_id,), freed=False, counted=True)
+            self.inventory().add(
+                match_id,
+                held=-confirmed_number,
+                sold=confirmed_number,
+            )
+            transaction.on_commit(
+                lambda: metrics.inc(
+                    'match_seats_paid_total',
+                    confirmed_number,
+                ),
+                using=self.db,
+            )
+
+            if confirmed_number != len(seats):
+                # Some holds were released in the meantime, so the paid
+                # ones are read back to return exactly what was confirmed.
+                seats = list(
+                    self.filter(
+                        match_id=match_id,
+                        buyer_id=buyer_id,
+                        seat_id__in=seats,
+                        is_paid=True,
+                    ).values_list('seat_id', flat=True)
+                )
+
+        return sorted(seats)
+
+    def release_expired(self, now, batch_size):
+        """
+        Release at most `batch_size` expired holds, the oldest first.
+
+        Target rows are picked by a LIMITed query ordered on `date_reserved`,
+        so it's served by the partial index on unpaid holds and never scans
+        the whole table; then they are released by one UPDATE per match on
+        their primary keys, which tells how many seats each match got back.
+        Conditions are repeated on the UPDATE, so a seat paid in the
+        meantime is never released.
+
+        Returns (number of expired holds found, number of released seats);
+        fewer seats are released than found when some were paid or
+        reserved again in the meantime.
+        """
+
+        expired = self.expired(now)
+        batch = list(
+            expired.order_by('date_reserved').values_list(
+                'pk',
+                'match_id',
+            )[:batch_size]
+        )
+
+        if not batch:
+            return 0, 0
+
+        pks_of = {}
+        for pk, match_id in batch:
+            pks_of.setdefault(match_id, []).append(pk)
+
+        released_number = 0
+
+        with write_atomic(self.db):
+
+            changed = set()
+
+            for match_id, pks in pks_of.items():
+
+                released = expired.filter(pk__in=pks).update(
+                    is_reserved=False,
+                    buyer=None,
+                    date_reserved=None,
+                )
+
+                if released:
+                    self.inventory().add(
+                        match_id,
+                        available=released,
+                        held=-released,
+                    )
+                    changed.add(match_id)
+                released_number += released
+
+            self.seats_changed(changed, counted=True)
+            transaction.on_commit(
+                lambda: metrics.inc(
+                    'match_seats_released_total',
+                    released_number,
+                ),
+                using=self.db,
+            )
+
+        return len(batch), released_number
+
+    def define_stadium_seats(self, match, price, section=None):
+        """
+        Define all seats of the stadium of the match, or of one section of
+        it, with the given price.
+
+        It's a single INSERT ... SELECT from the seats of the stadium, so
+        the rows are never built in Python, whatever the size of stadium.
+        Seats which are already defined for the match are skipped, e.g.
+        to price a section first and then the rest of the stadium.
+
+        Returns the number of defined seats.
+        """
+
+        with transaction.atomic(using=self.db):
+            return self._insert_stadium_seats(match, price, section=section)
+
+    def define_seats(self, match, price, seats):
+        """
+        Define the given seats of the match with the given price.
+
+        Like define_stadium_seats, it's one INSERT ... SELECT which ignores
+        seats that are already defined instead of looking for them first :
+        the unique constraint of (match, seat) decides, even for two admins
+        racing. Only seats of the stadium of the match are inserted, so the
+        seats which are neither inserted nor defined are looked up on that
+        failure path only.
+
+        Returns a tuple of two sorted lists of seat ids:
+            - seats which were already defined for the match
+            - seats which aren't seats of the stadium of the match
+        When the second one isn't empty, nothing is defined.
+        """
+
+        seats = set(seats)
+
+        with transaction.atomic(using=self.db):
+
+            inserted = self._insert_stadium_seats(match, price, seats=seats)
+
+            if len(inserted) == len(seats):
+                return [], []
+
+            existing = set(
+                self.filter(
+                    match_id=match.pk,
+                    seat_id__in=seats - inserted,
+                ).values_list('seat_id', flat=True)
+            )
+            foreign = seats - inserted - existing
+
+            if foreign:
+                transaction.set_rollback(True, using=self.db)
+
+        return sorted(existing), sorted(foreign)
+
+    def _insert_stadium_seats(self, match, price, section=None, seats=None):
+        """
+        Insert seats of the stadium of the match, of a section or with the
+        given ids, with the tier of the price; seats which are already
+        defined are skipped. It must run in a transaction.
+
+        Returns the set of inserted seat ids when `seats` is given, and
+        only their number otherwise, so a whole stadium isn't sent back.
+        They come from RETURNING where the database has it; elsewhere (e.g.
+        SQLite before 3.35) the defined seats are read before and after the
+        INSERT, in the same transaction.
+        """
+
+        Seat = self.model.seat.field.related_model
+        PriceTier = self.model.tier.field.related_model
+        connection = connections[self.db]
+        ops = connection.ops
+        quote_name = ops.quote_name
+
+        def column(model, name):
+            return quote_name(model._meta.get_field(name).column)
+
+        table = quote_name(self.model._meta.db_table)
+        fields = [
+            self.model._meta.get_field(name) for name in
+            ('match', 'seat', 'tier', 'is_reserved', 'is_paid')
+        ]
+        columns = ', '.join(quote_name(field.column) for field in fields)
+        seat_id = f's.{column(Seat, "id")}'
+
+        tier, created = PriceTier.objects.using(self.db).get_or_create(
+            match_id=match.pk,
+            price=price,
+        )
+        params = [match.pk, tier.pk, False, False, match.stadium_id]
+
+        sql = (
+            f'{ops.insert_statement(on_conflict=OnConflict.IGNORE)} '
+            f'{table} ({columns}) '
+            f'SELECT %s, {seat_id}, %s, %s, %s '
+            f'FROM {quote_name(Seat._meta.db_table)} s '
+            f'WHERE s.{column(Seat, "stadium")} = %s '
+        )
+        if section is not None:
+            sql += f'AND s.{column(Seat, "section")} = %s '
+            params.append(section)
+        if seats is not None:
+            sql += f'AND {seat_id} IN ({", ".join(["%s"] * len(seats))}) '
+            params += seats
+        # NOT EXISTS skips defined seats before they reach the index; the
+        # conflict clause covers seats defined concurrently.
+        sql += (
+            f'AND NOT EXISTS (SELECT 1 FROM {table} i '
+            f'WHERE i.{column(self.model, "match")} = %s '
+            f'AND i.{column(self.model, "seat")} = {seat_id}) '
+        )
+        sql += ops.on_conflict_suffix_sql(
+            fields,
+            OnConflict.IGNORE,
+            None,
+            None,
+        )
+        params.append(match.pk)
+
+        returning = connection.features.can_return_rows_from_bulk_insert
+        if seats is not None and returning:
+            sql += f' RETURNING {column(self.model, "seat")}'
+
+        # Without RETURNING, inserted seats are the ones defined after the
+        # INSERT but not before.
+        read_back = seats is not None and not returning
+        defined = self.filter(match_id=match.pk, seat_id__in=seats or ())
+        if read_back:
+            before = set(defined.values_list('seat_id', flat=True))
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if seats is None or read_back:
+                inserted = number = cursor.rowcount
+            else:
+                inserted = {row[0] for row in cursor.fetchall()}
+                number = len(inserted)
+
+        if read_back:
+            inserted = set()
+            if number:
+                inserted = set(defined.values_list('seat_id', flat=True))
+                inserted -= before
+
+        if number:
+            self.seats_changed((match.pk,))
+            self.inventory().add(match.pk, available=number)
+        elif created:
+            # Don't leave a new tier without seats behind.
+            tier.delete()
+
+        return inserted
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Seats which were given a price instead of a tier get the tier of
+        their price, with one lookup per distinct price.
+        """
+
+        PriceTier = self.model.tier.field.related_model
+        objs = list(objs)
+
+        with transaction.atomic(using=self.db):
+
+            tiers = {}
+            for obj in objs:
+                if obj._new_price is None:
+                    continue
+                key = (obj.match_id, obj._new_price)
+                if key not in tiers:
+                    tiers[key] = PriceTier.objects.using(self.db).for_price(
+                        *key,
+                    )
+                obj.tier = tiers[key]
+                obj._new_price = None
+
+            objs = super().bulk_create(objs, *args, **kwargs)
+            match_ids = {obj.match_id for obj in objs}
+            self.seats_changed(match_ids)
+
+            if kwargs.get('ignore_conflicts'):
+                # Which of the objects were inserted isn't known, so the
+                # counters are rebuilt instead.
+                self.inventory().reconcile(match_ids)
+            else:
+                self.inventory().seats_added(
+                    (obj.match_id, obj.is_reserved, obj.is_paid)
+                    for obj in objs
+                )
+
+        return objs
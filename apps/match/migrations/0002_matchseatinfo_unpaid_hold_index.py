@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(condition=models.Q(('is_paid', False), ('is_reserved', True)), fields=['date_reserved'], name='match_seat_unpaid_hold_idx'),
+        ),
+    ]
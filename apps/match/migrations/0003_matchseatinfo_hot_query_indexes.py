@@ -0,0 +1,54 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:03
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('match', '0002_matchseatinfo_unpaid_hold_index'),
+    ]
+
+    operations = [
+        # Only the single column indexes are dropped; AlterField would make
+        # SQLite rebuild the whole table for a change of db_index.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='matchseatinfo',
+                    name='buyer',
+                    field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bought_seats', to=settings.AUTH_USER_MODEL, verbose_name='buyer'),
+                ),
+                migrations.AlterField(
+                    model_name='matchseatinfo',
+                    name='match',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='match_seats_info', to='match.match', verbose_name='match'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    sql='DROP INDEX IF EXISTS "match_matchseatinfo_buyer_id_8ab0b693";',
+                    reverse_sql='CREATE INDEX "match_matchseatinfo_buyer_id_8ab0b693" ON "match_matchseatinfo" ("buyer_id");',
+                ),
+                migrations.RunSQL(
+                    sql='DROP INDEX IF EXISTS "match_matchseatinfo_match_id_35042315";',
+                    reverse_sql='CREATE INDEX "match_matchseatinfo_match_id_35042315" ON "match_matchseatinfo" ("match_id");',
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(fields=['match', 'seat', 'is_reserved', 'is_paid', 'price'], name='match_seat_availability_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(condition=models.Q(('is_reserved', False)), fields=['match', 'seat', 'is_reserved'], name='match_seat_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(fields=['buyer', 'match'], name='match_seat_buyer_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0003_matchseatinfo_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='seat_map_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Increased whenever a seat of the match changes. It is the ETag of the seat map.', verbose_name='seat map version'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def tiers_from_prices(apps, schema_editor):
+    """
+    Create a tier for every distinct price of each match, and point seats
+    to the tier of their price : one UPDATE per tier, not per seat.
+    """
+
+    MatchSeatInfo = apps.get_model('match', 'MatchSeatInfo')
+    PriceTier = apps.get_model('match', 'PriceTier')
+    db = schema_editor.connection.alias
+
+    seats = MatchSeatInfo.objects.using(db)
+    PriceTier.objects.using(db).bulk_create(
+        PriceTier(match_id=match_id, price=price)
+        for match_id, price in seats.values_list(
+            'match_id',
+            'price',
+        ).order_by().distinct()
+    )
+
+    for tier_id, match_id, price in PriceTier.objects.using(db).values_list(
+        'pk',
+        'match_id',
+        'price',
+    ):
+        seats.filter(match_id=match_id, price=price).update(tier_id=tier_id)
+
+
+def prices_from_tiers(apps, schema_editor):
+
+    MatchSeatInfo = apps.get_model('match', 'MatchSeatInfo')
+    PriceTier = apps.get_model('match', 'PriceTier')
+    db = schema_editor.connection.alias
+
+    seats = MatchSeatInfo.objects.using(db)
+
+    for tier_id, price in PriceTier.objects.using(db).values_list(
+        'pk',
+        'price',
+    ):
+        seats.filter(tier_id=tier_id).update(price=price)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.PositiveBigIntegerField(verbose_name='price')),
+                ('match', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_tiers', to='match.match', verbose_name='match')),
+            ],
+            options={
+                'verbose_name': 'price tier',
+                'verbose_name_plural': 'price tiers',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pricetier',
+            constraint=models.UniqueConstraint(fields=('match', 'price'), name='unique_price_tier_match_price'),
+        ),
+        # Nullable until existing seats get their tier, and `price` stays
+        # nullable on the way back for the same reason.
+        migrations.AddField(
+            model_name='matchseatinfo',
+            name='tier',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='seats', to='match.pricetier', verbose_name='price tier'),
+        ),
+        migrations.AlterField(
+            model_name='matchseatinfo',
+            name='price',
+            field=models.PositiveBigIntegerField(null=True, verbose_name='price'),
+        ),
+        migrations.RunPython(tiers_from_prices, prices_from_tiers),
+        migrations.RemoveIndex(
+            model_name='matchseatinfo',
+            name='match_seat_availability_idx',
+        ),
+        migrations.RemoveField(
+            model_name='matchseatinfo',
+            name='price',
+        ),
+        migrations.AlterField(
+            model_name='matchseatinfo',
+            name='tier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='seats', to='match.pricetier', verbose_name='price tier'),
+        ),
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(fields=['match', 'seat', 'is_reserved', 'is_paid', 'tier'], name='match_seat_availability_idx'),
+        ),
+    ]
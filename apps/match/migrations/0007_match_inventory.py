@@ -0,0 +1,76 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:52
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_seats(apps, schema_editor):
+    """
+    One counter row per existing match, counted from its seats.
+    """
+
+    Match = apps.get_model('match', 'Match')
+    MatchInventory = apps.get_model('match', 'MatchInventory')
+    MatchSeatInfo = apps.get_model('match', 'MatchSeatInfo')
+    db = schema_editor.connection.alias
+
+    counts = {
+        row['match_id']: row
+        for row in MatchSeatInfo.objects.using(db).values(
+            'match_id',
+        ).annotate(
+            available=models.Count('pk', filter=models.Q(is_reserved=False)),
+            held=models.Count(
+                'pk',
+                filter=models.Q(is_reserved=True, is_paid=False),
+            ),
+            sold=models.Count('pk', filter=models.Q(is_paid=True)),
+        ).order_by()
+    }
+
+    MatchInventory.objects.using(db).bulk_create(
+        MatchInventory(
+            match_id=match_id,
+            shard=0,
+            available=counts.get(match_id, {}).get('available', 0),
+            held=counts.get(match_id, {}).get('held', 0),
+            sold=counts.get(match_id, {}).get('sold', 0),
+        )
+        for match_id in Match.objects.using(db).values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0006_price_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='inventory_shards',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Number of rows the seat counters of the match are split over. More rows let more buyers of a hot match write at the same time.', validators=[django.core.validators.MinValueValidator(1)], verbose_name='inventory shards'),
+        ),
+        migrations.CreateModel(
+            name='MatchInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(default=0, verbose_name='shard')),
+                ('available', models.IntegerField(default=0, verbose_name='available')),
+                ('held', models.IntegerField(default=0, verbose_name='held')),
+                ('sold', models.IntegerField(default=0, verbose_name='sold')),
+                ('match', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='match.match', verbose_name='match')),
+            ],
+            options={
+                'verbose_name': 'match inventory',
+                'verbose_name_plural': 'match inventories',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='matchinventory',
+            constraint=models.UniqueConstraint(fields=('match', 'shard'), name='unique_inventory_match_shard'),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0007_match_inventory'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['-datetime', '-id'], name='match_listing_idx'),
+        ),
+    ]
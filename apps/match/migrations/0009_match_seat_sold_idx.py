@@ -0,0 +1,17 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0008_match_listing_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchseatinfo',
+            index=models.Index(condition=models.Q(('is_paid', True)), fields=['match', 'seat'], name='match_seat_sold_idx'),
+        ),
+    ]
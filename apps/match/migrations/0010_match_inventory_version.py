@@ -0,0 +1,23 @@
+# Generated by Django 4.1.1 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('match', '0009_match_seat_sold_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchinventory',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='version'),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='seat_map_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Increased when seats of the match change, except changes counted on its inventory rows, which have their own versions. Together they are the ETag of the seat map.', verbose_name='seat map version'),
+        ),
+    ]
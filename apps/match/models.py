@@ -1,17 +1,31 @@
 from django.db.models import (
     Model,
-    DateTimeField, PositiveBigIntegerField, BooleanField,
+    CharField, DateTimeField, JSONField,
+    IntegerField, PositiveBigIntegerField, PositiveSmallIntegerField,
+    BooleanField,
     ForeignKey,
     ManyToManyField,
     UniqueConstraint,
+    Index,
+    Q,
     CASCADE,
+    RESTRICT,
 )
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
+from django.db import transaction
 
 from apps.stadium.models import Stadium, Seat
 from apps.team.models import Team
+from apps.match.managers import (
+    MatchQuerySet,
+    MatchInventoryQuerySet,
+    MatchSeatInfoQuerySet,
+    PriceTierQuerySet,
+)
 
 
 class Match(Model):
@@ -41,6 +55,29 @@ class Match(Model):
         verbose_name=(_('seats')),
     )
     datetime = DateTimeField(_('datetime'))
+    seat_map_version = PositiveBigIntegerField(
+        _('seat map version'),
+        default=0,
+        editable=False,
+        help_text=_(
+            'Increased when seats of the match change, except changes '
+            'counted on its inventory rows, which have their own versions. '
+            'Together they are the ETag of the seat map.'
+        ),
+    )
+
+    inventory_shards = PositiveSmallIntegerField(
+        _('inventory shards'),
+        default=1,
+        validators=(MinValueValidator(1),),
+        help_text=_(
+            'Number of rows the seat counters of the match are split over. '
+            'More rows let more buyers of a hot match write at the same '
+            'time.'
+        ),
+    )
+
+    objects = MatchQuerySet.as_manager()
 
     def __str__(self):
         return f'Host : {self.host_team.name}, Guest : {self.guest_team.name}'
@@ -55,6 +92,13 @@ class Match(Model):
                 name='unique_match_stadium_datetime'
             ),
         )
+        indexes = (
+            # Keyset pagination of the listing, see MatchQuerySet.listing.
+            Index(
+                fields=('-datetime', '-id'),
+                name='match_listing_idx',
+            ),
+        )
 
     def clean(self):
 
@@ -69,13 +113,102 @@ class Match(Model):
             raise ValidationError(_("Both teams can't be same"))
 
 
+class PriceTier(Model):
+    """
+    A price of a match. Seats of the match refer to the tier of their price,
+    so changing a price is one UPDATE of a tier, not of all its seats, and
+    seat maps carry every price once.
+    """
+
+    match = ForeignKey(
+        Match,
+        on_delete=CASCADE,
+        related_name='price_tiers',
+        verbose_name=_('match'),
+        db_index=False,
+    )
+    price = PositiveBigIntegerField(_('price'))
+
+    objects = PriceTierQuerySet.as_manager()
+
+    def __str__(self):
+        return f'Match : {self.match}, Price : {self.price}'
+
+    def save(self, *args, **kwargs):
+
+        # A new tier has no seats yet, so seat maps only change on updates.
+        adding = self._state.adding
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if not adding:
+                Match.objects.using(self._state.db).bump_seat_map_version(
+                    (self.match_id,),
+                )
+
+    class Meta:
+        verbose_name = _('price tier')
+        verbose_name_plural = _('price tiers')
+        constraints = (
+            UniqueConstraint(
+                fields=('match', 'price'),
+                name='unique_price_tier_match_price'
+            ),
+        )
+
+
+class MatchInventory(Model):
+    """
+    Counters of the seats of a match by state, so "how many seats are left"
+    is a lookup instead of a COUNT over the seats. They are changed in the
+    same transaction as the seats (see MatchInventoryQuerySet.add).
+
+    A match has `Match.inventory_shards` rows and a change goes to one of
+    them, so the counters of a match are the sums of its rows; a row alone
+    means nothing and may even be negative. `version` counts the changes
+    of a row, for the version of the seat map of the match (see
+    MatchQuerySet.with_seat_map_version).
+    """
+
+    match = ForeignKey(
+        Match,
+        on_delete=CASCADE,
+        related_name='inventory',
+        verbose_name=_('match'),
+        db_index=False,
+    )
+    shard = PositiveSmallIntegerField(_('shard'), default=0)
+    available = IntegerField(_('available'), default=0)
+    held = IntegerField(_('held'), default=0)
+    sold = IntegerField(_('sold'), default=0)
+    version = PositiveBigIntegerField(_('version'), default=0)
+
+    objects = MatchInventoryQuerySet.as_manager()
+
+    def __str__(self):
+        return f'Match : {self.match}, Shard : {self.shard}'
+
+    class Meta:
+        verbose_name = _('match inventory')
+        verbose_name_plural = _('match inventories')
+        constraints = (
+            UniqueConstraint(
+                fields=('match', 'shard'),
+                name='unique_inventory_match_shard'
+            ),
+        )
+
+
 class MatchSeatInfo(Model):
 
+    # `match` and `buyer` don't get an index of their own, since they are
+    # prefixes of `unique_info_match_seat` and `match_seat_buyer_idx`.
     match = ForeignKey(
         Match,
         on_delete=CASCADE,
         related_name='match_seats_info',
-        verbose_name=_('match')
+        verbose_name=_('match'),
+        db_index=False,
     )
     seat = ForeignKey(
         Seat,
@@ -83,7 +216,12 @@ class MatchSeatInfo(Model):
         related_name='match_seats_info',
         verbose_name=_('seat')
     )
-    price = PositiveBigIntegerField(_('price'))
+    tier = ForeignKey(
+        PriceTier,
+        on_delete=RESTRICT,
+        related_name='seats',
+        verbose_name=_('price tier'),
+    )
 
     buyer = ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -92,6 +230,7 @@ class MatchSeatInfo(Model):
         verbose_name=_('buyer'),
         null=True,
         blank=True,
+        db_index=False,
     )
     is_reserved = BooleanField(
         _('reserved status'),
@@ -105,9 +244,90 @@ class MatchSeatInfo(Model):
     )
     date_reserved = DateTimeField(_('date reserved'), null=True, blank=True)
 
+    objects = MatchSeatInfoQuerySet.as_manager()
+
+    # Price given to the seat, until save() finds its tier.
+    _new_price = None
+
+    OTHER_MATCH_TIER = _('Price tier of this seat is of another match.')
+
     def __str__(self):
         return f'Match : {self.match}, Code : {self.seat.code}'
 
+    @property
+    def price(self):
+        """
+        Price of the seat, i.e. of its tier.
+
+        It can be set like a field, e.g. MatchSeatInfo(price=4500) : the
+        seat gets the tier of the match with this price on save, and the
+        tier is created when the match doesn't have it yet.
+        """
+
+        if self._new_price is not None:
+            return self._new_price
+
+        return self.tier.price
+
+    @price.setter
+    def price(self, price):
+        self._new_price = price
+
+    def stored_state(self, using):
+        """
+        (match_id, is_reserved, is_paid) of the seat in the database, or
+        None when it isn't there.
+        """
+
+        if self.pk is None:
+            return None
+
+        return MatchSeatInfo.objects.using(using).filter(
+            pk=self.pk,
+        ).values_list('match_id', 'is_reserved', 'is_paid').first()
+
+    def save(self, *args, **kwargs):
+
+        using = kwargs.get('using') or self._state.db
+
+        with transaction.atomic(using=using):
+            if self._new_price is not None:
+                self.tier = PriceTier.objects.using(using).for_price(
+                    self.match_id,
+                    self._new_price,
+                )
+                self._new_price = None
+            elif self.tier_id is not None and (
+                self.tier.match_id != self.match_id
+            ):
+                raise ValueError(self.OTHER_MATCH_TIER)
+            old = None if self._state.adding else self.stored_state(using)
+            super().save(*args, **kwargs)
+            MatchSeatInfo.objects.using(self._state.db).seats_changed(
+                (self.match_id,),
+            )
+            MatchInventory.objects.using(self._state.db).seat_changed(
+                old,
+                (self.match_id, self.is_reserved, self.is_paid),
+            )
+
+    def delete(self, *args, **kwargs):
+
+        using = kwargs.get('using') or self._state.db
+
+        with transaction.atomic(using=using):
+            old = self.stored_state(using)
+            result = super().delete(*args, **kwargs)
+            MatchSeatInfo.objects.using(self._state.db).seats_changed(
+                (self.match_id,),
+            )
+            MatchInventory.objects.using(self._state.db).seat_changed(
+                old,
+                None,
+            )
+
+        return result
+
     class Meta:
         verbose_name = _('match seat info')
         verbose_name_plural = _('match seats info')
@@ -117,6 +337,41 @@ class MatchSeatInfo(Model):
                 name='unique_info_match_seat'
             ),
         )
+        indexes = (
+            # Holds all columns which are read by availability lookups and
+            # the seat map of a match, so they never touch the table itself.
+            Index(
+                fields=('match', 'seat', 'is_reserved', 'is_paid', 'tier'),
+                name='match_seat_availability_idx',
+            ),
+            # Only free seats are indexed, so counting or picking the free
+            # seats of a match doesn't walk over the sold ones. SQLite needs
+            # `is_reserved` among the columns to use it as a covering index.
+            Index(
+                fields=('match', 'seat', 'is_reserved'),
+                condition=Q(is_reserved=False),
+                name='match_seat_available_idx',
+            ),
+            # Only unpaid holds are indexed, so releasing expired seats is
+            # a range scan over a small index, whatever the size of table.
+            Index(
+                fields=('date_reserved',),
+                condition=Q(is_reserved=True, is_paid=False),
+                name='match_seat_unpaid_hold_idx',
+            ),
+            # Seats of a user for a match, e.g. at checkout.
+            Index(
+                fields=('buyer', 'match'),
+                name='match_seat_buyer_idx',
+            ),
+            # Only sold seats are indexed, for the admin filter of sold
+            # seats, in the order of its changelist.
+            Index(
+                fields=('match', 'seat'),
+                condition=Q(is_paid=True),
+                name='match_seat_sold_idx',
+            ),
+        )
 
     def clean(self):
 
@@ -135,6 +390,14 @@ class MatchSeatInfo(Model):
                     f'with this code: {self.seat.code}')
                 )
 
+        if (
+            self._new_price is None and
+            hasattr(self, 'match') and
+            hasattr(self, 'tier') and
+            self.tier.match_id != self.match_id
+        ):
+            raise ValidationError(self.OTHER_MATCH_TIER)
+
         if self.is_reserved and not self.date_reserved:
             raise ValidationError(
                 _("Can't reserve without date of reservation !")
@@ -147,3 +410,58 @@ class MatchSeatInfo(Model):
 
         if self.is_paid and not self.is_reserved:
             raise ValidationError(_("Can't be paid without reserving !"))
+
+
+class IdempotencyKey(Model):
+    """
+    The first response of a request which was sent with an Idempotency-Key
+    header. Retries of the request with the same key get this response back,
+    without running the request again (see apps/match/idempotency.py).
+
+    `status_code` is empty while the first request is still running.
+    """
+
+    user = ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=CASCADE,
+        related_name='idempotency_keys',
+        verbose_name=_('user'),
+        db_index=False,
+    )
+    key = CharField(_('key'), max_length=255)
+    fingerprint = CharField(
+        _('fingerprint'),
+        max_length=64,
+        help_text=_('Hash of the method, path and body of the request.'),
+    )
+    status_code = PositiveSmallIntegerField(
+        _('status code'),
+        null=True,
+        blank=True,
+    )
+    response = JSONField(
+        _('response'),
+        encoder=DjangoJSONEncoder,
+        null=True,
+        blank=True,
+    )
+    date_created = DateTimeField(_('date created'), auto_now_add=True)
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        verbose_name = _('idempotency key')
+        verbose_name_plural = _('idempotency keys')
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'key'),
+                name='unique_idempotency_key_user_key'
+            ),
+        )
+        indexes = (
+            Index(
+                fields=('date_created',),
+                name='idempotency_key_created_idx',
+            ),
+        )
@@ -0,0 +1,31 @@
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.permissions import BasePermission
+
+from apps.match import admission
+
+
+class IsAdmitted(BasePermission):
+    """
+    Allows access only to users admitted from the queue of the match,
+    when the waiting room (MATCH_ADMISSION setting) is enabled.
+    """
+
+    message = _('Join the queue of the match and wait to be admitted.')
+
+    def has_permission(self, request, view):
+
+        if not admission.is_enabled():
+            return True
+
+        match_id = view.kwargs['match_id']
+        user_id = admission.read_ticket(
+            request.headers.get(admission.HEADER),
+            match_id,
+        )
+
+        return bool(
+            user_id is not None and
+            user_id == request.user.pk and
+            admission.get_backend().is_admitted(match_id, user_id)
+        )
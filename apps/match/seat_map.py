@@ -0,0 +1,147 @@
+from base64 import b64encode
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+from apps.match.allocation import seat_allocator
+from apps.match.availability import encode_runs, seat_availability
+from apps.match.models import PriceTier
+
+
+def _tier_runs(bitmap, layout):
+    """
+    Tier of each seat of the bitmap, run-length encoded. It's the one of
+    the layout, unless they were built from different seats.
+    """
+
+    if bitmap.seat_ranges() == layout.seat_ranges:
+        return layout.tier_runs
+
+    def tier_id(seat_id):
+        index = bisect_left(layout.seat_ids, seat_id)
+        if index < len(layout.seat_ids) and layout.seat_ids[index] == seat_id:
+            return layout.tier_ids[index]
+        return None
+
+    return encode_runs(tier_id(seat_id) for seat_id in bitmap.seat_ids())
+
+
+def build_seat_map(match_id, version, bitmap):
+    """
+    Build the compact seat map of a match from its availability bitmap.
+
+    Seats are ordered by id, and the position of a seat in this order is
+    its ordinal. Instead of one object per seat, the map holds:
+
+        - seats : ranges of consecutive seat ids, as [first id, count].
+        - available : base64 of a bitset; bit `ordinal` (least significant
+          bit first in each byte) is set when the seat is free.
+        - tiers : the price tiers of the match, as {tier id : price}.
+        - tier_runs : run-length encoded tier of each seat, as
+          [tier id, count].
+
+    For a stadium of 80k seats, it's tens of kilobytes instead of several
+    megabytes of JSON. Seats come from the bitmap and tiers from the seat
+    layout of the allocator, both kept in memory, so only the prices of
+    the tiers are read.
+    """
+
+    tier_runs = _tier_runs(bitmap, seat_allocator.get(match_id, bitmap))
+    used = {tier_id for tier_id, count in tier_runs}
+
+    return {
+        'match': match_id,
+        'version': version,
+        'seats': bitmap.seat_ranges(),
+        'available': b64encode(bitmap.bits).decode('ascii'),
+        'tiers': {
+            tier_id: price
+            for tier_id, price in PriceTier.objects.filter(
+                match_id=match_id,
+            ).order_by('pk').values_list('pk', 'price')
+            if tier_id in used
+        },
+        'tier_runs': tier_runs,
+    }
+
+
+class SeatMaps:
+    """
+    Last built seat map of each match, kept in the memory of the process
+    for the MATCH_SEAT_AVAILABILITY_MAX_MATCHES matches used last.
+
+    A map is only rebuilt when the version of its match or its availability
+    bitmap has changed, so polling clients never cause a read of the seats
+    of a match.
+
+    The ETag of a map is "<match>-<version>" when the bitmap was read at
+    that version or later, so every process builds the same map for it.
+    A bitmap may also be older than the version, up to
+    MATCH_SEAT_AVAILABILITY_MAX_AGE seconds, e.g. when another process
+    reserved seats; the ETag is then "<match>-<version>-<bitmap version>".
+    """
+
+    def __init__(self):
+
+        self._maps = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def etag(match_id, version, bitmap_version=None):
+
+        if bitmap_version is None or bitmap_version >= version:
+            return f'"{match_id}-{version}"'
+
+        return f'"{match_id}-{version}-{bitmap_version}"'
+
+    def _cached(self, match_id, version, bitmap):
+
+        entry = self._maps.get(match_id)
+
+        if entry is None or entry[0] < version or entry[1] is not bitmap:
+            return None
+
+        return entry
+
+    def get(self, match_id, version):
+        """
+        Return the seat map of the match, at `version` or later, and its
+        ETag.
+        """
+
+        bitmap = seat_availability.get(match_id)
+        entry = self._cached(match_id, version, bitmap)
+
+        if entry is None:
+            with self._lock:
+
+                entry = self._cached(match_id, version, bitmap)
+
+                if entry is None:
+                    entry = self._maps[match_id] = (
+                        version,
+                        bitmap,
+                        build_seat_map(match_id, version, bitmap),
+                        self.etag(match_id, version, bitmap.version),
+                    )
+                    while (
+                        len(self._maps) >
+                        settings.MATCH_SEAT_AVAILABILITY_MAX_MATCHES
+                    ):
+                        self._maps.popitem(last=False)
+
+        try:
+            self._maps.move_to_end(match_id)
+        except KeyError:
+            # Evicted by another thread in the meantime.
+            pass
+
+        return entry[2], entry[3]
+
+    def clear(self):
+        self._maps.clear()
+
+
+seat_maps = SeatMaps()
@@ -0,0 +1,256 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.match.models import (
+    Match,
+    MatchInventory,
+    MatchSeatInfo,
+    PriceTier,
+)
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+class Seeder:
+    """
+    Fast creation of synthetic data, e.g. a full season for benchmarks.
+
+    Rows are inserted with executemany in chunks of `chunk_size`, without
+    model instances, save() or signals; the caller decides the transaction,
+    and one large transaction is the fastest. Names are prefixed by `tag`,
+    so several seedings can live in the same database, and the ids of the
+    rows are found back by their names.
+    """
+
+    SEATS_PER_ROW = 50
+
+    def __init__(self, tag, chunk_size=50_000, using=DEFAULT_DB_ALIAS):
+
+        self.tag = tag
+        self.chunk_size = chunk_size
+        self.using = using
+        self.connection = connections[using]
+
+    def insert(self, model, fields, rows):
+        """
+        Insert `rows`, an iterable of tuples of the values of `fields`.
+        Return the number of inserted rows.
+        """
+
+        quote_name = self.connection.ops.quote_name
+        opts = model._meta
+        columns = ', '.join(
+            quote_name(opts.get_field(name).column) for name in fields
+        )
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = (
+            f'INSERT INTO {quote_name(opts.db_table)} ({columns}) '
+            f'VALUES ({placeholders})'
+        )
+
+        rows = iter(rows)
+        number = 0
+
+        with self.connection.cursor() as cursor:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                cursor.executemany(sql, chunk)
+                number += len(chunk)
+
+        return number
+
+    def users(self, number, password, staff=False):
+        """
+        Create `number` users who log in with `password`.
+
+        They all share a single password hash, computed once : hashing is
+        deliberately slow, and it would take most of the time otherwise.
+        """
+
+        password_hash = make_password(password)
+        date_joined = self.connection.ops.adapt_datetimefield_value(
+            timezone.now(),
+        )
+
+        return self.insert(
+            User,
+            (
+                'email', 'password', 'is_staff', 'is_superuser', 'is_active',
+                'date_joined',
+            ),
+            (
+                (
+                    self.user_email(index, staff), password_hash,
+                    staff, False, True, date_joined,
+                )
+                for index in range(number)
+            ),
+        )
+
+    def user_email(self, index, staff=False):
+
+        kind = 'staff' if staff else 'user'
+
+        return f'{self.tag}-{kind}-{index}@seed.local'
+
+    def stadiums(self, number):
+        """
+        Create `number` stadiums and return their ids.
+        """
+
+        names = [f'{self.tag} stadium {index}' for index in range(number)]
+        self.insert(
+            Stadium,
+            ('name', 'slug'),
+            ((name, slugify(name)) for name in names),
+        )
+
+        return self.ids(Stadium, names)
+
+    def seats(self, stadium_ids, number):
+        """
+        Create `number` seats in each stadium, with codes 0, 1, ... and no
+        section, SEATS_PER_ROW seats to a row.
+        """
+
+        return self.insert(
+            Seat,
+            ('stadium', 'code', 'section', 'row', 'number'),
+            (
+                (
+                    stadium_id,
+                    str(code),
+                    '',
+                    code // self.SEATS_PER_ROW + 1,
+                    code % self.SEATS_PER_ROW + 1,
+                )
+                for stadium_id in stadium_ids
+                for code in range(number)
+            ),
+        )
+
+    def teams(self, number):
+        """
+        Create `number` teams and return their ids.
+        """
+
+        names = [f'{self.tag} team {index}' for index in range(number)]
+        self.insert(Team, ('name',), ((name,) for name in names))
+
+        return self.ids(Team, names)
+
+    def matches(self, stadium_ids, team_ids, number):
+        """
+        Create `number` matches and return their ids.
+
+        Teams meet in rounds like a league, every team hosts at its own
+        stadium, and matches are an hour apart.
+        """
+
+        teams = len(team_ids)
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        adapt = self.connection.ops.adapt_datetimefield_value
+
+        rows = []
+        for index in range(number):
+            host = index % teams
+            guest = (host + 1 + (index // teams) % (teams - 1)) % teams
+            rows.append((
+                stadium_ids[host % len(stadium_ids)],
+                team_ids[host],
+                team_ids[guest],
+                adapt(start + timedelta(hours=index + 1)),
+                0,
+                1,
+            ))
+
+        self.insert(
+            Match,
+            (
+                'stadium', 'host_team', 'guest_team', 'datetime',
+                'seat_map_version', 'inventory_shards',
+            ),
+            rows,
+        )
+
+        return list(
+            Match.objects.using(self.using).filter(
+                host_team_id__in=team_ids,
+            ).order_by('datetime').values_list('pk', flat=True)
+        )
+
+    def match_seats(self, match_ids, base_price=10_000, tiers=5):
+        """
+        Define every seat of the stadium of each match for the match.
+
+        Each match gets `tiers` price tiers, multiples of `base_price`,
+        and seats are spread over them by id. Seats are a single INSERT ...
+        SELECT, so the rows never leave the database.
+        """
+
+        self.insert(
+            PriceTier,
+            ('match', 'price'),
+            (
+                (match_id, base_price * (1 + tier))
+                for match_id in match_ids
+                for tier in range(tiers)
+            ),
+        )
+
+        quote_name = self.connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(match_ids))
+
+        def column(model, name):
+            return quote_name(model._meta.get_field(name).column)
+
+        columns = ', '.join(
+            column(MatchSeatInfo, name) for name in
+            ('match', 'seat', 'tier', 'is_reserved', 'is_paid')
+        )
+        sql = (
+            f'INSERT INTO {quote_name(MatchSeatInfo._meta.db_table)} '
+            f'({columns}) '
+            f'SELECT m.{column(Match, "id")}, s.{column(Seat, "id")}, '
+            f't.{column(PriceTier, "id")}, %s, %s '
+            f'FROM {quote_name(Match._meta.db_table)} m '
+            f'INNER JOIN {quote_name(Seat._meta.db_table)} s '
+            f'ON s.{column(Seat, "stadium")} = m.{column(Match, "stadium")} '
+            f'INNER JOIN {quote_name(PriceTier._meta.db_table)} t '
+            f'ON t.{column(PriceTier, "match")} = m.{column(Match, "id")} '
+            f'AND t.{column(PriceTier, "price")} = '
+            f'%s * (1 + s.{column(Seat, "id")} %% %s) '
+            f'WHERE m.{column(Match, "id")} IN ({placeholders})'
+        )
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                (False, False, base_price, tiers, *match_ids),
+            )
+            number = cursor.rowcount
+
+        MatchSeatInfo.objects.using(self.using).seats_changed(match_ids)
+        MatchInventory.objects.using(self.using).reconcile(match_ids)
+
+        return number
+
+    def ids(self, model, names):
+
+        ids = dict(
+            model.objects.using(self.using).filter(
+                name__in=names,
+            ).values_list('name', 'pk')
+        )
+
+        return [ids[name] for name in names]
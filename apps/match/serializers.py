@@ -1,9 +1,17 @@
-from django.db.models import Count
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import Counter
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
 from django.utils.translation import gettext_lazy as _
 
+from rest_framework.settings import api_settings
 from rest_framework.serializers import (
     Serializer,
     ModelSerializer,
+    BooleanField,
+    CharField,
+    DateTimeField,
     IntegerField,
     ListField,
     SerializerMethodField,
@@ -11,9 +19,32 @@ from rest_framework.serializers import (
 )
 
 from apps.match.models import Match, MatchSeatInfo
+from apps.stadium.models import Seat
+from config.profiling import ProfiledSerializerMixin
+
+
+def validate_unique_seats(seats):
+    """
+    Reject seat ids which are given more than once, naming them, instead of
+    counting them twice or dropping them silently.
+    """
+
+    duplicates = sorted(
+        seat for seat, number in Counter(seats).items() if number > 1
+    )
+
+    if duplicates:
+        raise ValidationError(
+            _(
+                f'These seats are given more than once : '
+                f'{", ".join(map(str, duplicates))}.'
+            )
+        )
+
+    return seats
 
 
-class MatchSerializer(ModelSerializer):
+class MatchSerializer(ProfiledSerializerMixin, ModelSerializer):
 
     match_info = SerializerMethodField()
 
@@ -52,20 +83,91 @@ class MatchSerializer(ModelSerializer):
         if data['host_team'] == data['guest_team']:
             raise ValidationError(_("Both teams can't be same"))
 
-        match = Match.objects.filter(
-            stadium=data['stadium'],
-            datetime=data['datetime'],
-            )
-        if match.exists():
-            raise ValidationError(
-                _(('Match with this stadium and datetime already exists.'))
-            )
-
         return data
 
+    def create(self, validated_data):
+
+        # unique_match_stadium_datetime decides, instead of a query before
+        # the insert which would still race with another admin.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Match.objects.filter(
+                stadium=validated_data['stadium'],
+                datetime=validated_data['datetime'],
+            ).exists():
+                raise
+
+        raise ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                _('Match with this stadium and datetime already exists.'),
+            ],
+        })
+
+
+class MatchListSerializer(MatchSerializer):
+    """
+    A match of the public listing. Matches must come from
+    MatchQuerySet.listing, so match_info costs no query, and seats left
+    come from the `inventory` of the context, i.e. MatchInventory counts.
+    """
+
+    seats_left = SerializerMethodField()
+
+    def get_seats_left(self, match: Match) -> int:
+        return self.context['inventory'].get(match.pk, {}).get('available', 0)
+
+    class Meta:
+
+        model = Match
+        fields = (
+            'id',
+            'datetime',
+            'match_info',
+            'seats_left',
+        )
+        read_only_fields = fields
+
+
+class MatchListQuerySerializer(ProfiledSerializerMixin, Serializer):
+    """
+    Query parameters of the match listing. `cursor` is the opaque `next`
+    of the previous page : the (datetime, id) of its last match.
+    """
+
+    date_from = DateTimeField(required=False)
+    date_to = DateTimeField(required=False)
+    stadium = IntegerField(required=False)
+    team = IntegerField(required=False)
+    page_size = IntegerField(min_value=1, max_value=100, default=20)
+    cursor = CharField(required=False)
+
+    @staticmethod
+    def cursor_of(match):
+
+        key = f'{match.datetime.isoformat()}|{match.pk}'
+
+        return urlsafe_b64encode(key.encode()).decode()
 
-class MatchSeatInfoSerializer(ModelSerializer):
+    def validate_cursor(self, value):
 
+        try:
+            moment, pk = urlsafe_b64decode(
+                value.encode(),
+            ).decode().split('|')
+            moment = datetime.fromisoformat(moment)
+            pk = int(pk)
+        except ValueError:
+            raise ValidationError(_('Invalid cursor.'))
+
+        return moment, pk
+
+
+class MatchSeatInfoSerializer(ProfiledSerializerMixin, ModelSerializer):
+
+    # The seat gets the tier of this price, see MatchSeatInfo.price.
+    price = IntegerField(min_value=0, write_only=True)
     match_seat_info = SerializerMethodField()
 
     def get_match_seat_info(self, match_seat: MatchSeatInfo) -> dict:
@@ -84,7 +186,6 @@ class MatchSeatInfoSerializer(ModelSerializer):
         extra_kwargs = {
             'match': {'write_only': True},
             'seat': {'write_only': True},
-            'price': {'write_only': True},
             }
 
     def validate(self, data):
@@ -92,17 +193,7 @@ class MatchSeatInfoSerializer(ModelSerializer):
         match = data['match']
         seat = data['seat']
 
-        match_seat = MatchSeatInfo.objects.filter(
-            match=match,
-            seat=seat,
-            )
-
-        if match_seat.exists():
-            raise ValidationError(
-                _(('This seat is already defined for this match.'))
-            )
-
-        if not match.stadium.seats.only('id').contains(seat):
+        if seat.stadium_id != match.stadium_id:
             # Here, we check if selected seat, belongs to stadium or not
 
             raise ValidationError(
@@ -113,79 +204,112 @@ class MatchSeatInfoSerializer(ModelSerializer):
 
         return data
 
-
-class ListCreateMatchSeatInfoSerializer(Serializer):
+    def create(self, validated_data):
+
+        # unique_info_match_seat decides, like in MatchSerializer.create.
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not MatchSeatInfo.objects.filter(
+                match=validated_data['match'],
+                seat=validated_data['seat'],
+            ).exists():
+                raise
+
+        raise ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                _('This seat is already defined for this match.'),
+            ],
+        })
+
+
+class ListCreateMatchSeatInfoSerializer(ProfiledSerializerMixin, Serializer):
+    """
+    Seats are selected by exactly one of :
+        - seats : ids of the seats
+        - section : all seats of a section of the stadium
+        - all_seats : all seats of the stadium
+    Seats which are already defined for the match are left as they are
+    (see MatchSeatInfoQuerySet.define_seats and define_stadium_seats).
+    Whether the given seats are seats of the stadium is decided by the
+    insert too.
+    """
 
     match = IntegerField()
-    price = IntegerField()
-    seats = ListField(child=IntegerField(), min_length=2)
+    price = IntegerField(min_value=0)
+    seats = ListField(child=IntegerField(), min_length=2, required=False)
+    section = CharField(
+        max_length=Seat._meta.get_field('section').max_length,
+        required=False,
+    )
+    all_seats = BooleanField(default=False)
+
+    def validate_seats(self, seats):
+        return validate_unique_seats(seats)
 
     def validate_match(self, match_pk):
 
-        match = Match.objects.filter(pk=match_pk)
+        match = Match.objects.filter(pk=match_pk).first()
 
-        if not match.exists():
+        if match is None:
 
             raise ValidationError('Match does not exist')
 
-        return match.first()
+        return match
 
     def validate(self, data):
 
         match = data['match']
-        seats = data['seats']
-        seats_number = len(seats)
-
-        if MatchSeatInfo.objects.filter(
-            match=match,
-            seat_id__in=seats,
-        ).exists():
-                raise ValidationError(
-                    _(('One of seats is already defined for the match.'))
-                )
-
-        if match.stadium.seats.filter(pk__in=seats).aggregate(count=Count('pk'))['count'] != seats_number:
-            # Here, we check if all selected seats, belong to stadium or not.
 
+        selectors = ('seats' in data) + ('section' in data) + data['all_seats']
+        if selectors != 1:
             raise ValidationError(
-                _(
-                    'Stadium of this match, does not have one of seats.'
-                )
+                _('Exactly one of seats, section or all_seats is required.')
             )
 
-        return data
-
+        if 'section' in data:
 
-class ListUpdateMatchSeatInfoSerializer(Serializer):
+            section = data['section']
 
-    seats = ListField(child=IntegerField(), min_length=1, max_length=10)
+            if not Seat.objects.filter(
+                stadium_id=match.stadium_id,
+                section=section,
+            ).exists():
+                raise ValidationError(
+                    _(
+                        f'Stadium of this match, does not have section '
+                        f'{section}.'
+                    )
+                )
 
-    def __init__(self, *args, **kwargs):
+        return data
 
-        self.match = kwargs.pop('match', None)
-        super().__init__(*args, **kwargs)
 
-    def validate(self, data):
+class ListUpdateMatchSeatInfoSerializer(ProfiledSerializerMixin, Serializer):
+    """
+    Only the shape of the request is validated here. Whether the seats are
+    defined for the match and still free is decided by the conditional
+    UPDATE in MatchSeatInfoQuerySet.reserve, because a check made before
+    the write can't stop two buyers from racing for the same seat.
+    """
 
-        seats = data['seats']
-        seats_number = len(seats)
+    seats = ListField(child=IntegerField(), min_length=1, max_length=10)
 
-        if MatchSeatInfo.objects.filter(
-            match=self.match,
-            seat_id__in=seats,
-            is_reserved=True,
-        ).exists():
-                raise ValidationError(
-                    _(('One of seats is already reserved for the match.'))
-                )
+    def validate_seats(self, seats):
+        return validate_unique_seats(seats)
 
-        if self.match.stadium.seats.filter(pk__in=seats).aggregate(count=Count('pk'))['count'] != seats_number:
-            # Here, we check if all selected seats, belong to stadium or not.
 
-            raise ValidationError(
-                _(
-                    'Stadium of this match, does not have one of seats.'
-                )
-            )
+class BestAvailableSeatsSerializer(ProfiledSerializerMixin, Serializer):
+    """
+    Only the shape of the request is validated here, like in
+    ListUpdateMatchSeatInfoSerializer. `tier` is the id of a price tier of
+    the match, as in its seat map.
+    """
 
-        return data
+    quantity = IntegerField(min_value=1, max_value=10)
+    tier = IntegerField(required=False)
+    section = CharField(
+        max_length=Seat._meta.get_field('section').max_length,
+        required=False,
+    )
@@ -0,0 +1,141 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from apps.match.admin import EstimatedCountPaginator
+from apps.match.models import Match, MatchInventory, MatchSeatInfo
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+class TestMatchSeatInfoAdmin(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_superuser(
+            email='admin@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=timezone.now(),
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'A{number}')
+            for number in range(1, 21)
+        ]
+
+        self.client.force_login(self.user)
+        self.url = reverse('admin:match_matchseatinfo_changelist')
+
+    def define_seats(self, seats):
+
+        MatchSeatInfo.objects.bulk_create(
+            MatchSeatInfo(
+                match=self.match,
+                seat=seat,
+                price=4500,
+                is_reserved=number % 2 == 0,
+                is_paid=number % 4 == 0,
+                buyer=self.user if number % 2 == 0 else None,
+            )
+            for number, seat in enumerate(seats)
+        )
+
+    def test_changelist_queries(self):
+        """
+        The number of queries of a page doesn't grow with its rows.
+        """
+
+        self.define_seats(self.seats[:1])
+        with self.assertNumQueries(6) as one:
+            self.client.get(self.url)
+
+        self.define_seats(self.seats[1:])
+        with self.assertNumQueries(len(one.captured_queries)):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 20)
+
+    def test_changelist_filters(self):
+
+        self.define_seats(self.seats)
+
+        for state, count in (('available', 10), ('held', 5), ('sold', 5)):
+            response = self.client.get(
+                self.url,
+                {'match': self.match.pk, 'state': state},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['cl'].result_count, count)
+
+        response = self.client.get(self.url, {'match': self.match.pk + 1})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_estimated_count(self):
+
+        self.define_seats(self.seats)
+        MatchSeatInfo.objects.filter(seat=self.seats[5]).delete()
+
+        paginator = EstimatedCountPaginator(
+            MatchSeatInfo.objects.order_by('pk'),
+            10,
+        )
+        self.assertEqual(paginator.count, 20)
+        self.assertEqual(paginator.num_pages, 2)
+
+        paginator = EstimatedCountPaginator(
+            MatchSeatInfo.objects.filter(is_paid=True).order_by('pk'),
+            10,
+        )
+        self.assertEqual(paginator.count, 5)
+
+        MatchSeatInfo.objects.all().delete()
+        paginator = EstimatedCountPaginator(
+            MatchSeatInfo.objects.order_by('pk'),
+            10,
+        )
+        self.assertEqual(paginator.count, 0)
+
+    def test_delete_selected(self):
+        """
+        Seats deleted from the changelist are taken out of the counters and
+        the seat map of their match.
+        """
+
+        self.define_seats(self.seats)
+        version = Match.objects.get(pk=self.match.pk).seat_map_version
+        deleted = MatchSeatInfo.objects.filter(seat__in=self.seats[:4])
+
+        response = self.client.post(
+            self.url,
+            {
+                'action': 'delete_selected',
+                '_selected_action': list(
+                    deleted.values_list('pk', flat=True)
+                ),
+                'post': 'yes',
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(MatchSeatInfo.objects.count(), 16)
+        self.assertEqual(
+            MatchInventory.objects.counts((self.match.pk,))[self.match.pk],
+            {'available': 8, 'held': 4, 'sold': 4},
+        )
+        self.assertGreater(
+            Match.objects.get(pk=self.match.pk).seat_map_version,
+            version,
+        )
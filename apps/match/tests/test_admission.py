@@ -0,0 +1,163 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from apps.match import admission
+from apps.match.admission import InMemoryAdmissionBackend
+
+
+class TestTickets(SimpleTestCase):
+
+    def test_read_ticket(self):
+
+        ticket = admission.make_ticket(1, 7)
+
+        self.assertEqual(admission.read_ticket(ticket, 1), 7)
+
+    def test_read_ticket_invalid(self):
+        """
+        This method checks if tickets of another match, tampered tickets and
+        missing tickets are rejected.
+        """
+
+        ticket = admission.make_ticket(1, 7)
+
+        self.assertIsNone(admission.read_ticket(ticket, 2))
+        self.assertIsNone(admission.read_ticket(ticket[:-1] + 'x', 1))
+        self.assertIsNone(admission.read_ticket(None, 1))
+
+    def test_read_ticket_expired(self):
+
+        ticket = admission.make_ticket(1, 7)
+
+        with override_settings(MATCH_ADMISSION={'TICKET_MAX_AGE': -1}):
+            self.assertIsNone(admission.read_ticket(ticket, 1))
+
+
+class TestGetBackend(SimpleTestCase):
+
+    def setUp(self):
+
+        admission.get_backend.cache_clear()
+        self.addCleanup(admission.get_backend.cache_clear)
+
+    def test_worker_processes(self):
+
+        with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '3'}):
+            self.assertEqual(admission.worker_processes(), 3)
+
+        with mock.patch.dict(
+            'os.environ',
+            {'WEB_CONCURRENCY': '3', 'GUNICORN_CMD_ARGS': '-b :80 -w 2'},
+        ):
+            self.assertEqual(admission.worker_processes(), 2)
+
+            with mock.patch(
+                'sys.argv',
+                ['/usr/bin/gunicorn', 'config.wsgi', '--workers=4'],
+            ):
+                self.assertEqual(admission.worker_processes(), 4)
+
+    def test_in_memory_backend_with_several_processes(self):
+        """
+        This method checks if the in-memory backend is refused when there are
+        several worker processes.
+        """
+
+        with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '2'}):
+            with self.assertRaises(ImproperlyConfigured):
+                admission.get_backend()
+
+        with mock.patch.dict('os.environ', {'WEB_CONCURRENCY': '1'}):
+            self.assertIsInstance(
+                admission.get_backend(),
+                InMemoryAdmissionBackend,
+            )
+
+    def test_backend_is_abstract(self):
+
+        with self.assertRaises(TypeError):
+            admission.AdmissionBackend(1, 1, 1, 1, 1)
+
+
+class TestInMemoryAdmissionBackend(SimpleTestCase):
+
+    def setUp(self):
+
+        self.backend = InMemoryAdmissionBackend(
+            active_shoppers=2,
+            min_active_shoppers=1,
+            max_active_shoppers=4,
+            session_ttl=600,
+            target_commit_latency=0.05,
+        )
+
+    def test_join(self):
+
+        for user_id in (1, 2, 3, 4):
+            status = self.backend.join(1, user_id)
+
+        self.assertEqual(
+            status,
+            {'admitted': False, 'position': 2, 'estimated_wait': 300},
+        )
+        self.assertTrue(self.backend.is_admitted(1, 1))
+        self.assertTrue(self.backend.is_admitted(1, 2))
+        self.assertFalse(self.backend.is_admitted(1, 3))
+        self.assertEqual(self.backend.status(1, 3)['position'], 1)
+
+        # Joining again keeps the place.
+        self.assertEqual(self.backend.join(1, 4)['position'], 2)
+
+        # Queues of matches are separate.
+        self.assertTrue(self.backend.join(2, 4)['admitted'])
+
+    def test_leave(self):
+
+        for user_id in (1, 2, 3, 4):
+            self.backend.join(1, user_id)
+
+        self.backend.leave(1, 1)
+        self.assertTrue(self.backend.is_admitted(1, 3))
+        self.assertFalse(self.backend.is_admitted(1, 4))
+
+        # Leaving the queue before being admitted.
+        self.backend.leave(1, 4)
+        self.backend.leave(1, 2)
+        self.assertFalse(self.backend.is_admitted(1, 4))
+        self.assertIsNone(self.backend.status(1, 4)['position'])
+
+    def test_idle_shoppers_expire(self):
+
+        for user_id in (1, 2, 3):
+            self.backend.join(1, user_id)
+
+        with mock.patch(
+            'apps.match.admission.monotonic',
+            return_value=admission.monotonic() + 601,
+        ):
+            self.assertTrue(self.backend.is_admitted(1, 3))
+            self.assertFalse(self.backend.is_admitted(1, 1))
+
+    def test_record_commit(self):
+        """
+        This method checks if slow commits shrink the number of active
+        shoppers down to the minimum and fast ones grow it back.
+        """
+
+        for _ in range(20):
+            self.backend.record_commit(1, 1)
+
+        self.assertEqual(self.backend._queues[1].limit, 1)
+
+        for user_id in (1, 2, 3):
+            self.backend.join(1, user_id)
+
+        self.assertFalse(self.backend.is_admitted(1, 2))
+
+        for _ in range(100):
+            self.backend.record_commit(1, 0)
+
+        self.assertEqual(self.backend._queues[1].limit, 4)
+        self.assertTrue(self.backend.is_admitted(1, 3))
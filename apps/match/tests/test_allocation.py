@@ -0,0 +1,270 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.match.allocation import SeatLayout, SeatAllocator
+from apps.match.availability import SeatBitmap, seat_availability
+from apps.match.models import Match, MatchSeatInfo, PriceTier
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+class TestSeatLayout(TestCase):
+
+    def setUp(self):
+
+        # Two rows of 6 seats in section A : ids 1-6 in row 1 with tier 1,
+        # ids 7-12 in row 2 with tier 2. Seat 13 has no row.
+        self.rows = [
+            (row * 6 + number, f'A{row + 1}-{number}', 'A', row + 1, number,
+             row + 1)
+            for row in range(2)
+            for number in range(1, 7)
+        ]
+        self.rows.append((13, 'B1', 'B', None, None, 1))
+        self.layout = SeatLayout(self.rows, epoch=0)
+
+    def bitmap(self, reserved=(), rows=None):
+
+        return SeatBitmap(
+            [
+                (seat_id, seat_id in reserved)
+                for seat_id, *_ in rows or self.rows
+            ],
+            epoch=0,
+        )
+
+    def seat_ids(self, seats):
+        return [seat[0] for seat in seats]
+
+    def test_find_central_block_of_front_row(self):
+
+        seats = self.layout.find(self.bitmap(), 2)
+
+        self.assertEqual(
+            seats,
+            [(3, 'A1-3', 'A', 1, 3), (4, 'A1-4', 'A', 1, 4)],
+        )
+
+    def test_find_skips_reserved_seats(self):
+
+        seats = self.layout.find(self.bitmap(reserved=(3,)), 2)
+
+        self.assertEqual(self.seat_ids(seats), [4, 5])
+
+    def test_find_next_row(self):
+
+        seats = self.layout.find(self.bitmap(reserved=(3,)), 4)
+
+        self.assertEqual(self.seat_ids(seats), [8, 9, 10, 11])
+
+    def test_find_tier_and_section(self):
+
+        self.assertEqual(
+            self.seat_ids(self.layout.find(self.bitmap(), 2, tier=2)),
+            [9, 10],
+        )
+        self.assertEqual(
+            self.seat_ids(self.layout.find(self.bitmap(), 1, section='B')),
+            [13],
+        )
+
+    def test_find_invalid_first(self):
+        """
+        This method checks if seats without a row or number are only
+        picked one by one, and no block is found when none is free.
+        """
+
+        self.assertIsNone(self.layout.find(self.bitmap(), 2, section='B'))
+        self.assertIsNone(
+            self.layout.find(self.bitmap(reserved=(13,)), 1, section='B'),
+        )
+
+    def test_find_invalid_second(self):
+        """
+        This method checks if blocks aren't made across a gap in numbers,
+        even when both sides are free.
+        """
+
+        rows = [row for row in self.rows if row[0] not in (3, 9)]
+        layout = SeatLayout(rows, epoch=0)
+
+        self.assertIsNone(layout.find(self.bitmap(rows=rows), 4))
+
+    def test_find_spread(self):
+
+        blocks = {
+            tuple(self.seat_ids(self.layout.find(self.bitmap(), 2, spread=3)))
+            for _ in range(50)
+        }
+
+        self.assertTrue(blocks <= {(3, 4), (5, 6), (1, 2)})
+        self.assertIn((3, 4), blocks)
+
+    def test_find_with_bitmap_of_other_seats(self):
+        """
+        Ordinals of the layout are mapped to the bitmap when the bitmap
+        was built from other seats; seats missing from it aren't free.
+        """
+
+        rows = [row for row in self.rows if row[0] != 4]
+
+        seats = self.layout.find(self.bitmap(rows=rows), 2)
+
+        self.assertEqual(self.seat_ids(seats), [2, 3])
+
+    def test_bind_keeps_no_state(self):
+        """
+        This method checks if a layout bound to one bitmap doesn't answer
+        for another one, e.g. of a concurrent search.
+        """
+
+        rows = [row for row in self.rows if row[0] != 4]
+        other = self.layout.bind(self.bitmap(rows=rows))
+        is_free = self.layout.bind(self.bitmap())
+
+        self.assertTrue(is_free(3))
+        self.assertFalse(other(3))
+
+
+class TestSeatAllocator(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        Seat.objects.create_layout(
+            self.stadium.pk,
+            (
+                ('A', row, number, f'A{row}-{number}')
+                for row in (1, 2)
+                for number in range(1, 5)
+            ),
+        )
+        MatchSeatInfo.objects.bulk_create(
+            MatchSeatInfo(match=self.match, seat=seat, price=4500)
+            for seat in Seat.objects.order_by('pk')
+        )
+        self.codes = dict(Seat.objects.values_list('code', 'pk'))
+
+        self.allocator = SeatAllocator()
+        self.allocator.SPREAD = 1
+
+    def hold(self, quantity, **kwargs):
+
+        return self.allocator.hold(
+            match_id=self.match.pk,
+            quantity=quantity,
+            buyer_id=self.user.pk,
+            now=self.now,
+            **kwargs,
+        )
+
+    def test_hold(self):
+
+        seats = self.hold(2)
+
+        self.assertEqual([seat[1] for seat in seats], ['A1-2', 'A1-3'])
+        self.assertEqual(
+            set(
+                MatchSeatInfo.objects.filter(
+                    buyer=self.user,
+                    is_reserved=True,
+                ).values_list('seat__code', flat=True)
+            ),
+            {'A1-2', 'A1-3'},
+        )
+
+    def test_hold_retries_lost_seats(self):
+        """
+        Seats taken behind the back of the bitmap are lost on the first
+        attempt, and the next best block is held instead.
+        """
+
+        seat_availability.get(self.match.pk)
+        MatchSeatInfo.objects.filter(
+            seat_id__in=(self.codes['A1-2'], self.codes['A1-3']),
+        ).update(is_reserved=True)
+
+        seats = self.hold(2)
+
+        self.assertEqual([seat[1] for seat in seats], ['A2-2', 'A2-3'])
+
+    def test_hold_invalid(self):
+        """
+        This method checks if nothing is held when no block is free.
+        """
+
+        self.assertIsNone(self.hold(5))
+        self.assertIsNone(self.hold(2, section='B'))
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(is_reserved=True).exists(),
+        )
+
+    def test_hold_after_reprice(self):
+        """
+        Seats moved to another tier by a reprice are seen by the layout.
+        """
+
+        seat = MatchSeatInfo.objects.get(seat_id=self.codes['A1-1'])
+        seat.price = 9000
+        seat.save()
+
+        tier = seat.tier_id
+        self.assertEqual(
+            [seat[1] for seat in self.hold(1, tier=tier)],
+            ['A1-1'],
+        )
+
+        MatchSeatInfo.objects.filter(
+            seat_id=self.codes['A1-1'],
+        ).update(is_reserved=False)
+        seat_availability.invalidate((self.match.pk,))
+
+        PriceTier.objects.reprice(self.match.pk, 4500, 9000)
+
+        self.assertEqual(
+            [seat[1] for seat in self.hold(2, tier=tier)],
+            ['A1-2', 'A1-3'],
+        )
+
+    def test_get_layout_built_meanwhile(self):
+        """
+        A thread which waited for the lock while another one built the
+        layout uses that layout instead of reading the seats again.
+        """
+
+        bitmap = seat_availability.get(self.match.pk)
+        built = SeatLayout([], bitmap.epoch)
+        allocator, match_id = self.allocator, self.match.pk
+
+        class Lock:
+
+            def __enter__(self):
+                # The other thread, done while this one waited.
+                allocator._layouts[match_id] = built
+
+            def __exit__(self, *exc_info):
+                pass
+
+        allocator._layouts[match_id] = SeatLayout([], bitmap.epoch - 1)
+        allocator._lock = Lock()
+
+        with self.assertNumQueries(0):
+            self.assertIs(allocator.get(match_id, bitmap), built)
@@ -4,9 +4,16 @@ from rest_framework.test import APISimpleTestCase
 
 from apps.match.api_views import (
     MatchCreateAPIView,
+    MatchListAPIView,
     MatchSeatInfoCreateAPIView,
     ListCreateMatchSeatInfoAPIView,
     ListUpdateMatchSeatInfoAPIView,
+    BestAvailableSeatsAPIView,
+    ListCheckoutMatchSeatInfoAPIView,
+    MatchSeatMapAPIView,
+    MatchInventoryAPIView,
+    MatchQueueAPIView,
+    MatchQueueStatusAPIView,
 )
 
 
@@ -20,6 +27,14 @@ class TestMatchAPIURLs(APISimpleTestCase):
             MatchCreateAPIView,
         )
 
+    def test_list_match(self):
+
+        url = reverse('match:api_list_match')
+        self.assertEqual(
+            resolve(url).func.view_class,
+            MatchListAPIView,
+        )
+
     def test_create_match_seat_info(self):
 
         url = reverse('match:api_create_match_seat')
@@ -46,3 +61,69 @@ class TestMatchAPIURLs(APISimpleTestCase):
             resolve(url).func.view_class,
             ListUpdateMatchSeatInfoAPIView,
         )
+
+    def test_best_available_match_seat(self):
+
+        url = reverse(
+            'match:api_best_available_match_seat',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            BestAvailableSeatsAPIView,
+        )
+
+    def test_list_checkout_match_seat_info(self):
+
+        url = reverse(
+            'match:api_checkout_list_match_seat',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            ListCheckoutMatchSeatInfoAPIView,
+        )
+
+    def test_match_seat_map(self):
+
+        url = reverse(
+            'match:api_match_seat_map',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            MatchSeatMapAPIView,
+        )
+
+    def test_join_match_queue(self):
+
+        url = reverse(
+            'match:api_join_match_queue',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            MatchQueueAPIView,
+        )
+
+    def test_match_queue_status(self):
+
+        url = reverse(
+            'match:api_match_queue_status',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            MatchQueueStatusAPIView,
+        )
+
+    def test_match_inventory(self):
+
+        url = reverse(
+            'match:api_match_inventory',
+            kwargs={'match_id': 1}
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            MatchInventoryAPIView,
+        )
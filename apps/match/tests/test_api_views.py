@@ -1,18 +1,27 @@
+from datetime import timedelta
+
 from django.urls import reverse
+from django.test import override_settings
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from rest_framework.test import APITestCase, APIClient
 from rest_framework.status import (
+    HTTP_200_OK,
     HTTP_201_CREATED,
     HTTP_202_ACCEPTED,
+    HTTP_304_NOT_MODIFIED,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
+    HTTP_403_FORBIDDEN,
     HTTP_404_NOT_FOUND,
+    HTTP_409_CONFLICT,
 )
 
-from apps.match.models import Match, MatchSeatInfo
+from apps.match import admission
+from apps.match.models import Match, MatchSeatInfo, PriceTier
+from apps.match.seat_map import seat_maps
 from apps.stadium.models import Stadium, Seat
 from apps.team.models import Team
 
@@ -168,6 +177,141 @@ class TestMatchCreateAPIView(APITestCase):
         )
 
 
+class TestMatchListAPIView(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+        self.url = reverse('match:api_list_match')
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.stadium2 = Stadium.objects.create(name='Shiroodi')
+        self.teams = [
+            Team.objects.create(name=name)
+            for name in ('Esteghlal', 'Piroozi', 'Sepahan')
+        ]
+        self.now = timezone.now().replace(microsecond=0)
+
+        # Two matches at each time, in both stadiums, so (datetime, id)
+        # must break ties between pages.
+        self.matches = [
+            Match.objects.create(
+                stadium=stadium,
+                host_team=self.teams[index % 3],
+                guest_team=self.teams[(index + 1) % 3],
+                datetime=self.now + timedelta(days=index),
+            )
+            for index in range(3)
+            for stadium in (self.stadium, self.stadium2)
+        ]
+
+        seat = Seat.objects.create(stadium=self.stadium, code='n1')
+        MatchSeatInfo.objects.create(
+            match=self.matches[0],
+            seat=seat,
+            price=5000,
+        )
+
+    def get_ids(self, response):
+        return [match['id'] for match in response.json()['results']]
+
+    def test_match_list_GET_valid(self):
+
+        ids = []
+        params = {'page_size': 4}
+
+        while True:
+            response = self.client.get(self.url, data=params)
+
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            ids += self.get_ids(response)
+
+            if response.json()['next'] is None:
+                break
+            params['cursor'] = response.json()['next']
+
+        self.assertEqual(
+            ids,
+            list(
+                Match.objects.order_by('-datetime', '-pk').values_list(
+                    'pk',
+                    flat=True,
+                )
+            ),
+        )
+
+        match = response.json()['results'][-1]
+        self.assertEqual(match['id'], self.matches[0].pk)
+        self.assertEqual(match['seats_left'], 1)
+        self.assertEqual(match['match_info']['stadium'], 'Azadi')
+        self.assertEqual(match['match_info']['host_team'], 'Esteghlal')
+
+    def test_match_list_GET_number_of_queries(self):
+        """
+        The matches with their stadium and teams, and their seat counters.
+        """
+
+        for page_size in (1, 6):
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    self.url,
+                    data={'page_size': page_size},
+                )
+
+            self.assertEqual(len(self.get_ids(response)), page_size)
+
+    def test_match_list_GET_filters(self):
+
+        response = self.client.get(
+            self.url,
+            data={'stadium': self.stadium2.pk},
+        )
+        self.assertEqual(
+            self.get_ids(response),
+            [match.pk for match in self.matches[::-2]],
+        )
+
+        response = self.client.get(
+            self.url,
+            data={
+                'team': self.teams[0].pk,
+                'date_from': (self.now + timedelta(days=1)).isoformat(),
+            },
+        )
+        self.assertEqual(
+            self.get_ids(response),
+            [self.matches[5].pk, self.matches[4].pk],
+        )
+
+        response = self.client.get(
+            self.url,
+            data={'date_to': self.now.isoformat()},
+        )
+        self.assertEqual(
+            self.get_ids(response),
+            [self.matches[1].pk, self.matches[0].pk],
+        )
+
+    def test_match_list_GET_invalid_first(self):
+        """
+        This method checks if the cursor is invalid.
+        """
+
+        response = self.client.get(self.url, data={'cursor': 'abc'})
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('cursor', response.json())
+
+    def test_match_list_GET_invalid_second(self):
+        """
+        This method checks if the page size is out of 1 to 100.
+        """
+
+        response = self.client.get(self.url, data={'page_size': 101})
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertIn('page_size', response.json())
+
 class TestMatchSeatInfoCreateAPIView(APITestCase):
 
     def setUp(self):
@@ -436,9 +580,10 @@ class TestListCreateMatchSeatInfoAPIView(APITestCase):
         self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
         self.assertEqual(MatchSeatInfo.objects.count(), 0)
 
-    def test_list_create_match_seat_info_POST_invalid_second(self):
+    def test_list_create_match_seat_info_POST_valid_existing(self):
         """
-        This method checks if one of seats is already defined for this match.
+        Seats which are already defined for this match are left as they are
+        and returned; the others are defined.
         """
 
         MatchSeatInfo.objects.create(
@@ -459,8 +604,42 @@ class TestListCreateMatchSeatInfoAPIView(APITestCase):
             **self.headers,
         )
 
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.json()['existing_seats'], [self.seat.pk])
+        self.assertEqual(MatchSeatInfo.objects.count(), 3)
+        self.assertEqual(
+            MatchSeatInfo.objects.get(seat=self.seat).price,
+            5000,
+        )
+
+    def test_list_create_match_seat_info_POST_invalid_second(self):
+        """
+        This method checks if all of seats are already defined for this
+        match.
+        """
+
+        for seat in (self.seat, self.seat2):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'match': self.match.pk,
+                'seats': [1, 2],
+                'price': 45000,
+
+            },
+            format='json',
+            **self.headers,
+        )
+
         self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
-        self.assertEqual(MatchSeatInfo.objects.count(), 1)
+        self.assertEqual(MatchSeatInfo.objects.count(), 2)
+        self.assertFalse(PriceTier.objects.filter(price=45000).exists())
 
     def test_create_match_seat_info_POST_invalid_third(self):
         """
@@ -480,7 +659,9 @@ class TestListCreateMatchSeatInfoAPIView(APITestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['seats'], [4])
         self.assertEqual(MatchSeatInfo.objects.count(), 0)
+        self.assertFalse(PriceTier.objects.exists())
 
     def test_list_create_match_seat_info_POST_invalid_fourth(self):
         """
@@ -506,6 +687,98 @@ class TestListCreateMatchSeatInfoAPIView(APITestCase):
         )
 
 
+    def test_list_create_match_seat_info_POST_valid_section(self):
+
+        for code in ('A1', 'A2'):
+            Seat.objects.create(stadium=self.stadium, code=code, section='A')
+        Seat.objects.create(stadium=self.stadium2, code='A3', section='A')
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'match': self.match.pk,
+                'section': 'A',
+                'price': 60000,
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(
+            response.json(),
+            {'message': _('2 seats were created successfully for the match')},
+        )
+        self.assertEqual(MatchSeatInfo.objects.filter(tier__price=60000).count(), 2)
+
+    def test_list_create_match_seat_info_POST_valid_all_seats(self):
+
+        MatchSeatInfo.objects.create(
+            match=self.match,
+            seat=self.seat,
+            price=5000,
+        )
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'match': self.match.pk,
+                'all_seats': True,
+                'price': 45000,
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(MatchSeatInfo.objects.count(), 3)
+        self.assertEqual(
+            MatchSeatInfo.objects.get(seat=self.seat).price,
+            5000,
+        )
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(seat=self.seat4).exists()
+        )
+
+    def test_list_create_match_seat_info_POST_invalid_fifth(self):
+        """
+        This method checks if all seats of the stadium are already defined.
+        """
+
+        MatchSeatInfo.objects.create(
+            match=self.match,
+            seat=self.seat,
+            price=5000,
+        )
+        MatchSeatInfo.objects.bulk_create(
+            [
+                MatchSeatInfo(match=self.match, seat=seat, price=5000)
+                for seat in (self.seat2, self.seat3)
+            ]
+        )
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'match': self.match.pk,
+                'all_seats': True,
+                'price': 45000,
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(MatchSeatInfo.objects.filter(tier__price=45000).count(), 0)
+        self.assertDictEqual(
+            response.json(),
+            {
+                'message': _(
+                    'All of these seats are already defined for the match.'
+                ),
+            },
+        )
+
 class TestListUpdateMatchSeatInfoAPIView(APITestCase):
 
     def setUp(self):
@@ -514,7 +787,7 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
 
         email = 'test@test.com'
         password = 'admin12345QQ!!'
-        user = User.objects.create_user(
+        self.user = user = User.objects.create_user(
             email=email,
             password=password,
         )
@@ -576,6 +849,13 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
 
     def test_list_update_match_seat_info_POST_valid(self):
 
+        for seat in (self.seat, self.seat2, self.seat3):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+
         response = self.client.put(
             path=self.url,
             data={
@@ -586,6 +866,14 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(
+                buyer=self.user,
+                is_reserved=True,
+                date_reserved__isnull=False,
+            ).count(),
+            3,
+        )
 
     def test_list_update_match_seat_info_POST_invalid_first(self):
         """
@@ -604,6 +892,7 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
     def test_list_update_match_seat_info_POST_invalid_second(self):
         """
         This method checks if one of seats is already reserved for this match.
+        Nothing must be reserved and the lost seat must be reported.
         """
 
         MatchSeatInfo.objects.create(
@@ -611,7 +900,14 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
             seat=self.seat,
             price=5000,
             is_reserved=True,
+            date_reserved=self.now,
         )
+        for seat in (self.seat2, self.seat3):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
 
         response = self.client.put(
             path=self.url,
@@ -622,13 +918,28 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
             **self.headers,
         )
 
-        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.status_code, HTTP_409_CONFLICT)
+        self.assertEqual(response.json()['seats'], [self.seat.pk])
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(buyer=self.user).exists()
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(is_reserved=True).count(),
+            1,
+        )
 
     def test_update_match_seat_info_POST_invalid_third(self):
         """
         This method checks if all selected seats, belongs to stadium or not.
         """
 
+        for seat in (self.seat, self.seat2):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+
         response = self.client.put(
             path=self.url,
             data={
@@ -639,6 +950,10 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['seats'], [self.seat4.pk])
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(is_reserved=True).exists()
+        )
 
     def test_list_update_match_seat_info_POST_invalid_fourth(self):
         """
@@ -678,3 +993,695 @@ class TestListUpdateMatchSeatInfoAPIView(APITestCase):
         )
 
         self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+
+    def test_list_update_match_seat_info_POST_invalid_sixth(self):
+        """
+        This method checks if a seat is given more than once. Nothing must
+        be reserved.
+        """
+
+        for seat in (self.seat, self.seat2):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+
+        response = self.client.put(
+            path=self.url,
+            data={
+                'seats': [1, 2, 1],
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()['seats'],
+            ['These seats are given more than once : 1.'],
+        )
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(is_reserved=True).exists()
+        )
+
+class TestBestAvailableSeatsAPIView(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+
+        email = 'test@test.com'
+        password = 'admin12345QQ!!'
+        self.user = user = User.objects.create_user(
+            email=email,
+            password=password,
+        )
+
+        api_login_url = reverse('accounts:api_login')
+
+        response = self.client.post(
+            api_login_url,
+            data={
+                'email': user.email,
+                'password': password,
+            },
+            format='json',
+        )
+        access_token = response.json().get('access')
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(access_token)}
+
+        self.stadium = Stadium.objects.create(
+            name='Azadi',
+        )
+        self.host_team = Team.objects.create(
+            name='Esteghlal',
+        )
+        self.guest_team = Team.objects.create(
+            name='Piroozi',
+        )
+
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=timezone.now(),
+        )
+        self.url = reverse(
+            'match:api_best_available_match_seat',
+            kwargs={'match_id': self.match.pk},
+        )
+
+        Seat.objects.create_layout(
+            self.stadium.pk,
+            (
+                ('A', 1, number, f'A1-{number}')
+                for number in range(1, 4)
+            ),
+        )
+        MatchSeatInfo.objects.define_stadium_seats(self.match, 5000)
+
+    def test_best_available_match_seat_POST_valid(self):
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'quantity': 3,
+                'section': 'A',
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(
+            [seat['code'] for seat in response.json()['seats']],
+            ['A1-1', 'A1-2', 'A1-3'],
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(
+                buyer=self.user,
+                is_reserved=True,
+            ).count(),
+            3,
+        )
+
+    def test_best_available_match_seat_POST_invalid_first(self):
+        """
+        This method checks if some parameters are missing.
+        """
+
+        response = self.client.post(
+            path=self.url,
+            data={},
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+
+    def test_best_available_match_seat_POST_invalid_second(self):
+        """
+        This method checks if there are not enough contiguous free seats.
+        Nothing must be reserved.
+        """
+
+        MatchSeatInfo.objects.filter(seat__code='A1-2').update(
+            is_reserved=True,
+        )
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'quantity': 2,
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_409_CONFLICT)
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(buyer=self.user).exists()
+        )
+
+    def test_best_available_match_seat_POST_invalid_third(self):
+        """
+        This method checks if user is not authorized.
+        """
+
+        response = self.client.post(
+            path=self.url,
+            data={
+                'quantity': 2,
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+
+    def test_best_available_match_seat_POST_invalid_fourth(self):
+        """
+        This method checks if match exist or not.
+        """
+
+        url = reverse(
+            'match:api_best_available_match_seat',
+            kwargs={'match_id': self.match.pk + 1},
+        )
+        response = self.client.post(
+            path=url,
+            data={
+                'quantity': 2,
+            },
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+class TestListCheckoutMatchSeatInfoAPIView(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+
+        email = 'test@test.com'
+        password = 'admin12345QQ!!'
+        self.user = user = User.objects.create_user(
+            email=email,
+            password=password,
+        )
+        self.user2 = User.objects.create_user(
+            email='test2@test.com',
+            password=password,
+        )
+
+        api_login_url = reverse('accounts:api_login')
+
+        response = self.client.post(
+            api_login_url,
+            data={
+                'email': user.email,
+                'password': password,
+            },
+            format='json',
+        )
+        access_token = response.json().get('access')
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(access_token)}
+
+        self.stadium = Stadium.objects.create(
+            name='Azadi',
+        )
+        self.host_team = Team.objects.create(
+            name='Esteghlal',
+        )
+        self.guest_team = Team.objects.create(
+            name='Piroozi',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+        self.url = reverse(
+            'match:api_checkout_list_match_seat',
+            kwargs={'match_id': self.match.pk},
+        )
+
+        expired = self.now - timedelta(hours=1)
+        holds = (
+            # (buyer, date_reserved)
+            (self.user, self.now),
+            (self.user, self.now),
+            (self.user, expired),
+            (self.user2, self.now),
+        )
+        self.seats = []
+        for number, (buyer, date_reserved) in enumerate(holds):
+            seat = Seat.objects.create(
+                stadium=self.stadium,
+                code=f'n{number}',
+            )
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+                buyer=buyer,
+                is_reserved=True,
+                date_reserved=date_reserved,
+            )
+            self.seats.append(seat)
+
+    def test_list_checkout_match_seat_info_POST_valid(self):
+
+        response = self.client.post(
+            path=self.url,
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.json()['seats'],
+            [self.seats[0].pk, self.seats[1].pk],
+        )
+        self.assertEqual(
+            list(
+                MatchSeatInfo.objects.filter(
+                    is_paid=True,
+                ).order_by('seat').values_list('seat', flat=True)
+            ),
+            [self.seats[0].pk, self.seats[1].pk],
+        )
+
+    def test_list_checkout_match_seat_info_POST_retry(self):
+        """
+        This method checks if paying again, confirms nothing.
+        """
+
+        self.client.post(path=self.url, format='json', **self.headers)
+
+        response = self.client.post(
+            path=self.url,
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()['seats'], [])
+        self.assertEqual(MatchSeatInfo.objects.filter(is_paid=True).count(), 2)
+
+    def test_list_checkout_match_seat_info_POST_invalid_first(self):
+        """
+        This method checks if user is not authorized.
+        """
+
+        response = self.client.post(path=self.url, format='json')
+
+        self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+        self.assertFalse(MatchSeatInfo.objects.filter(is_paid=True).exists())
+
+    def test_list_checkout_match_seat_info_POST_invalid_second(self):
+        """
+        This method checks if match exist or not.
+        """
+
+        url = reverse(
+            'match:api_checkout_list_match_seat',
+            kwargs={'match_id': 12},
+        )
+        response = self.client.post(path=url, format='json', **self.headers)
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+
+class TestMatchSeatMapAPIView(APITestCase):
+
+    def setUp(self):
+
+        seat_maps.clear()
+
+        self.client = APIClient()
+
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+        self.stadium = Stadium.objects.create(
+            name='Azadi',
+        )
+        self.host_team = Team.objects.create(
+            name='Esteghlal',
+        )
+        self.guest_team = Team.objects.create(
+            name='Piroozi',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+        self.url = reverse(
+            'match:api_match_seat_map',
+            kwargs={'match_id': self.match.pk},
+        )
+
+        self.seats = []
+        for number in range(3):
+            seat = Seat.objects.create(
+                stadium=self.stadium,
+                code=f'n{number}',
+            )
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+            self.seats.append(seat)
+
+    def test_match_seat_map_GET_valid(self):
+
+        response = self.client.get(path=self.url)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response['ETag'],
+            f'"{self.match.pk}-{response.json()["version"]}"',
+        )
+        self.assertEqual(
+            response.json()['seats'],
+            [[self.seats[0].pk, 3]],
+        )
+        self.assertEqual(
+            response.json()['tiers'],
+            {str(self.match.price_tiers.get().pk): 5000},
+        )
+
+    def test_match_seat_map_GET_not_modified(self):
+
+        etag = self.client.get(path=self.url)['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path=self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_match_seat_map_GET_modified(self):
+        """
+        This method checks if reserving a seat, changes the ETag.
+        """
+
+        etag = self.client.get(path=self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MatchSeatInfo.objects.reserve(
+                match_id=self.match.pk,
+                seats=[self.seats[0].pk],
+                buyer_id=self.user.pk,
+                now=self.now,
+            )
+        response = self.client.get(path=self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['available'], 'Bg==')
+
+    def test_match_seat_map_GET_invalid(self):
+        """
+        This method checks if match exist or not.
+        """
+
+        url = reverse(
+            'match:api_match_seat_map',
+            kwargs={'match_id': 12},
+        )
+        response = self.client.get(path=url)
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+
+class TestMatchInventoryAPIView(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+        self.url = reverse(
+            'match:api_match_inventory',
+            kwargs={'match_id': self.match.pk},
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(5)
+        ]
+        MatchSeatInfo.objects.define_stadium_seats(self.match, 5000)
+
+    def test_match_inventory_GET_valid(self):
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=[self.seats[0].pk, self.seats[1].pk],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+        MatchSeatInfo.objects.confirm(self.match.pk, self.user.pk, self.now)
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=[self.seats[2].pk],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path=self.url)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertDictEqual(
+            response.json(),
+            {'match': self.match.pk, 'available': 2, 'held': 1, 'sold': 2},
+        )
+
+    def test_match_inventory_GET_without_seats(self):
+
+        match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now + timedelta(days=1),
+        )
+
+        response = self.client.get(
+            path=reverse(
+                'match:api_match_inventory',
+                kwargs={'match_id': match.pk},
+            ),
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertDictEqual(
+            response.json(),
+            {'match': match.pk, 'available': 0, 'held': 0, 'sold': 0},
+        )
+
+    def test_match_inventory_GET_invalid(self):
+        """
+        This method checks if the match doesn't exist.
+        """
+
+        response = self.client.get(
+            path=reverse(
+                'match:api_match_inventory',
+                kwargs={'match_id': self.match.pk + 1},
+            ),
+        )
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+@override_settings(
+    MATCH_ADMISSION={
+        'ENABLED': True,
+        'BACKEND': 'apps.match.admission.InMemoryAdmissionBackend',
+        'TICKET_MAX_AGE': 60,
+        'OPTIONS': {
+            'ACTIVE_SHOPPERS': 1,
+            'MIN_ACTIVE_SHOPPERS': 1,
+            'MAX_ACTIVE_SHOPPERS': 1,
+            'SESSION_TTL': 600,
+            'TARGET_COMMIT_LATENCY': 0.05,
+        },
+    },
+)
+class TestMatchQueueAPIView(APITestCase):
+
+    def setUp(self):
+
+        admission.get_backend.cache_clear()
+        self.addCleanup(admission.get_backend.cache_clear)
+
+        self.client = APIClient()
+
+        password = 'admin12345QQ!!'
+        self.headers = []
+        for email in ('test@test.com', 'test2@test.com'):
+            user = User.objects.create_user(email=email, password=password)
+            response = self.client.post(
+                reverse('accounts:api_login'),
+                data={'email': user.email, 'password': password},
+                format='json',
+            )
+            access_token = response.json().get('access')
+            self.headers.append(
+                {'HTTP_AUTHORIZATION': 'Bearer {}'.format(access_token)}
+            )
+
+        self.stadium = Stadium.objects.create(
+            name='Azadi',
+        )
+        self.host_team = Team.objects.create(
+            name='Esteghlal',
+        )
+        self.guest_team = Team.objects.create(
+            name='Piroozi',
+        )
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=timezone.now(),
+        )
+        self.seat = Seat.objects.create(stadium=self.stadium, code='n1')
+        MatchSeatInfo.objects.create(
+            match=self.match,
+            seat=self.seat,
+            price=5000,
+        )
+
+        kwargs = {'match_id': self.match.pk}
+        self.url = reverse('match:api_join_match_queue', kwargs=kwargs)
+        self.status_url = reverse(
+            'match:api_match_queue_status',
+            kwargs=kwargs,
+        )
+        self.booking_url = reverse(
+            'match:api_update_list_match_seat',
+            kwargs=kwargs,
+        )
+        self.checkout_url = reverse(
+            'match:api_checkout_list_match_seat',
+            kwargs=kwargs,
+        )
+
+    def join(self, headers):
+
+        response = self.client.post(path=self.url, format='json', **headers)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+        return response.json()
+
+    def test_match_queue_POST_valid(self):
+
+        first = self.join(self.headers[0])
+        second = self.join(self.headers[1])
+
+        self.assertTrue(first['admitted'])
+        self.assertFalse(second['admitted'])
+        self.assertEqual(second['position'], 1)
+
+        response = self.client.get(
+            path=self.status_url,
+            HTTP_X_QUEUE_TICKET=second['ticket'],
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.json()['position'], 1)
+
+        # The first user reserves and pays; the place goes to the second.
+        response = self.client.put(
+            path=self.booking_url,
+            data={'seats': [self.seat.pk]},
+            format='json',
+            HTTP_X_QUEUE_TICKET=first['ticket'],
+            **self.headers[0],
+        )
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+
+        self.client.post(
+            path=self.checkout_url,
+            format='json',
+            **self.headers[0],
+        )
+
+        response = self.client.get(
+            path=self.status_url,
+            HTTP_X_QUEUE_TICKET=second['ticket'],
+        )
+        self.assertTrue(response.json()['admitted'])
+
+    def test_match_queue_POST_invalid_first(self):
+        """
+        This method checks if users who are waiting, or don't send their own
+        ticket, can't reserve seats.
+        """
+
+        first = self.join(self.headers[0])
+        second = self.join(self.headers[1])
+
+        for ticket, headers in (
+            (second['ticket'], self.headers[1]),
+            (first['ticket'], self.headers[1]),
+            ('', self.headers[0]),
+        ):
+            response = self.client.put(
+                path=self.booking_url,
+                data={'seats': [self.seat.pk]},
+                format='json',
+                HTTP_X_QUEUE_TICKET=ticket,
+                **headers,
+            )
+            self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+
+        self.assertFalse(MatchSeatInfo.objects.filter(is_reserved=True).exists())
+
+    def test_match_queue_POST_invalid_second(self):
+        """
+        This method checks if match exist or not.
+        """
+
+        url = reverse('match:api_join_match_queue', kwargs={'match_id': 12})
+        response = self.client.post(path=url, format='json', **self.headers[0])
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_match_queue_status_GET_invalid(self):
+        """
+        This method checks if the ticket is valid for the match.
+        """
+
+        ticket = admission.make_ticket(self.match.pk + 1, 1)
+
+        for headers in ({}, {'HTTP_X_QUEUE_TICKET': ticket}):
+            response = self.client.get(path=self.status_url, **headers)
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
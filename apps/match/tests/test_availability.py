@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from apps.match.availability import SeatBitmap, seat_availability
+from apps.match.models import Match, MatchSeatInfo
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+class TestSeatBitmap(TestCase):
+
+    def setUp(self):
+
+        self.bitmap = SeatBitmap(
+            rows=[(3, False), (5, True), (8, False), (20, False)],
+            epoch=0,
+        )
+
+    def test_ordinal(self):
+
+        self.assertEqual(self.bitmap.ordinal(3), 0)
+        self.assertEqual(self.bitmap.ordinal(20), 3)
+        self.assertIsNone(self.bitmap.ordinal(4))
+        self.assertIsNone(self.bitmap.ordinal(21))
+
+    def test_check(self):
+
+        self.assertEqual(self.bitmap.check([3, 8]), ([], []))
+        self.assertEqual(self.bitmap.check([3, 4, 5]), ([4], [5]))
+
+    def test_seat_ranges(self):
+
+        bitmap = SeatBitmap(
+            rows=[(3, False), (4, False), (5, True), (9, False)],
+            epoch=0,
+        )
+
+        self.assertEqual(bitmap.seat_ranges(), [[3, 3], [9, 1]])
+        self.assertEqual(
+            [bitmap.ordinal(seat_id) for seat_id in (2, 3, 5, 6, 9, 10)],
+            [None, 0, 2, None, 3, None],
+        )
+        self.assertEqual(SeatBitmap(rows=[], epoch=0).seat_ranges(), [])
+
+    def test_set_reserved(self):
+
+        self.bitmap.set_reserved(self.bitmap.ordinal(8))
+
+        self.assertEqual(self.bitmap.check([3, 8]), ([], [8]))
+
+
+class TestSeatAvailability(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(3)
+        ]
+        for seat in self.seats[:2]:
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=4500,
+            )
+
+    def test_check(self):
+
+        self.assertEqual(
+            seat_availability.check(
+                self.match.pk,
+                [seat.pk for seat in self.seats],
+            ),
+            ([self.seats[2].pk], []),
+        )
+
+    def test_check_after_define(self):
+        """
+        This method checks if defining a seat, invalidates the bitmap.
+        """
+
+        seat_availability.check(self.match.pk, [self.seats[0].pk])
+        MatchSeatInfo.objects.create(
+            match=self.match,
+            seat=self.seats[2],
+            price=4500,
+        )
+
+        self.assertEqual(
+            seat_availability.check(self.match.pk, [self.seats[2].pk]),
+            ([], []),
+        )
+
+    def test_lost_seats_are_rejected_without_query(self):
+
+        seat_id = self.seats[0].pk
+
+        # The bitmap is built, then the seat is taken behind its back.
+        seat_availability.check(self.match.pk, [seat_id])
+        MatchSeatInfo.objects.filter(seat_id=seat_id).update(is_reserved=True)
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=[seat_id],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+
+        with self.assertNumQueries(0):
+            result = MatchSeatInfo.objects.reserve(
+                match_id=self.match.pk,
+                seats=[seat_id],
+                buyer_id=self.user.pk,
+                now=self.now,
+            )
+
+        self.assertEqual(result, ([], [seat_id]))
+
+    def test_unknown_match_is_not_kept(self):
+
+        bitmap = seat_availability.get(self.match.pk + 100)
+
+        self.assertEqual(bitmap.size, 0)
+        self.assertNotIn(
+            ('default', self.match.pk + 100),
+            seat_availability._bitmaps,
+        )
+
+    @override_settings(MATCH_SEAT_AVAILABILITY_MAX_MATCHES=1)
+    def test_least_recently_used_bitmap_is_dropped(self):
+
+        match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.guest_team,
+            guest_team=self.host_team,
+            datetime=self.now + timedelta(days=1),
+        )
+        MatchSeatInfo.objects.create(
+            match=match,
+            seat=self.seats[0],
+            price=4500,
+        )
+
+        seat_availability.get(self.match.pk)
+        seat_availability.get(match.pk)
+
+        self.assertEqual(
+            list(seat_availability._bitmaps),
+            [('default', match.pk)],
+        )
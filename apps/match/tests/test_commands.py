@@ -0,0 +1,458 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.test import (
+    TestCase,
+    TransactionTestCase,
+    LiveServerTestCase,
+    override_settings,
+)
+from django.core.management import call_command, CommandError
+from django.db.models import F
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from config.slow_queries import JsonLinesFile
+from apps.match.models import Match, MatchInventory, MatchSeatInfo
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+@override_settings(MATCH_SEAT_HOLD_TTL=timedelta(minutes=10))
+class TestReleaseExpiredSeatsCommand(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        expired = self.now - timedelta(minutes=11)
+        states = (
+            # (is_reserved, is_paid, date_reserved)
+            (True, False, expired),
+            (True, False, expired),
+            (True, False, expired),
+            (True, True, expired),
+            (True, False, self.now),
+            (False, False, None),
+        )
+        for number, (is_reserved, is_paid, date_reserved) in enumerate(states):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=Seat.objects.create(
+                    stadium=self.stadium,
+                    code=f'n{number}',
+                ),
+                price=4500,
+                buyer=self.user if is_reserved else None,
+                is_reserved=is_reserved,
+                is_paid=is_paid,
+                date_reserved=date_reserved,
+            )
+
+    def test_release_expired_seats(self):
+
+        out = StringIO()
+        call_command('release_expired_seats', batch_size=2, stdout=out)
+
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(is_reserved=False).count(),
+            4,
+        )
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(
+                is_reserved=False,
+                buyer__isnull=False,
+            ).exists()
+        )
+        self.assertTrue(
+            MatchSeatInfo.objects.filter(is_paid=True, buyer=self.user).exists()
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('Released 2 seats in'))
+        self.assertTrue(lines[1].startswith('Released 1 seats in'))
+        self.assertIn('Released 3 seats', lines[2])
+        self.assertEqual(
+            MatchInventory.objects.counts((self.match.pk,))[self.match.pk],
+            {'available': 4, 'held': 1, 'sold': 1},
+        )
+
+    def test_release_expired_seats_lost(self):
+        """
+        This method checks if a sweep goes on after a full batch which
+        released fewer seats, e.g. some were paid in the meantime.
+        """
+
+        out = StringIO()
+
+        with mock.patch.object(
+            MatchSeatInfo.objects,
+            'release_expired',
+            side_effect=[(2, 1), (2, 2), (1, 1)],
+        ) as release_expired:
+            call_command('release_expired_seats', batch_size=2, stdout=out)
+
+        self.assertEqual(release_expired.call_count, 3)
+        self.assertIn('Released 4 seats', out.getvalue())
+
+
+class TestReconcileMatchInventoryCommand(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=timezone.now(),
+        )
+        MatchSeatInfo.objects.bulk_create(
+            [
+                MatchSeatInfo(
+                    match=self.match,
+                    seat=Seat.objects.create(
+                        stadium=self.stadium,
+                        code=f'n{number}',
+                    ),
+                    price=4500,
+                )
+                for number in range(4)
+            ]
+        )
+
+    def test_reconcile_match_inventory(self):
+
+        # Bypasses the models, so counters drift.
+        MatchSeatInfo.objects.filter(
+            seat__code__in=('n0', 'n1'),
+        ).update(is_reserved=True, is_paid=True)
+
+        out = StringIO()
+        call_command('reconcile_match_inventory', stdout=out)
+
+        self.assertEqual(
+            MatchInventory.objects.counts((self.match.pk,))[self.match.pk],
+            {'available': 2, 'held': 0, 'sold': 2},
+        )
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                f'Rebuilt counters of match {self.match.pk}',
+                'Checked 1 matches, rebuilt 1',
+            ],
+        )
+
+        out = StringIO()
+        call_command('reconcile_match_inventory', stdout=out)
+
+        self.assertEqual(out.getvalue(), 'Checked 1 matches, rebuilt 0\n')
+
+    def test_reconcile_match_inventory_shards(self):
+
+        call_command(
+            'reconcile_match_inventory',
+            match=[self.match.pk],
+            shards=4,
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(
+            MatchInventory.objects.filter(match=self.match).count(),
+            4,
+        )
+        self.assertEqual(
+            MatchInventory.objects.counts((self.match.pk,))[self.match.pk],
+            {'available': 4, 'held': 0, 'sold': 0},
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_match_inventory', shards=4)
+
+class TestBenchmarkMatchIndexesCommand(TransactionTestCase):
+    """
+    SQLite schema editor can't be used inside a transaction, even if it
+    only collects SQL; so this test isn't wrapped in one.
+    """
+
+    def test_benchmark_match_indexes(self):
+
+        out = StringIO()
+        call_command(
+            'benchmark_match_indexes',
+            matches=2,
+            seats=50,
+            users=10,
+            repeat=2,
+            json=True,
+            stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['rows'], 100)
+        self.assertEqual(
+            set(report['phases']),
+            {'original', 'current'},
+        )
+        self.assertIn(
+            'match_seat_unpaid_hold_idx',
+            ' '.join(
+                report['phases']['current']['queries']['expiry sweep']['plan']
+            ),
+        )
+
+
+class TestBenchmarkSqliteConcurrencyCommand(TransactionTestCase):
+
+    def test_benchmark_sqlite_concurrency(self):
+
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite_concurrency',
+            writers=2,
+            readers=1,
+            duration=0.5,
+            seats=100,
+            json=True,
+            stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report), {'default', 'production'})
+        for stats in report.values():
+            self.assertGreater(stats['bookings'], 0)
+            self.assertEqual(
+                stats['attempts'],
+                stats['bookings'] + stats['conflicts'] + stats['lock_errors'],
+            )
+
+
+class TestLoadtestCommand(LiveServerTestCase):
+    """
+    The test database is an in-memory SQLite database in shared cache mode,
+    whose table locks fail at once instead of waiting; so there's a single
+    buyer here.
+    """
+
+    def test_loadtest(self):
+
+        out = StringIO()
+        call_command(
+            'loadtest',
+            url=self.live_server_url,
+            stadiums=1,
+            seats=20,
+            matches=2,
+            users=2,
+            concurrency=1,
+            duration=0.5,
+            signups=2,
+            create_matches=2,
+            tag='test',
+            stdout=out,
+        )
+
+        report = json.loads(out.getvalue())
+        endpoints = report['endpoints']
+
+        self.assertEqual(
+            set(endpoints),
+            {'signup', 'login', 'create_match', 'book', 'checkout'},
+        )
+        self.assertEqual(endpoints['signup']['statuses'], {'201': 2})
+        self.assertEqual(endpoints['login']['statuses'], {'200': 2})
+        self.assertEqual(endpoints['create_match']['statuses'], {'201': 2})
+        self.assertGreater(endpoints['book']['requests'], 0)
+        self.assertEqual(endpoints['book']['error_rate'], 0)
+        self.assertEqual(
+            endpoints['checkout']['requests'],
+            endpoints['book']['statuses'].get('202', 0),
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(is_paid=True).count(),
+            2 * endpoints['checkout']['requests'],
+        )
+
+
+class TestSeedDataCommand(TestCase):
+
+    def test_seed_data(self):
+
+        out = StringIO()
+        call_command(
+            'seed_data',
+            stadiums=2,
+            seats=30,
+            teams=4,
+            matches=6,
+            users=5,
+            staff=1,
+            password='seed12345QQ!!',
+            chunk_size=7,
+            stdout=out,
+        )
+
+        self.assertEqual(Stadium.objects.count(), 2)
+        self.assertEqual(Seat.objects.count(), 60)
+        self.assertEqual(Team.objects.count(), 4)
+        self.assertEqual(Match.objects.count(), 6)
+        self.assertEqual(MatchSeatInfo.objects.count(), 6 * 30)
+        self.assertEqual(User.objects.filter(is_staff=False).count(), 5)
+        self.assertEqual(User.objects.filter(is_staff=True).count(), 1)
+
+        self.assertTrue(
+            User.objects.get(
+                email='seed-user-3@seed.local',
+            ).check_password('seed12345QQ!!')
+        )
+        self.assertFalse(
+            Match.objects.filter(host_team=F('guest_team')).exists()
+        )
+        # Seats of a match are the seats of its stadium.
+        self.assertFalse(
+            MatchSeatInfo.objects.exclude(
+                seat__stadium=F('match__stadium'),
+            ).exists()
+        )
+        self.assertFalse(Match.objects.filter(seat_map_version=0).exists())
+        self.assertIn('Created 180 seats of matches', out.getvalue())
+
+    def test_seed_data_invalid(self):
+        """
+        This method checks if a single team is rejected.
+        """
+
+        with self.assertRaises(CommandError):
+            call_command('seed_data', teams=1, stdout=StringIO())
+
+
+class TestSummarizeSlowQueriesCommand(TestCase):
+
+    def setUp(self):
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow_queries.jsonl')
+        self.deploy = timezone.now()
+
+        file = JsonLinesFile(self.path, 1024 * 1024, 2)
+
+        def write(fingerprint, minutes, duration, **record):
+            file.write({
+                'time': (self.deploy + timedelta(minutes=minutes)).isoformat(),
+                'duration': duration,
+                'fingerprint': fingerprint,
+                'sql': f'SELECT {fingerprint}',
+                'view': 'match:api_create_list_match_seat',
+                'origin': ['apps/match/serializers.py:252 validate_match'],
+                **record,
+            })
+
+        # Slower after the deploy.
+        for minutes, duration in ((-20, 100), (-10, 120), (10, 400)):
+            write('validate', minutes, duration)
+        write('validate', 20, 500, plan=['SEARCH match_match'])
+        # As slow as before.
+        write('seat_map', -5, 200, view='match:api_seat_map', origin=[])
+        write('seat_map', 5, 210, view='match:api_seat_map', origin=[])
+        # Slow only before it.
+        write('expiry', -30, 900, view=None, origin=[])
+
+    def summarize(self, **options):
+
+        out = StringIO()
+        call_command(
+            'summarize_slow_queries',
+            path=self.path,
+            json=True,
+            stdout=out,
+            **options,
+        )
+
+        return json.loads(out.getvalue())
+
+    def test_summarize_slow_queries(self):
+
+        summary = self.summarize()
+
+        self.assertEqual(list(summary), ['validate', 'expiry', 'seat_map'])
+        self.assertEqual(summary['validate']['count'], 4)
+        self.assertEqual(summary['validate']['total_ms'], 1120)
+        self.assertEqual(summary['validate']['max_ms'], 500)
+        self.assertEqual(
+            summary['validate']['origin'],
+            'apps/match/serializers.py:252 validate_match',
+        )
+        self.assertEqual(summary['validate']['plan'], ['SEARCH match_match'])
+        self.assertIsNone(summary['expiry']['view'])
+
+        summary = self.summarize(top=1, sort='count')
+        self.assertEqual(list(summary), ['validate'])
+
+    def test_summarize_slow_queries_split(self):
+
+        summary = self.summarize(split=self.deploy.isoformat())
+
+        self.assertEqual(list(summary), ['validate', 'seat_map'])
+        self.assertEqual(
+            summary['validate']['before'],
+            {'count': 2, 'p95_ms': 120},
+        )
+        self.assertTrue(summary['validate']['regression'])
+        self.assertFalse(summary['seat_map']['regression'])
+
+        out = StringIO()
+        call_command(
+            'summarize_slow_queries',
+            path=self.path,
+            split=self.deploy.isoformat(),
+            stdout=out,
+        )
+        self.assertIn('validate : 2 runs (regression)', out.getvalue())
+        self.assertIn('before : 2 runs, p95 120 ms', out.getvalue())
+
+    def test_summarize_slow_queries_since(self):
+
+        summary = self.summarize(
+            since=(self.deploy - timedelta(minutes=15)).isoformat(),
+            until=self.deploy.isoformat(),
+        )
+
+        self.assertEqual(
+            {key: stats['count'] for key, stats in summary.items()},
+            {'validate': 1, 'seat_map': 1},
+        )
+
+    def test_summarize_slow_queries_invalid(self):
+        """
+        This method checks if a datetime without a timezone is rejected.
+        """
+
+        with self.assertRaises(CommandError):
+            self.summarize(since='2026-10-18T12:00:00')
@@ -0,0 +1,189 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+from apps.match.models import Match, MatchSeatInfo, IdempotencyKey
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+class TestIdempotent(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+
+        email = 'test@test.com'
+        password = 'admin12345QQ!!'
+        self.user = user = User.objects.create_user(
+            email=email,
+            password=password,
+        )
+
+        api_login_url = reverse('accounts:api_login')
+
+        response = self.client.post(
+            api_login_url,
+            data={
+                'email': user.email,
+                'password': password,
+            },
+            format='json',
+        )
+        access_token = response.json().get('access')
+        self.headers = {'HTTP_AUTHORIZATION': 'Bearer {}'.format(access_token)}
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+        self.url = reverse(
+            'match:api_update_list_match_seat',
+            kwargs={'match_id': self.match.pk},
+        )
+        self.checkout_url = reverse(
+            'match:api_checkout_list_match_seat',
+            kwargs={'match_id': self.match.pk},
+        )
+
+        self.seats = []
+        for number in range(3):
+            seat = Seat.objects.create(
+                stadium=self.stadium,
+                code=f'n{number}',
+            )
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000,
+            )
+            self.seats.append(seat.pk)
+
+    def reserve(self, seats, key):
+
+        return self.client.put(
+            path=self.url,
+            data={'seats': seats},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+            **self.headers,
+        )
+
+    def test_retry_is_replayed(self):
+
+        first = self.reserve(self.seats, 'key-1')
+        retry = self.reserve(self.seats, 'key-1')
+
+        self.assertEqual(first.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(retry.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_checkout_retry_is_replayed(self):
+
+        self.reserve(self.seats, 'key-1')
+
+        first = self.client.post(
+            path=self.checkout_url,
+            HTTP_IDEMPOTENCY_KEY='key-2',
+            **self.headers,
+        )
+        retry = self.client.post(
+            path=self.checkout_url,
+            HTTP_IDEMPOTENCY_KEY='key-2',
+            **self.headers,
+        )
+
+        self.assertEqual(retry.status_code, HTTP_200_OK)
+        self.assertEqual(retry.json()['seats'], self.seats)
+        self.assertEqual(retry.json(), first.json())
+
+    def test_key_of_another_request(self):
+
+        self.reserve(self.seats[:1], 'key-1')
+        response = self.reserve(self.seats[1:], 'key-1')
+
+        self.assertEqual(response.status_code, HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(
+                seat_id__in=self.seats[1:],
+                is_reserved=True,
+            ).exists()
+        )
+
+    @override_settings(IDEMPOTENCY_KEY_WAIT=0.1)
+    def test_request_in_progress(self):
+
+        response = self.reserve(self.seats, 'key-1')
+        IdempotencyKey.objects.filter(key='key-1').update(status_code=None)
+
+        response = self.reserve(self.seats, 'key-1')
+
+        self.assertEqual(response.status_code, HTTP_409_CONFLICT)
+
+    def test_request_died(self):
+        """
+        This method checks if a key whose request is in progress for longer
+        than its lease, is taken over by a retry.
+        """
+
+        self.reserve(self.seats[:1], 'key-1')
+        IdempotencyKey.objects.filter(key='key-1').update(
+            status_code=None,
+            date_created=self.now - timedelta(minutes=1),
+        )
+
+        response = self.reserve(self.seats[1:], 'key-1')
+
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(
+            IdempotencyKey.objects.get(key='key-1').status_code,
+            HTTP_202_ACCEPTED,
+        )
+
+    def test_key_too_long(self):
+        """
+        This method checks if keys longer than 255 characters are rejected.
+        """
+
+        response = self.reserve(self.seats, 'k' * 256)
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(is_reserved=True).exists()
+        )
+
+    def test_expired_key(self):
+
+        self.reserve(self.seats[:1], 'key-1')
+        IdempotencyKey.objects.filter(key='key-1').update(
+            date_created=self.now - timedelta(days=2),
+        )
+
+        response = self.reserve(self.seats[1:], 'key-1')
+
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
@@ -1,13 +1,19 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest import mock
 
 from django.test import TestCase
-from django.db import IntegrityError
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.db.models import Count
 from django.utils import timezone
+from django.contrib.auth import get_user_model
 
-from apps.match.models import Match, MatchSeatInfo
+from apps.match.models import Match, MatchInventory, MatchSeatInfo, PriceTier
 from apps.stadium.models import Stadium, Seat
 from apps.team.models import Team
 
+User = get_user_model()
+
 
 class TestMatchModel(TestCase):
 
@@ -132,3 +138,617 @@ class TestMatchSeatInfoModel(TestCase):
     def test_match_seat_info_model_clean_method(self):
 
         self.assertIsNone(self.match_seat_info.clean())
+
+
+    def test_match_seat_info_price_tier(self):
+
+        tier = self.match_seat_info.tier
+
+        self.assertEqual(tier.match, self.match)
+        self.assertEqual(tier.price, self.price)
+
+        # Same price, same tier; a new price, a new tier.
+        seat = Seat.objects.create(stadium=self.stadium, code='n257')
+        self.assertEqual(
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=self.price,
+            ).tier,
+            tier,
+        )
+
+        self.match_seat_info.price = 6000
+        self.match_seat_info.save()
+
+        self.assertEqual(PriceTier.objects.filter(match=self.match).count(), 2)
+        self.assertEqual(
+            MatchSeatInfo.objects.get(pk=self.match_seat_info.pk).price,
+            6000,
+        )
+
+    def test_match_seat_info_tier_of_another_match(self):
+        """
+        This method checks if a seat can't get the price tier of another
+        match.
+        """
+
+        match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now + timedelta(days=1),
+        )
+        self.match_seat_info.tier = PriceTier.objects.create(
+            match=match,
+            price=self.price,
+        )
+
+        with self.assertRaises(ValidationError):
+            self.match_seat_info.clean()
+        with self.assertRaises(ValueError):
+            self.match_seat_info.save()
+
+        self.assertEqual(
+            MatchSeatInfo.objects.get(pk=self.match_seat_info.pk).tier.match,
+            self.match,
+        )
+
+
+class TestPriceTierQuerySet(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=timezone.now(),
+        )
+
+        seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(6)
+        ]
+        MatchSeatInfo.objects.bulk_create(
+            [
+                MatchSeatInfo(
+                    match=self.match,
+                    seat=seat,
+                    price=4500 if number < 4 else 9000,
+                )
+                for number, seat in enumerate(seats)
+            ]
+        )
+
+    def version(self):
+        return Match.objects.get(pk=self.match.pk).seat_map_version
+
+    def test_bulk_create_price_tiers(self):
+
+        self.assertEqual(
+            dict(
+                PriceTier.objects.filter(match=self.match).annotate(
+                    seats_number=Count('seats'),
+                ).values_list('price', 'seats_number')
+            ),
+            {4500: 4, 9000: 2},
+        )
+
+    def test_unique_constraint_match_price(self):
+
+        with self.assertRaises(IntegrityError):
+            PriceTier.objects.create(match=self.match, price=4500)
+
+    def test_reprice(self):
+
+        tier = PriceTier.objects.get(match=self.match, price=4500)
+        version = self.version()
+
+        # Savepoint, both tiers, the UPDATE and the version of the seat map,
+        # whatever the number of seats.
+        with self.assertNumQueries(6):
+            repriced = PriceTier.objects.reprice(self.match.pk, 4500, 5000)
+
+        self.assertEqual(repriced, tier)
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(tier__price=5000).count(),
+            4,
+        )
+        self.assertEqual(self.version(), version + 1)
+
+    def test_reprice_to_existing_price(self):
+
+        tier = PriceTier.objects.get(match=self.match, price=9000)
+
+        repriced = PriceTier.objects.reprice(self.match.pk, 4500, 9000)
+
+        self.assertEqual(repriced, tier)
+        self.assertEqual(
+            list(PriceTier.objects.filter(match=self.match)),
+            [tier],
+        )
+        self.assertEqual(tier.seats.count(), 6)
+
+    def test_reprice_unknown_price(self):
+
+        self.assertIsNone(PriceTier.objects.reprice(self.match.pk, 1, 2))
+
+    def test_delete_match(self):
+
+        self.match.delete()
+
+        self.assertFalse(PriceTier.objects.exists())
+        self.assertFalse(MatchSeatInfo.objects.exists())
+
+class TestMatchSeatInfoQuerySet(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+        self.user2 = User.objects.create_user(
+            email='test2@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(3)
+        ]
+        for seat in self.seats:
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=4500,
+            )
+
+    def test_reserve(self):
+
+        seat_ids = [seat.pk for seat in self.seats]
+
+        result = MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids,
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+
+        self.assertEqual(result, ([], []))
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(buyer=self.user).count(),
+            3,
+        )
+
+    def test_reserve_lost_seats_roll_back(self):
+
+        seat_ids = [seat.pk for seat in self.seats]
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids[:1],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+        result = MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids,
+            buyer_id=self.user2.pk,
+            now=timezone.now(),
+        )
+
+        self.assertEqual(result, ([], seat_ids[:1]))
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(buyer=self.user2).exists()
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.get(seat=self.seats[0]).buyer,
+            self.user,
+        )
+
+    def test_reserve_undefined_seats(self):
+
+        seat = Seat.objects.create(stadium=self.stadium, code='n100')
+
+        result = MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=[self.seats[0].pk, seat.pk],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+
+        self.assertEqual(result, ([seat.pk], []))
+        self.assertFalse(
+            MatchSeatInfo.objects.filter(is_reserved=True).exists()
+        )
+
+    def test_release_expired(self):
+
+        seat_ids = [seat.pk for seat in self.seats]
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids,
+            buyer_id=self.user.pk,
+            now=self.now - timedelta(hours=1),
+        )
+        MatchSeatInfo.objects.filter(seat=self.seats[0]).update(is_paid=True)
+
+        released = MatchSeatInfo.objects.release_expired(
+            now=self.now,
+            batch_size=1,
+        )
+
+        self.assertEqual(released, (1, 1))
+        self.assertEqual(
+            MatchSeatInfo.objects.release_expired(
+                now=self.now,
+                batch_size=10,
+            ),
+            (1, 1),
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(
+                is_reserved=False,
+                buyer__isnull=True,
+                date_reserved__isnull=True,
+            ).count(),
+            2,
+        )
+
+    def test_define_stadium_seats(self):
+
+        section_seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'A{number}',
+                                section='A')
+            for number in range(4)
+        ]
+        Seat.objects.create(stadium=self.stadium, code='B0', section='B')
+        version = Match.objects.get(pk=self.match.pk).seat_map_version
+
+        defined = MatchSeatInfo.objects.define_stadium_seats(
+            self.match,
+            7000,
+            section='A',
+        )
+
+        self.assertEqual(defined, 4)
+        self.assertSetEqual(
+            set(
+                MatchSeatInfo.objects.filter(tier__price=7000).values_list(
+                    'seat_id',
+                    flat=True,
+                )
+            ),
+            {seat.pk for seat in section_seats},
+        )
+        self.assertEqual(
+            Match.objects.get(pk=self.match.pk).seat_map_version,
+            version + 1,
+        )
+
+        # The rest of the stadium : only section B is still undefined.
+        self.assertEqual(
+            MatchSeatInfo.objects.define_stadium_seats(self.match, 3000),
+            1,
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.define_stadium_seats(self.match, 3000),
+            0,
+        )
+        self.assertEqual(
+            MatchSeatInfo.objects.filter(
+                match=self.match,
+                is_reserved=False,
+                is_paid=False,
+            ).count(),
+            8,
+        )
+
+    def test_define_seats(self):
+
+        new_seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'A{number}')
+            for number in range(2)
+        ]
+        seat_ids = [seat.pk for seat in self.seats[:1] + new_seats]
+
+        self.assertEqual(
+            MatchSeatInfo.objects.define_seats(self.match, 7000, seat_ids),
+            ([self.seats[0].pk], []),
+        )
+        self.assertSetEqual(
+            set(
+                MatchSeatInfo.objects.filter(tier__price=7000).values_list(
+                    'seat_id',
+                    flat=True,
+                )
+            ),
+            {seat.pk for seat in new_seats},
+        )
+
+    def test_define_seats_without_returning(self):
+        """
+        This method checks if inserted seats are found without RETURNING,
+        e.g. on SQLite before 3.35.
+        """
+
+        new_seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'A{number}')
+            for number in range(2)
+        ]
+        other_seat = Seat.objects.create(
+            stadium=Stadium.objects.create(name='Shiroodi'),
+            code='A0',
+        )
+        seat_ids = [seat.pk for seat in self.seats[:1] + new_seats]
+
+        with mock.patch.object(
+            type(connection.features),
+            'can_return_rows_from_bulk_insert',
+            False,
+        ):
+            self.assertEqual(
+                MatchSeatInfo.objects.define_seats(
+                    self.match,
+                    7000,
+                    seat_ids + [other_seat.pk],
+                ),
+                ([self.seats[0].pk], [other_seat.pk]),
+            )
+            self.assertEqual(
+                MatchSeatInfo.objects.define_seats(self.match, 7000, seat_ids),
+                ([self.seats[0].pk], []),
+            )
+
+        self.assertSetEqual(
+            set(
+                MatchSeatInfo.objects.filter(tier__price=7000).values_list(
+                    'seat_id',
+                    flat=True,
+                )
+            ),
+            {seat.pk for seat in new_seats},
+        )
+
+    def test_define_seats_of_other_stadium(self):
+        """
+        Nothing is defined when one of seats isn't a seat of the stadium of
+        the match, and the new tier isn't left behind.
+        """
+
+        other = Stadium.objects.create(name='Shiroodi')
+        new_seat = Seat.objects.create(stadium=self.stadium, code='A0')
+        other_seat = Seat.objects.create(stadium=other, code='A0')
+
+        self.assertEqual(
+            MatchSeatInfo.objects.define_seats(
+                self.match,
+                7000,
+                [new_seat.pk, other_seat.pk],
+            ),
+            ([], [other_seat.pk]),
+        )
+        self.assertFalse(MatchSeatInfo.objects.filter(seat=new_seat).exists())
+        self.assertFalse(PriceTier.objects.filter(price=7000).exists())
+
+
+class TestMatchInventoryQuerySet(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(6)
+        ]
+        MatchSeatInfo.objects.bulk_create(
+            [
+                MatchSeatInfo(match=self.match, seat=seat, price=4500)
+                for seat in self.seats[:4]
+            ]
+        )
+
+    def counts(self):
+        return MatchInventory.objects.counts((self.match.pk,))[self.match.pk]
+
+    def assertCounts(self, available, held, sold):
+
+        self.assertEqual(
+            self.counts(),
+            {'available': available, 'held': held, 'sold': sold},
+        )
+        # Counters always agree with the seats.
+        self.assertEqual(
+            MatchInventory.objects.reconcile((self.match.pk,)),
+            [],
+        )
+
+    def test_seats_defined(self):
+
+        self.assertCounts(4, 0, 0)
+
+        MatchSeatInfo.objects.define_stadium_seats(self.match, 4500)
+
+        self.assertCounts(6, 0, 0)
+
+    def test_bulk_create_ignore_conflicts(self):
+
+        MatchSeatInfo.objects.bulk_create(
+            [
+                MatchSeatInfo(match=self.match, seat=seat, price=4500)
+                for seat in self.seats[3:]
+            ],
+            ignore_conflicts=True,
+        )
+
+        self.assertCounts(6, 0, 0)
+
+    def test_reserve_confirm_release(self):
+
+        seat_ids = [seat.pk for seat in self.seats[:3]]
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids[:2],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+        self.assertCounts(2, 2, 0)
+
+        # Lost reservations change nothing.
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids,
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+        self.assertCounts(2, 2, 0)
+
+        MatchSeatInfo.objects.confirm(self.match.pk, self.user.pk, self.now)
+        self.assertCounts(2, 0, 2)
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=seat_ids[2:],
+            buyer_id=self.user.pk,
+            now=self.now - timedelta(hours=1),
+        )
+        self.assertCounts(1, 1, 2)
+
+        MatchSeatInfo.objects.release_expired(now=self.now, batch_size=10)
+        self.assertCounts(2, 0, 2)
+
+    def test_save_and_delete(self):
+
+        match_seat = MatchSeatInfo.objects.get(seat=self.seats[0])
+        match_seat.is_reserved = True
+        match_seat.is_paid = True
+        match_seat.date_reserved = self.now
+        match_seat.save()
+        self.assertCounts(3, 0, 1)
+
+        match_seat.delete()
+        self.assertCounts(3, 0, 0)
+
+        MatchSeatInfo.objects.create(
+            match=self.match,
+            seat=self.seats[5],
+            price=4500,
+        )
+        self.assertCounts(4, 0, 0)
+
+    def test_reconcile(self):
+
+        MatchSeatInfo.objects.filter(seat=self.seats[0]).delete()
+        MatchInventory.objects.filter(match=self.match).update(held=3)
+
+        self.assertEqual(
+            MatchInventory.objects.reconcile(),
+            [self.match.pk],
+        )
+        self.assertCounts(3, 0, 0)
+
+    def test_shards(self):
+
+        MatchInventory.objects.set_shards(self.match.pk, 3)
+
+        self.assertEqual(
+            sorted(
+                MatchInventory.objects.filter(
+                    match=self.match,
+                ).values_list('shard', flat=True)
+            ),
+            [0, 1, 2],
+        )
+        self.assertCounts(4, 0, 0)
+
+        for seat in self.seats[:4]:
+            MatchSeatInfo.objects.reserve(
+                match_id=self.match.pk,
+                seats=[seat.pk],
+                buyer_id=self.user.pk,
+                now=self.now,
+            )
+
+        self.assertCounts(0, 4, 0)
+
+    def test_seat_map_version(self):
+        """
+        Reservations move the version of the seat map without writing the
+        row of the match, and a rebuild of the counters never moves it
+        back.
+        """
+
+        def version():
+            return Match.objects.filter(
+                pk=self.match.pk,
+            ).with_seat_map_version().values_list('version', flat=True)[0]
+
+        MatchInventory.objects.set_shards(self.match.pk, 3)
+        match_version = Match.objects.get(pk=self.match.pk).seat_map_version
+        versions = [version()]
+
+        for seat in self.seats[:2]:
+            MatchSeatInfo.objects.reserve(
+                match_id=self.match.pk,
+                seats=[seat.pk],
+                buyer_id=self.user.pk,
+                now=self.now,
+            )
+            versions.append(version())
+
+        MatchInventory.objects.filter(match=self.match).update(held=0)
+        MatchInventory.objects.reconcile((self.match.pk,))
+        versions.append(version())
+
+        self.assertEqual(
+            Match.objects.get(pk=self.match.pk).seat_map_version,
+            match_version,
+        )
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_missing_counters(self):
+
+        MatchInventory.objects.filter(match=self.match).delete()
+
+        MatchSeatInfo.objects.reserve(
+            match_id=self.match.pk,
+            seats=[self.seats[0].pk],
+            buyer_id=self.user.pk,
+            now=self.now,
+        )
+
+        self.assertCounts(3, 1, 0)
@@ -0,0 +1,126 @@
+from base64 import b64decode
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.match.availability import (
+    encode_runs,
+    encode_seat_ranges,
+    seat_availability,
+)
+from apps.match.seat_map import build_seat_map, seat_maps
+from apps.match.models import Match, MatchSeatInfo, PriceTier
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+
+class TestEncoders(TestCase):
+
+    def test_encode_runs(self):
+
+        self.assertEqual(encode_runs([]), [])
+        self.assertEqual(
+            encode_runs([0, 0, 0, 1, 0]),
+            [[0, 3], [1, 1], [0, 1]],
+        )
+
+    def test_encode_seat_ranges(self):
+
+        self.assertEqual(encode_seat_ranges([]), [])
+        self.assertEqual(
+            encode_seat_ranges([4, 5, 6, 9, 10, 12]),
+            [[4, 3], [9, 2], [12, 1]],
+        )
+
+
+class TestBuildSeatMap(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.host_team = Team.objects.create(name='Esteghlal')
+        self.guest_team = Team.objects.create(name='Piroozi')
+
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        self.seats = [
+            Seat.objects.create(stadium=self.stadium, code=f'n{number}')
+            for number in range(10)
+        ]
+        for number, seat in enumerate(self.seats):
+            MatchSeatInfo.objects.create(
+                match=self.match,
+                seat=seat,
+                price=5000 if number < 6 else 8000,
+                is_reserved=number in (1, 9),
+                date_reserved=self.now if number in (1, 9) else None,
+            )
+
+    def test_build_seat_map(self):
+
+        seat_map = build_seat_map(
+            self.match.pk,
+            3,
+            seat_availability.get(self.match.pk),
+        )
+        bits = b64decode(seat_map['available'])
+
+        self.assertEqual(seat_map['match'], self.match.pk)
+        self.assertEqual(seat_map['version'], 3)
+        self.assertEqual(seat_map['seats'], [[self.seats[0].pk, 10]])
+        self.assertEqual(
+            [
+                bool(bits[ordinal >> 3] & (1 << (ordinal & 7)))
+                for ordinal in range(10)
+            ],
+            [number not in (1, 9) for number in range(10)],
+        )
+        tier = PriceTier.objects.get(match=self.match, price=5000)
+        tier2 = PriceTier.objects.get(match=self.match, price=8000)
+        self.assertEqual(seat_map['tiers'], {tier.pk: 5000, tier2.pk: 8000})
+        self.assertEqual(
+            seat_map['tier_runs'],
+            [[tier.pk, 6], [tier2.pk, 4]],
+        )
+
+    def test_seats_outside_layout(self):
+        """
+        This method checks if tiers of seats follow the bitmap when the
+        layout was built from other seats.
+        """
+
+        bitmap = seat_availability.get(self.match.pk)
+        MatchSeatInfo.objects.filter(seat=self.seats[0]).delete()
+
+        with self.settings(MATCH_SEAT_LAYOUT_MAX_AGE=0):
+            seat_map = build_seat_map(self.match.pk, 4, bitmap)
+
+        tier = PriceTier.objects.get(match=self.match, price=5000)
+        tier2 = PriceTier.objects.get(match=self.match, price=8000)
+        self.assertEqual(seat_map['seats'], [[self.seats[0].pk, 10]])
+        self.assertEqual(
+            seat_map['tier_runs'],
+            [[None, 1], [tier.pk, 5], [tier2.pk, 4]],
+        )
+
+    def test_etag(self):
+
+        seat_maps.clear()
+        version = Match.objects.filter(
+            pk=self.match.pk,
+        ).with_seat_map_version().values_list('version', flat=True).get()
+
+        seat_map, etag = seat_maps.get(self.match.pk, version)
+        self.assertEqual(etag, f'"{self.match.pk}-{version}"')
+        self.assertIs(seat_maps.get(self.match.pk, version)[0], seat_map)
+
+        # A newer version than the bitmap, e.g. from another process.
+        seat_map, etag = seat_maps.get(self.match.pk, version + 1)
+        self.assertEqual(etag, f'"{self.match.pk}-{version + 1}-{version}"')
+        self.assertEqual(seat_map['version'], version + 1)
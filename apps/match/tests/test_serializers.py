@@ -1,14 +1,17 @@
 from django.utils import timezone
 
 from rest_framework.test import APITestCase
+from rest_framework.exceptions import ValidationError
 
 from apps.match.serializers import (
     MatchSerializer,
+    MatchListQuerySerializer,
     MatchSeatInfoSerializer,
     ListCreateMatchSeatInfoSerializer,
     ListUpdateMatchSeatInfoSerializer,
+    BestAvailableSeatsSerializer,
 )
-from apps.match.models import Match, MatchSeatInfo
+from apps.match.models import Match, MatchSeatInfo, PriceTier
 from apps.stadium.models import Seat, Stadium
 from apps.team.models import Team
 
@@ -92,6 +95,70 @@ class TestMatchSerializer(APITestCase):
         self.assertFalse(srz_data.is_valid())
         self.assertEqual(len(srz_data.errors), 1)
 
+    def test_invalid_data_fourth(self):
+        """
+        This method checks if a match with this stadium and datetime
+        already exists, when the match is saved : the unique constraint
+        finds it out instead of a query before the insert.
+        """
+
+        Match.objects.create(
+            stadium=self.stadium,
+            host_team=self.host_team,
+            guest_team=self.guest_team,
+            datetime=self.now,
+        )
+
+        srz_data = MatchSerializer(
+            data={
+                'stadium': self.stadium.pk,
+                'host_team': self.guest_team.pk,
+                'guest_team': self.host_team.pk,
+                'datetime': self.now,
+            },
+        )
+
+        self.assertTrue(srz_data.is_valid())
+        with self.assertRaises(ValidationError) as context:
+            srz_data.save()
+
+        self.assertEqual(
+            context.exception.detail['non_field_errors'][0],
+            'Match with this stadium and datetime already exists.',
+        )
+        self.assertEqual(Match.objects.count(), 1)
+
+
+class TestMatchListQuerySerializer(APITestCase):
+
+    def test_valid_data(self):
+
+        match = Match(pk=7, datetime=timezone.now())
+
+        srz_data = MatchListQuerySerializer(
+            data={
+                'cursor': MatchListQuerySerializer.cursor_of(match),
+                'team': 1,
+            },
+        )
+
+        self.assertTrue(srz_data.is_valid())
+        self.assertEqual(
+            srz_data.validated_data['cursor'],
+            (match.datetime, 7),
+        )
+        self.assertEqual(srz_data.validated_data['page_size'], 20)
+
+    def test_invalid_data_first(self):
+        """
+        This method checks if the cursor isn't one of a page.
+        """
+
+        for cursor in ('abc', 'MjAyNg=='):
+            srz_data = MatchListQuerySerializer(data={'cursor': cursor})
+
+            self.assertFalse(srz_data.is_valid())
+            self.assertIn('cursor', srz_data.errors)
 
 class TestMatchSeatInfoSerializer(APITestCase):
 
@@ -136,7 +203,8 @@ class TestMatchSeatInfoSerializer(APITestCase):
 
     def test_invalid_data_second(self):
         """
-        This method checks if seat is already defined for this match.
+        This method checks if seat is already defined for this match. The
+        insert finds it out, through the unique constraint.
         """
 
         MatchSeatInfo.objects.create(
@@ -153,8 +221,13 @@ class TestMatchSeatInfoSerializer(APITestCase):
             },
         )
 
-        self.assertFalse(srz_data.is_valid())
-        self.assertEqual(len(srz_data.errors), 1)
+        self.assertTrue(srz_data.is_valid())
+        with self.assertRaises(ValidationError) as context:
+            srz_data.save()
+
+        self.assertIn('non_field_errors', context.exception.detail)
+        self.assertEqual(MatchSeatInfo.objects.count(), 1)
+        self.assertFalse(PriceTier.objects.filter(price=7500).exists())
 
     def test_invalid_data_third(self):
         """
@@ -227,9 +300,12 @@ class TestListCreateMatchSeatInfoSerializer(APITestCase):
 
         self.assertFalse(srz_data.is_valid())
 
-    def test_invalid_data_second(self):
+    def test_valid_data_defined_seats(self):
         """
-        This method checks if one of seats is already defined for this match.
+        Seats which are already defined for this match, or aren't seats of
+        its stadium, aren't looked for here : the insert of
+        MatchSeatInfoQuerySet.define_seats finds them out. Only the match
+        is looked up.
         """
 
         MatchSeatInfo.objects.create(
@@ -241,71 +317,84 @@ class TestListCreateMatchSeatInfoSerializer(APITestCase):
         srz_data = ListCreateMatchSeatInfoSerializer(
             data={
                 'match': self.match.pk,
-                'seats': [1, 2, 3],
+                'seats': [1, 2, 4],
                 'price': 45000,
             },
         )
 
-        self.assertFalse(srz_data.is_valid())
-        self.assertEqual(len(srz_data.errors), 1)
+        with self.assertNumQueries(1):
+            self.assertTrue(srz_data.is_valid())
 
-    def test_invalid_data_third(self):
+    def test_invalid_data_duplicate_seats(self):
         """
-        This method checks if all selected seats, belongs to stadium or not.
+        This method checks if some seats are given more than once.
         """
 
         srz_data = ListCreateMatchSeatInfoSerializer(
             data={
                 'match': self.match.pk,
-                'seats': [1, 2, 4],
+                'seats': [1, 2, 2],
                 'price': 45000,
             },
         )
+
         self.assertFalse(srz_data.is_valid())
-        self.assertEqual(len(srz_data.errors), 1)
+        self.assertEqual(
+            srz_data.errors['seats'],
+            ['These seats are given more than once : 2.'],
+        )
 
+    def test_valid_data_section(self):
 
-class TestListUpdateMatchSeatInfoSerializer(APITestCase):
+        Seat.objects.create(stadium=self.stadium, code='A1', section='A')
 
-    def setUp(self):
+        for data in ({'section': 'A'}, {'all_seats': True}):
+            srz_data = ListCreateMatchSeatInfoSerializer(
+                data={'match': self.match.pk, 'price': 45000, **data},
+            )
 
-        self.stadium = Stadium.objects.create(name='Azadi')
-        self.stadium2 = Stadium.objects.create(name='Shiroodi')
-        self.host_team = Team.objects.create(name='Esteghlal')
-        self.guest_team = Team.objects.create(name='Piroozi')
+            self.assertTrue(srz_data.is_valid())
 
-        self.now = timezone.now()
-        self.match = Match.objects.create(
-            stadium=self.stadium,
-            host_team=self.host_team,
-            guest_team=self.guest_team,
-            datetime=self.now,
-        )
+    def test_invalid_data_fourth(self):
+        """
+        This method checks if seats are selected in more than one way, or
+        not at all.
+        """
 
-        self.seat = Seat.objects.create(
-            stadium=self.stadium,
-            code='n256',
-        )
-        self.seat2 = Seat.objects.create(
-            stadium=self.stadium,
-            code='n2567',
-        )
-        self.seat3 = Seat.objects.create(
-            stadium=self.stadium,
-            code='n258',
-        )
-        self.seat4 = Seat.objects.create(
-            stadium=self.stadium2,
-            code='n259',
+        for data in (
+            {},
+            {'seats': [1, 2], 'section': 'A'},
+            {'section': 'A', 'all_seats': True},
+        ):
+            srz_data = ListCreateMatchSeatInfoSerializer(
+                data={'match': self.match.pk, 'price': 45000, **data},
+            )
+
+            self.assertFalse(srz_data.is_valid())
+            self.assertIn('non_field_errors', srz_data.errors)
+
+    def test_invalid_data_fifth(self):
+        """
+        This method checks if the stadium has the selected section.
+        """
+
+        Seat.objects.create(stadium=self.stadium2, code='A1', section='A')
+
+        srz_data = ListCreateMatchSeatInfoSerializer(
+            data={'match': self.match.pk, 'price': 45000, 'section': 'A'},
         )
 
+        self.assertFalse(srz_data.is_valid())
+        self.assertIn('non_field_errors', srz_data.errors)
+
+class TestListUpdateMatchSeatInfoSerializer(APITestCase):
+
     def test_valid_data(self):
 
         srz_data = ListUpdateMatchSeatInfoSerializer(
             data={
                 'seats': [1, 2, 3],
             },
-            match=self.match,
         )
 
         self.assertTrue(srz_data.is_valid())
@@ -315,30 +404,19 @@ class TestListUpdateMatchSeatInfoSerializer(APITestCase):
         This method checks if some parameters are missing.
         """
 
-        srz_data = ListUpdateMatchSeatInfoSerializer(
-            data={},
-            match=self.match
-        )
+        srz_data = ListUpdateMatchSeatInfoSerializer(data={})
 
         self.assertFalse(srz_data.is_valid())
 
     def test_invalid_data_second(self):
         """
-        This method checks if one of seats is already reserved for this match.
+        This method checks if more than 10 seats are selected.
         """
 
-        MatchSeatInfo.objects.create(
-            match=self.match,
-            seat=self.seat,
-            price=6500,
-            is_reserved=True,
-        )
-
         srz_data = ListUpdateMatchSeatInfoSerializer(
             data={
-                'seats': [1, 2, 3],
+                'seats': list(range(1, 12)),
             },
-            match=self.match,
         )
 
         self.assertFalse(srz_data.is_valid())
@@ -346,14 +424,56 @@ class TestListUpdateMatchSeatInfoSerializer(APITestCase):
 
     def test_invalid_data_third(self):
         """
-        This method checks if all selected seats, belongs to stadium or not.
+        This method checks if some seats are given more than once; they
+        are named in the error.
         """
 
         srz_data = ListUpdateMatchSeatInfoSerializer(
             data={
-                'seats': [1, 2, 4],
+                'seats': [5, 1, 5, 2, 1, 5],
             },
-            match=self.match,
         )
+
         self.assertFalse(srz_data.is_valid())
-        self.assertEqual(len(srz_data.errors), 1)
+        self.assertEqual(
+            srz_data.errors['seats'],
+            ['These seats are given more than once : 1, 5.'],
+        )
+
+
+class TestBestAvailableSeatsSerializer(APITestCase):
+
+    def test_valid_data(self):
+
+        srz_data = BestAvailableSeatsSerializer(
+            data={
+                'quantity': 4,
+                'tier': 1,
+                'section': 'A',
+            },
+        )
+
+        self.assertTrue(srz_data.is_valid())
+
+    def test_invalid_data_first(self):
+        """
+        This method checks if quantity is missing.
+        """
+
+        srz_data = BestAvailableSeatsSerializer(data={'section': 'A'})
+
+        self.assertFalse(srz_data.is_valid())
+        self.assertIn('quantity', srz_data.errors)
+
+    def test_invalid_data_second(self):
+        """
+        This method checks if quantity is out of 1 to 10.
+        """
+
+        for quantity in (0, 11):
+            srz_data = BestAvailableSeatsSerializer(
+                data={'quantity': quantity},
+            )
+
+            self.assertFalse(srz_data.is_valid())
+            self.assertIn('quantity', srz_data.errors)
@@ -1,24 +1,226 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from django.utils.html import format_html
+from django.db.models import Count, Q
+from django.utils.translation import gettext_lazy as _
 
+from apps.match.models import MatchSeatInfo
 from apps.stadium.models import Stadium, Seat
 
 
-class SeatInline(admin.StackedInline):
+class SectionListFilter(admin.SimpleListFilter):
+    """
+    Sections of the stadium chosen in the stadium filter, read from the
+    index on (stadium, section). It's hidden until a stadium is chosen.
+    """
 
-    model = Seat
-    extra = 1
+    title = _('section')
+    parameter_name = 'section'
+
+    def lookups(self, request, model_admin):
+
+        stadium = request.GET.get('stadium__id__exact', '')
+
+        if not stadium.isdigit():
+            return ()
+
+        sections = Seat.objects.filter(
+            stadium_id=stadium,
+        ).order_by('section').values_list('section', flat=True).distinct()
+
+        return [(section, section or _('(None)')) for section in sections]
+
+    def queryset(self, request, queryset):
+
+        if self.value() is not None:
+            return queryset.filter(section=self.value())
+
+        return queryset
+
+
+class RenumberForm(forms.Form):
+
+    start = forms.IntegerField(
+        label=_('First number of each row'),
+        min_value=1,
+        max_value=32767,
+        initial=1,
+    )
 
 
 @admin.register(Stadium)
 class StadiumAdmin(admin.ModelAdmin):
+    """
+    Seats aren't edited inline, which would render and save every seat of
+    the stadium; the change page links to the seat editor instead.
+    """
 
-    inlines = (SeatInline,)
     prepopulated_fields = {'slug': ('name',)}
     search_fields = ('name',)
+    readonly_fields = ('seat_editor',)
+
+    @admin.display(description=_('seats'))
+    def seat_editor(self, stadium):
+
+        if stadium.pk is None:
+            return _('Seats can be added once the stadium is saved.')
+
+        url = reverse('admin:stadium_seat_changelist')
+
+        return format_html(
+            '<a href="{}?stadium__id__exact={}">{}</a>',
+            url,
+            stadium.pk,
+            _('Edit the seats of this stadium'),
+        )
 
 
 @admin.register(Seat)
 class SeatAdmin(admin.ModelAdmin):
+    """
+    The seat editor : seats of a stadium, a page at a time, searched by
+    the start of their code, with bulk actions which run a few statements
+    whatever the number of selected seats (see SeatQuerySet).
+    """
+
+    list_display = ('code', 'stadium', 'section', 'row', 'number')
+    list_editable = ('section', 'row', 'number')
+    list_filter = ('stadium', SectionListFilter)
+    list_select_related = ('stadium',)
+    list_per_page = 100
+    search_fields = ('^code',)
+    # The order of the unique (stadium, code) index, so a page is read in
+    # index order instead of sorting the seats of the stadium.
+    ordering = ('stadium', 'code')
+    show_full_result_count = False
+    actions = ('delete_seats', 'delete_sections', 'renumber_rows')
+
+    def get_actions(self, request):
+
+        actions = super().get_actions(request)
+        # Its confirmation lists every seat of every match which is deleted
+        # along with the seats; delete_seats is used instead.
+        actions.pop('delete_selected', None)
+
+        return actions
+
+    def save_model(self, request, obj, form, change):
+
+        super().save_model(request, obj, form, change)
+
+        if change:
+            Seat.objects.filter(pk=obj.pk).changed()
+
+    def delete_model(self, request, obj):
+        Seat.objects.filter(pk=obj.pk).purge()
+
+    def delete_queryset(self, request, queryset):
+        queryset.purge()
+
+    def confirm(self, request, queryset, action, title, form=None):
+        """
+        Page asking to confirm an action, which posts the selection back
+        to the changelist; without select_across, only the ids of the
+        selected seats of the page are posted.
+        """
+
+        match_seats = MatchSeatInfo.objects.filter(
+            seat__in=queryset.values('pk'),
+        ).aggregate(
+            matches=Count('match', distinct=True),
+            sold=Count('pk', filter=Q(is_paid=True)),
+        )
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': title,
+            'opts': self.model._meta,
+            'action': action,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'selected': request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            'select_across': request.POST.get('select_across') == '1',
+            'seats': queryset.count(),
+            'matches': match_seats['matches'],
+            'sold': match_seats['sold'],
+            'form': form,
+        }
+
+        return TemplateResponse(
+            request,
+            'admin/stadium/seat/action_confirmation.html',
+            context,
+        )
+
+    @admin.action(
+        description=_('Delete selected seats'),
+        permissions=('delete',),
+    )
+    def delete_seats(self, request, queryset):
+
+        if request.POST.get('post'):
+            seats = queryset.purge()[0]
+            self.message_user(
+                request,
+                _(f'{seats} seats were deleted.'),
+                messages.SUCCESS,
+            )
+            return None
+
+        return self.confirm(
+            request,
+            queryset,
+            'delete_seats',
+            _('Delete selected seats'),
+        )
+
+    @admin.action(
+        description=_('Delete sections of selected seats'),
+        permissions=('delete',),
+    )
+    def delete_sections(self, request, queryset):
+
+        if request.POST.get('post'):
+            seats = queryset.sections().purge()[0]
+            self.message_user(
+                request,
+                _(f'{seats} seats were deleted.'),
+                messages.SUCCESS,
+            )
+            return None
+
+        return self.confirm(
+            request,
+            queryset.sections(),
+            'delete_sections',
+            _('Delete sections of selected seats'),
+        )
+
+    @admin.action(
+        description=_('Renumber rows of selected seats'),
+        permissions=('change',),
+    )
+    def renumber_rows(self, request, queryset):
+
+        if request.POST.get('post'):
+            form = RenumberForm(request.POST)
+            if form.is_valid():
+                seats = queryset.renumber(form.cleaned_data['start'])
+                self.message_user(
+                    request,
+                    _(f'{seats} seats were renumbered.'),
+                    messages.SUCCESS,
+                )
+                return None
+        else:
+            form = RenumberForm()
 
-    list_display = ('stadium', 'code')
-    list_filter = ('stadium',)
+        return self.confirm(
+            request,
+            queryset.rows(),
+            'renumber_rows',
+            _('Renumber rows of selected seats'),
+            form=form,
+        )
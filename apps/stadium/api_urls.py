@@ -1,10 +1,18 @@
 from django.urls import path
 
-from apps.stadium.api_views import StadiumCreateAPIView
+from apps.stadium.api_views import (
+    StadiumCreateAPIView,
+    StadiumSeatLayoutAPIView,
+)
 
 
 api_urls = [
 
     path('', StadiumCreateAPIView.as_view(), name='api_create_stadium'),
+    path(
+        '<int:stadium_id>/layout/',
+        StadiumSeatLayoutAPIView.as_view(),
+        name='api_create_stadium_layout'
+    ),
 
 ]
@@ -1,8 +1,14 @@
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.views import APIView, Response
 from rest_framework.generics import CreateAPIView
 from rest_framework.permissions import IsAdminUser
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
 
-from apps.stadium.models import Stadium
-from apps.stadium.serializers import StadiumSerializer
+from apps.stadium.models import Stadium, Seat
+from apps.stadium.serializers import StadiumSerializer, SeatLayoutSerializer
 
 
 class StadiumCreateAPIView(CreateAPIView):
@@ -17,3 +23,81 @@ class StadiumCreateAPIView(CreateAPIView):
 
     queryset = Stadium.objects.all()
     serializer_class = StadiumSerializer
+
+
+class StadiumSeatLayoutAPIView(APIView):
+    """
+    Create all seats of a stadium from a layout.
+    Permission : Only admin users have access.
+    Accept the following POST parameters: sections (name, rows,
+    seats_per_row, first_row), code_pattern. See SeatLayoutSerializer.
+    Returns : A summary of created seats, or fail message. Seats are
+    created all together or not at all.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    serializer_class = SeatLayoutSerializer
+
+    def post(self, request, stadium_id, *args, **kwargs):
+
+        stadium = get_object_or_404(Stadium.objects.only('pk'), pk=stadium_id)
+
+        srz_data = self.serializer_class(data=request.data)
+
+        if srz_data.is_valid():
+
+            vd = srz_data.validated_data
+            codes = vd['codes']
+
+            taken = codes.intersection(
+                Seat.objects.filter(stadium=stadium).values_list(
+                    'code',
+                    flat=True,
+                )
+            )
+            if taken:
+                return self.taken(taken)
+
+            try:
+                seats_number = Seat.objects.create_layout(
+                    stadium.pk,
+                    self.serializer_class.seats(vd),
+                )
+            except IntegrityError:
+                # Seats were added to the stadium in the meantime.
+                return self.taken(())
+
+            message = _(
+                f'{seats_number} seats were created successfully for the '
+                'stadium'
+            )
+
+            return Response(
+                data={
+                    'message': message,
+                    'seats': seats_number,
+                    'sections': {
+                        section['name']:
+                        section['rows'] * section['seats_per_row']
+                        for section in vd['sections']
+                    },
+                    'first_code': vd['first_code'],
+                    'last_code': vd['last_code'],
+                },
+                status=HTTP_201_CREATED,
+            )
+
+        return Response(data=srz_data.errors, status=HTTP_400_BAD_REQUEST)
+
+    def taken(self, codes):
+
+        return Response(
+            data={
+                'message': _(
+                    'Some of these seats already exist in the stadium.'
+                ),
+                'codes': sorted(codes)[:100],
+            },
+            status=HTTP_400_BAD_REQUEST,
+        )
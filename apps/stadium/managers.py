@@ -0,0 +1,171 @@
+from itertools import islice
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import QuerySet, Exists, OuterRef, F, Min
+
+
+class SeatQuerySet(QuerySet):
+
+    def create_layout(self, stadium_id, seats, chunk_size=5000):
+        """
+        Create seats of a stadium from an iterable of
+        (section, row, number, code).
+
+        Seats are inserted with one bulk INSERT per `chunk_size` seats,
+        all in one transaction, and only one chunk of model instances is
+        in memory at a time. Returns the number of created seats.
+        """
+
+        seats = iter(seats)
+        number = 0
+
+        with transaction.atomic(using=self.db):
+            while True:
+
+                chunk = [
+                    self.model(
+                        stadium_id=stadium_id,
+                        section=section,
+                        row=row,
+                        number=number,
+                        code=code,
+                    )
+                    for section, row, number, code in islice(
+                        seats,
+                        chunk_size,
+                    )
+                ]
+                if not chunk:
+                    break
+
+                self.bulk_create(chunk)
+                number += len(chunk)
+
+        return number
+
+    def match_ids(self):
+        """
+        Ids of the matches which any of the seats is defined for.
+        """
+
+        match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+
+        return set(
+            match_seat_info.objects.using(self.db).filter(
+                seat__in=self.values('pk'),
+            ).order_by().values_list('match_id', flat=True).distinct()
+        )
+
+    def changed(self):
+        """
+        Must be called whenever sections, rows or numbers of the seats
+        change, which seat maps and layouts of best available seats show.
+        """
+
+        match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+
+        match_seat_info.objects.using(self.db).seats_changed(
+            self.match_ids(),
+        )
+
+    def rows(self):
+        """
+        All seats of the rows which any of the seats is in.
+        """
+
+        return self.model.objects.using(self.db).filter(
+            Exists(
+                self.filter(
+                    stadium=OuterRef('stadium'),
+                    section=OuterRef('section'),
+                    row=OuterRef('row'),
+                ),
+            ),
+        )
+
+    def sections(self):
+        """
+        All seats of the sections which any of the seats is in.
+        """
+
+        return self.model.objects.using(self.db).filter(
+            Exists(
+                self.filter(
+                    stadium=OuterRef('stadium'),
+                    section=OuterRef('section'),
+                ),
+            ),
+        )
+
+    def renumber(self, start):
+        """
+        Renumber the rows of the seats so each row starts at `start`; gaps
+        between numbers, e.g. aisles, are kept. Seats without a row or a
+        number are left alone.
+
+        Each row is shifted with a single UPDATE, instead of one subquery
+        for the first number of all rows : SQLite evaluates such subqueries
+        against rows which the statement already changed.
+
+        Returns the number of renumbered seats.
+        """
+
+        seats = self.rows().filter(number__isnull=False)
+
+        with transaction.atomic(using=self.db):
+
+            firsts = seats.values(
+                'stadium_id', 'section', 'row',
+            ).annotate(first=Min('number')).order_by()
+
+            count = 0
+            for first in firsts:
+                if first['first'] != start:
+                    count += seats.filter(
+                        stadium_id=first['stadium_id'],
+                        section=first['section'],
+                        row=first['row'],
+                    ).update(number=F('number') + (start - first['first']))
+
+            if count:
+                self.changed()
+
+        return count
+
+    def purge(self):
+        """
+        Delete the seats along with what matches defined of them, without
+        going seat by seat, and rebuild the seat counters of those matches.
+
+        The seats of matches are deleted with one DELETE, since deleting
+        them along with the seats would bypass their counters. The seats are
+        then deleted with QuerySet.delete(), which only loads their pks; its
+        cascade to seats of matches finds nothing left.
+
+        Returns (deleted seats, deleted seats of matches).
+        """
+
+        match_seat_info = apps.get_model('match', 'MatchSeatInfo')
+        match_inventory = apps.get_model('match', 'MatchInventory')
+
+        with transaction.atomic(using=self.db):
+
+            match_ids = self.match_ids()
+
+            # Nothing refers to seats of matches, so this is one DELETE.
+            match_seats, _ = match_seat_info.objects.using(self.db).filter(
+                seat__in=self.values('pk'),
+            ).delete()
+
+            # And seats of matches were the only thing referring to seats.
+            _, deleted = self.only('pk').delete()
+            seats = deleted.get(self.model._meta.label, 0)
+
+            if match_ids:
+                match_inventory.objects.using(self.db).reconcile(match_ids)
+                match_seat_info.objects.using(self.db).seats_changed(
+                    match_ids,
+                )
+
+        return seats, match_seats
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadium', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='section',
+            field=models.CharField(blank=True, default='', help_text='Section of the stadium which the seat is in.', max_length=16, verbose_name='section'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(fields=['stadium', 'section'], name='seat_stadium_section_idx'),
+        ),
+    ]
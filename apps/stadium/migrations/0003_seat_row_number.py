@@ -0,0 +1,23 @@
+# Generated by Django 4.1.1 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stadium', '0002_seat_section'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seat',
+            name='number',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Number of the seat in its row; seats next to each other have consecutive numbers.', null=True, verbose_name='number'),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='row',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Row of the seat in its section.', null=True, verbose_name='row'),
+        ),
+    ]
@@ -1,13 +1,16 @@
 from django.db.models import (
     Model,
-    CharField, SlugField,
+    CharField, SlugField, PositiveSmallIntegerField,
     ForeignKey,
     UniqueConstraint,
+    Index,
     CASCADE,
 )
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 
+from apps.stadium.managers import SeatQuerySet
+
 
 class Stadium(Model):
 
@@ -39,6 +42,30 @@ class Seat(Model):
         verbose_name=_('stadium'),
     )
     code = CharField(_('code'), max_length=8)
+    section = CharField(
+        _('section'),
+        max_length=16,
+        blank=True,
+        default='',
+        help_text=_('Section of the stadium which the seat is in.'),
+    )
+    row = PositiveSmallIntegerField(
+        _('row'),
+        null=True,
+        blank=True,
+        help_text=_('Row of the seat in its section.'),
+    )
+    number = PositiveSmallIntegerField(
+        _('number'),
+        null=True,
+        blank=True,
+        help_text=_(
+            'Number of the seat in its row; seats next to each other have '
+            'consecutive numbers.'
+        ),
+    )
+
+    objects = SeatQuerySet.as_manager()
 
     def __str__(self):
         return f'Code : {self.code} - Stadium : {self.stadium.name}'
@@ -52,3 +79,9 @@ class Seat(Model):
                 name='unique_seat_stadium_code'
             ),
         )
+        indexes = (
+            Index(
+                fields=('stadium', 'section'),
+                name='seat_stadium_section_idx',
+            ),
+        )
@@ -1,9 +1,21 @@
-from rest_framework.serializers import ModelSerializer
+from string import Formatter
 
-from apps.stadium.models import Stadium
+from django.utils.translation import gettext_lazy as _
 
+from rest_framework.serializers import (
+    Serializer,
+    ModelSerializer,
+    CharField,
+    IntegerField,
+    ListField,
+    ValidationError,
+)
 
-class StadiumSerializer(ModelSerializer):
+from apps.stadium.models import Stadium, Seat
+from config.profiling import ProfiledSerializerMixin
+
+
+class StadiumSerializer(ProfiledSerializerMixin, ModelSerializer):
 
     class Meta:
         model = Stadium
@@ -16,3 +28,135 @@ class StadiumSerializer(ModelSerializer):
             },
 
         }
+
+
+class SeatLayoutSectionSerializer(ProfiledSerializerMixin, Serializer):
+    """
+    A section of a stadium, with `rows` rows of `seats_per_row` seats.
+    """
+
+    # Largest row and seat number : both are PositiveSmallIntegerField.
+    MAX_NUMBER = 32767
+
+    name = CharField(max_length=Seat._meta.get_field('section').max_length)
+    rows = IntegerField(min_value=1, max_value=MAX_NUMBER)
+    seats_per_row = IntegerField(min_value=1, max_value=MAX_NUMBER)
+    first_row = IntegerField(min_value=0, max_value=MAX_NUMBER, default=1)
+
+    def validate(self, data):
+
+        if data['first_row'] + data['rows'] - 1 > self.MAX_NUMBER:
+            raise ValidationError(
+                _(f'Rows can be numbered up to {self.MAX_NUMBER}.')
+            )
+
+        return data
+
+
+class SeatLayoutSerializer(ProfiledSerializerMixin, Serializer):
+    """
+    Layout of the seats of a stadium.
+
+    The code of each seat is `code_pattern` formatted with `section` (the
+    name of the section), `row` and `seat` (the number of the seat in its
+    row, from 1), e.g. '{section}{row:02}{seat:03}' -> 'A07012'.
+    """
+
+    MAX_SEATS = 200_000
+
+    FIELDS = frozenset(('section', 'row', 'seat'))
+
+    code_pattern = CharField(
+        max_length=64,
+        default='{section}{row:02}{seat:03}',
+    )
+    sections = ListField(
+        child=SeatLayoutSectionSerializer(),
+        min_length=1,
+        max_length=1000,
+    )
+
+    def validate_code_pattern(self, code_pattern):
+
+        try:
+            fields = [
+                field for literal, field, spec, conversion
+                in Formatter().parse(code_pattern)
+                if field is not None
+            ]
+        except ValueError:
+            raise ValidationError(_('The code pattern is not valid.'))
+
+        # Plain names only, no attribute or index lookups.
+        if not set(fields) <= self.FIELDS:
+            raise ValidationError(
+                _('The code pattern can only use {section}, {row}, {seat}.')
+            )
+
+        return code_pattern
+
+    def validate(self, data):
+
+        sections = data['sections']
+
+        names = [section['name'] for section in sections]
+        if len(set(names)) != len(names):
+            raise ValidationError(_('Section names must be unique.'))
+
+        total = sum(
+            section['rows'] * section['seats_per_row'] for section in sections
+        )
+        if total > self.MAX_SEATS:
+            raise ValidationError(
+                _(f'A layout can have at most {self.MAX_SEATS} seats.')
+            )
+
+        max_length = Seat._meta.get_field('code').max_length
+        codes = set()
+
+        try:
+            for section, row, number, code in self.seats(data):
+                if not codes:
+                    first_code = code
+                if len(code) > max_length:
+                    raise ValidationError(
+                        _(
+                            f'Code {code} is longer than {max_length} '
+                            'characters.'
+                        )
+                    )
+                codes.add(code)
+        except (ValueError, TypeError):
+            raise ValidationError(_('The code pattern is not valid.'))
+
+        if len(codes) != total:
+            raise ValidationError(
+                _('The code pattern gives several seats the same code.')
+            )
+
+        data['codes'] = codes
+        data['first_code'] = first_code
+        data['last_code'] = code
+
+        return data
+
+    @staticmethod
+    def seats(data):
+        """
+        Yield (section, row, number, code) of every seat of the layout.
+        """
+
+        code_pattern = data['code_pattern']
+
+        for section in data['sections']:
+
+            name = section['name']
+            first_row = section['first_row']
+
+            for row in range(first_row, first_row + section['rows']):
+                for seat in range(1, section['seats_per_row'] + 1):
+                    yield name, row, seat, code_pattern.format(
+                        section=name,
+                        row=row,
+                        seat=seat,
+                    )
@@ -0,0 +1,164 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+
+from apps.stadium.models import Stadium, Seat
+
+User = get_user_model()
+
+
+class TestSeatAdmin(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+        self.user = User.objects.create_superuser(
+            email='admin@test.com',
+            password='admin12345QQ!!',
+        )
+
+        Seat.objects.create_layout(
+            self.stadium.pk,
+            (
+                (section, row, number, f'{section}{row}-{number}')
+                for section in ('A', 'B')
+                for row in (1, 2)
+                for number in range(3, 8)
+            ),
+        )
+
+        self.client.force_login(self.user)
+        self.url = reverse('admin:stadium_seat_changelist')
+
+    def seat_ids(self, **filters):
+        return [
+            str(pk) for pk in Seat.objects.filter(**filters).values_list(
+                'pk',
+                flat=True,
+            )
+        ]
+
+    def test_stadium_change_page(self):
+
+        url = reverse('admin:stadium_stadium_change', args=(self.stadium.pk,))
+
+        self.client.get(url)
+        with self.assertNumQueries(5) as few:
+            self.client.get(url)
+
+        Seat.objects.create_layout(
+            self.stadium.pk,
+            (('C', 1, number, f'C1-{number}') for number in range(500)),
+        )
+
+        with self.assertNumQueries(len(few.captured_queries)):
+            response = self.client.get(url)
+
+        self.assertContains(
+            response,
+            f'{self.url}?stadium__id__exact={self.stadium.pk}',
+        )
+        self.assertNotContains(response, 'A1-3')
+
+    def test_changelist_filters_and_search(self):
+
+        response = self.client.get(
+            self.url,
+            {'stadium__id__exact': self.stadium.pk, 'section': 'B', 'q': 'B2'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [seat.code for seat in response.context['cl'].result_list],
+            [f'B2-{number}' for number in range(3, 8)],
+        )
+
+    def test_delete_sections(self):
+
+        data = {
+            'action': 'delete_sections',
+            helpers.ACTION_CHECKBOX_NAME: self.seat_ids(code='A1-3'),
+        }
+
+        response = self.client.post(self.url, {**data, 'index': 0})
+
+        self.assertTemplateUsed(
+            response,
+            'admin/stadium/seat/action_confirmation.html',
+        )
+        self.assertEqual(response.context['seats'], 10)
+        self.assertEqual(Seat.objects.count(), 20)
+
+        response = self.client.post(
+            self.url,
+            {**data, 'select_across': 0, 'post': 'yes'},
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Seat.objects.filter(section='A').exists())
+        self.assertEqual(Seat.objects.filter(section='B').count(), 10)
+
+    def test_delete_seats_across_pages(self):
+
+        data = {
+            'action': 'delete_seats',
+            'select_across': 1,
+            helpers.ACTION_CHECKBOX_NAME: self.seat_ids(code='B1-3'),
+            'post': 'yes',
+        }
+
+        response = self.client.post(
+            f'{self.url}?stadium__id__exact={self.stadium.pk}&section=B',
+            data,
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Seat.objects.values_list('section', flat=True)),
+            {'A'},
+        )
+
+    def test_renumber_rows(self):
+
+        data = {
+            'action': 'renumber_rows',
+            'select_across': 0,
+            helpers.ACTION_CHECKBOX_NAME: self.seat_ids(code='A2-5'),
+            'post': 'yes',
+            'start': 1,
+        }
+
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(
+                Seat.objects.filter(section='A', row=2).order_by(
+                    'number',
+                ).values_list('number', flat=True)
+            ),
+            [1, 2, 3, 4, 5],
+        )
+        self.assertEqual(Seat.objects.filter(number__lt=3).count(), 2)
+
+    def test_renumber_rows_invalid(self):
+        """
+        This method checks if the confirmation is shown again with the
+        error when the first number isn't valid.
+        """
+
+        response = self.client.post(
+            self.url,
+            {
+                'action': 'renumber_rows',
+                'select_across': 0,
+                helpers.ACTION_CHECKBOX_NAME: self.seat_ids(code='A2-5'),
+                'post': 'yes',
+                'start': 0,
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertFalse(Seat.objects.filter(number__lt=3).exists())
@@ -2,7 +2,10 @@ from django.urls import reverse, resolve
 
 from rest_framework.test import APISimpleTestCase
 
-from apps.stadium.api_views import StadiumCreateAPIView
+from apps.stadium.api_views import (
+    StadiumCreateAPIView,
+    StadiumSeatLayoutAPIView,
+)
 
 
 class TestStadiumAPIURLs(APISimpleTestCase):
@@ -11,3 +14,14 @@ class TestStadiumAPIURLs(APISimpleTestCase):
 
         url = reverse('stadium:api_create_stadium')
         self.assertEqual(resolve(url).func.view_class, StadiumCreateAPIView)
+
+    def test_create_stadium_layout(self):
+
+        url = reverse(
+            'stadium:api_create_stadium_layout',
+            kwargs={'stadium_id': 1},
+        )
+        self.assertEqual(
+            resolve(url).func.view_class,
+            StadiumSeatLayoutAPIView,
+        )
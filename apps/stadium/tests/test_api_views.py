@@ -7,9 +7,11 @@ from rest_framework.status import (
     HTTP_201_CREATED,
     HTTP_400_BAD_REQUEST,
     HTTP_401_UNAUTHORIZED,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
 )
 
-from apps.stadium.models import Stadium
+from apps.stadium.models import Stadium, Seat
 
 User = get_user_model()
 
@@ -138,3 +140,147 @@ class TestStadiumCreateAPIView(APITestCase):
             response.json(),
             {'detail': _('Authentication credentials were not provided.')},
         )
+
+
+class TestStadiumSeatLayoutAPIView(APITestCase):
+
+    def setUp(self):
+
+        self.client = APIClient()
+        self.stadium = Stadium.objects.create(name='ABC')
+        self.url = reverse(
+            'stadium:api_create_stadium_layout',
+            kwargs={'stadium_id': self.stadium.pk},
+        )
+        self.layout = {
+            'sections': [
+                {'name': 'A', 'rows': 3, 'seats_per_row': 4},
+                {'name': 'B', 'rows': 2, 'seats_per_row': 5},
+            ],
+        }
+
+        self.headers = self.login('test@test.com', is_staff=True)
+
+    def login(self, email, is_staff=False):
+
+        password = 'admin12345QQ!!'
+        User.objects.create_user(
+            email=email,
+            password=password,
+            is_staff=is_staff,
+        )
+
+        response = self.client.post(
+            reverse('accounts:api_login'),
+            data={
+                'email': email,
+                'password': password,
+            },
+            format='json',
+        )
+        access_token = response.json().get('access')
+
+        return {'HTTP_AUTHORIZATION': 'Bearer {}'.format(access_token)}
+
+    def test_create_stadium_layout_POST_valid(self):
+
+        response = self.client.post(
+            path=self.url,
+            data=self.layout,
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(Seat.objects.filter(stadium=self.stadium).count(), 22)
+        self.assertEqual(
+            Seat.objects.filter(stadium=self.stadium, section='B').count(),
+            10,
+        )
+        self.assertDictEqual(
+            response.json(),
+            {
+                'message': _(
+                    '22 seats were created successfully for the stadium'
+                ),
+                'seats': 22,
+                'sections': {'A': 12, 'B': 10},
+                'first_code': 'A01001',
+                'last_code': 'B02005',
+            },
+        )
+
+    def test_create_stadium_layout_POST_invalid_first(self):
+        """
+        This method checks if some of the seats already exist.
+        """
+
+        Seat.objects.create(stadium=self.stadium, code='A02003')
+
+        response = self.client.post(
+            path=self.url,
+            data=self.layout,
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(Seat.objects.filter(stadium=self.stadium).count(), 1)
+        self.assertDictEqual(
+            response.json(),
+            {
+                'message': _(
+                    'Some of these seats already exist in the stadium.'
+                ),
+                'codes': ['A02003'],
+            },
+        )
+
+    def test_create_stadium_layout_POST_invalid_second(self):
+        """
+        This method checks if the layout is not valid.
+        """
+
+        response = self.client.post(
+            path=self.url,
+            data={'code_pattern': '{section}', **self.layout},
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(Seat.objects.count(), 0)
+        self.assertIn('non_field_errors', response.json())
+
+    def test_create_stadium_layout_POST_invalid_third(self):
+        """
+        This method checks if the stadium doesn't exist.
+        """
+
+        response = self.client.post(
+            path=reverse(
+                'stadium:api_create_stadium_layout',
+                kwargs={'stadium_id': self.stadium.pk + 1},
+            ),
+            data=self.layout,
+            format='json',
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(Seat.objects.count(), 0)
+
+    def test_create_stadium_layout_POST_invalid_fourth(self):
+        """
+        This method checks if user is not an admin.
+        """
+
+        response = self.client.post(
+            path=self.url,
+            data=self.layout,
+            format='json',
+            **self.login('user@test.com'),
+        )
+
+        self.assertEqual(response.status_code, HTTP_403_FORBIDDEN)
+        self.assertEqual(Seat.objects.count(), 0)
@@ -1,7 +1,10 @@
 from django.test import TestCase
 from django.db import IntegrityError
+from django.utils import timezone
 
+from apps.match.models import Match, MatchInventory, MatchSeatInfo
 from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
 
 
 class TestStadiumModel(TestCase):
@@ -69,3 +72,139 @@ class TestSeatModel(TestCase):
 
         with self.assertRaises(IntegrityError):
             Seat.objects.create(stadium=self.stadium, code=self.code)
+
+    def test_seat_section_default(self):
+
+        self.assertEqual(self.seat.section, '')
+
+    def test_create_layout(self):
+
+        stadium = Stadium.objects.create(name='Layout stadium')
+
+        number = Seat.objects.create_layout(
+            stadium.pk,
+            [('A', 1, code, f'A{code}') for code in range(7)] +
+            [('B', 1, 1, 'B0')],
+            chunk_size=3,
+        )
+
+        self.assertEqual(number, 8)
+        self.assertEqual(
+            Seat.objects.filter(stadium=stadium, section='A').count(),
+            7,
+        )
+        self.assertEqual(
+            Seat.objects.filter(stadium=stadium, section='B').values_list(
+                'code',
+                'row',
+                'number',
+            ).get(),
+            ('B0', 1, 1),
+        )
+
+    def test_create_layout_is_atomic(self):
+
+        stadium = Stadium.objects.create(name='Layout stadium')
+
+        with self.assertRaises(IntegrityError):
+            Seat.objects.create_layout(
+                stadium.pk,
+                [('A', 1, 1, 'A1'), ('A', 1, 2, 'A2'), ('A', 1, 1, 'A1')],
+                chunk_size=2,
+            )
+
+        self.assertFalse(Seat.objects.filter(stadium=stadium).exists())
+
+
+class TestSeatQuerySet(TestCase):
+
+    def setUp(self):
+
+        self.stadium = Stadium.objects.create(name='Azadi')
+
+        # Rows 1 and 2 of section A numbered 5-8, with an aisle after 6 in
+        # row 1, and one seat of section B without a row.
+        Seat.objects.create_layout(
+            self.stadium.pk,
+            [
+                ('A', row, number, f'A{row}-{number}')
+                for row in (1, 2)
+                for number in ((5, 6, 9, 10) if row == 1 else (5, 6, 7, 8))
+            ] + [('B', None, None, 'B1')],
+        )
+        self.seats = dict(Seat.objects.values_list('code', 'pk'))
+
+        self.match = Match.objects.create(
+            stadium=self.stadium,
+            host_team=Team.objects.create(name='Esteghlal'),
+            guest_team=Team.objects.create(name='Piroozi'),
+            datetime=timezone.now(),
+        )
+        MatchSeatInfo.objects.bulk_create(
+            MatchSeatInfo(
+                match=self.match,
+                seat_id=seat_id,
+                price=4500,
+                is_reserved=code == 'A1-5',
+                is_paid=code == 'A1-5',
+            )
+            for code, seat_id in self.seats.items()
+        )
+
+    def numbers(self, row):
+
+        return list(
+            Seat.objects.filter(row=row).order_by('number').values_list(
+                'number',
+                flat=True,
+            )
+        )
+
+    def test_rows_and_sections(self):
+
+        seat = Seat.objects.filter(code='A1-9')
+
+        self.assertEqual(seat.rows().count(), 4)
+        self.assertEqual(seat.sections().count(), 8)
+        self.assertEqual(Seat.objects.filter(code='B1').rows().count(), 0)
+        self.assertEqual(Seat.objects.filter(code='B1').sections().count(), 1)
+
+    def test_renumber(self):
+
+        self.match.refresh_from_db()
+        version = self.match.seat_map_version
+
+        count = Seat.objects.filter(code__in=('A1-9', 'A2-5')).renumber(1)
+
+        self.assertEqual(count, 8)
+        self.assertEqual(self.numbers(1), [1, 2, 5, 6])
+        self.assertEqual(self.numbers(2), [1, 2, 3, 4])
+        self.match.refresh_from_db()
+        self.assertEqual(self.match.seat_map_version, version + 1)
+
+    def test_renumber_invalid(self):
+        """
+        This method checks if rows which already start at the number and
+        seats without a row aren't changed.
+        """
+
+        self.assertEqual(Seat.objects.filter(row=1).renumber(5), 0)
+        self.assertEqual(Seat.objects.filter(code='B1').renumber(1), 0)
+        self.assertEqual(self.numbers(1), [5, 6, 9, 10])
+
+    def test_purge(self):
+
+        with self.assertNumQueries(15):
+            seats, match_seats = Seat.objects.filter(
+                code='A1-5',
+            ).sections().purge()
+
+        self.assertEqual((seats, match_seats), (8, 8))
+        self.assertEqual(
+            list(Seat.objects.values_list('code', flat=True)),
+            ['B1'],
+        )
+        self.assertEqual(
+            MatchInventory.objects.counts((self.match.pk,)),
+            {self.match.pk: {'available': 1, 'held': 0, 'sold': 0}},
+        )
@@ -3,7 +3,10 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 
 from apps.stadium.models import Stadium
-from apps.stadium.serializers import StadiumSerializer
+from apps.stadium.serializers import (
+    StadiumSerializer,
+    SeatLayoutSerializer,
+)
 
 User = get_user_model()
 
@@ -60,3 +63,121 @@ class TestStadiumSerializer(APITestCase):
 
         self.assertFalse(srz_data.is_valid())
         self.assertEqual(len(srz_data.errors), 1)
+
+
+class TestSeatLayoutSerializer(APITestCase):
+
+    def test_valid_data(self):
+
+        srz_data = SeatLayoutSerializer(
+            data={
+                'sections': [
+                    {'name': 'A', 'rows': 2, 'seats_per_row': 3},
+                    {'name': 'B', 'rows': 1, 'seats_per_row': 2,
+                     'first_row': 5},
+                ],
+            }
+        )
+
+        self.assertTrue(srz_data.is_valid())
+        self.assertSetEqual(
+            srz_data.validated_data['codes'],
+            {
+                'A01001', 'A01002', 'A01003',
+                'A02001', 'A02002', 'A02003',
+                'B05001', 'B05002',
+            },
+        )
+        self.assertEqual(srz_data.validated_data['first_code'], 'A01001')
+        self.assertEqual(srz_data.validated_data['last_code'], 'B05002')
+
+    def test_invalid_data_first(self):
+        """
+        This method checks if parameter sections is missing.
+        """
+
+        srz_data = SeatLayoutSerializer(data={})
+
+        self.assertFalse(srz_data.is_valid())
+        self.assertEqual(len(srz_data.errors), 1)
+
+    def test_invalid_data_second(self):
+        """
+        This method checks if the code pattern uses an unknown field.
+        """
+
+        srz_data = SeatLayoutSerializer(
+            data={
+                'code_pattern': '{section}{stadium.name}',
+                'sections': [{'name': 'A', 'rows': 1, 'seats_per_row': 1}],
+            }
+        )
+
+        self.assertFalse(srz_data.is_valid())
+        self.assertIn('code_pattern', srz_data.errors)
+
+    def test_invalid_data_third(self):
+        """
+        This method checks if the code pattern gives seats the same code.
+        """
+
+        srz_data = SeatLayoutSerializer(
+            data={
+                'code_pattern': '{section}{row}',
+                'sections': [{'name': 'A', 'rows': 2, 'seats_per_row': 2}],
+            }
+        )
+
+        self.assertFalse(srz_data.is_valid())
+        self.assertIn('non_field_errors', srz_data.errors)
+
+    def test_invalid_data_fourth(self):
+        """
+        This method checks if codes are longer than the code of a seat.
+        """
+
+        srz_data = SeatLayoutSerializer(
+            data={
+                'code_pattern': '{section}-{row:04}-{seat:04}',
+                'sections': [{'name': 'A', 'rows': 1, 'seats_per_row': 1}],
+            }
+        )
+
+        self.assertFalse(srz_data.is_valid())
+        self.assertIn('non_field_errors', srz_data.errors)
+
+    def test_invalid_data_fifth(self):
+        """
+        This method checks if there are more seats than allowed, or
+        duplicate section names.
+        """
+
+        for sections in (
+            [{'name': 'A', 'rows': 1000, 'seats_per_row': 1000}],
+            [
+                {'name': 'A', 'rows': 1, 'seats_per_row': 1},
+                {'name': 'A', 'rows': 1, 'seats_per_row': 1},
+            ],
+        ):
+            srz_data = SeatLayoutSerializer(data={'sections': sections})
+
+            self.assertFalse(srz_data.is_valid())
+            self.assertIn('non_field_errors', srz_data.errors)
+
+    def test_invalid_data_sixth(self):
+        """
+        This method checks if row and seat numbers are beyond what a seat
+        can store.
+        """
+
+        for section in (
+            {'name': 'A', 'rows': 1, 'seats_per_row': 40000},
+            {'name': 'A', 'rows': 1, 'seats_per_row': 1, 'first_row': 40000},
+            {'name': 'A', 'rows': 2, 'seats_per_row': 1, 'first_row': 32767},
+        ):
+            srz_data = SeatLayoutSerializer(
+                data={'code_pattern': '{row}-{seat}', 'sections': [section]},
+            )
+
+            self.assertFalse(srz_data.is_valid())
+            self.assertIn('sections', srz_data.errors)
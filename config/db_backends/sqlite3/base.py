@@ -0,0 +1,140 @@
+from contextlib import contextmanager
+from time import perf_counter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+from config.metrics import metrics
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def _count_busy(error):
+
+    if 'locked' in str(error) or 'busy' in str(error):
+        metrics.inc('sqlite_busy_errors_total')
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Counts statements which failed because the database was locked.
+    """
+
+    def execute(self, query, params=None):
+
+        try:
+            return super().execute(query, params)
+        except base.Database.OperationalError as error:
+            _count_busy(error)
+            raise
+
+    def executemany(self, query, param_list):
+
+        try:
+            return super().executemany(query, param_list)
+        except base.Database.OperationalError as error:
+            _count_busy(error)
+            raise
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend for several concurrent web workers.
+
+    It takes two more keys in OPTIONS of the database settings :
+
+        - pragmas : PRAGMA statements run on every new connection, as a
+          dict of name -> value, e.g. {'journal_mode': 'WAL'}.
+        - transaction_mode : how transactions start; 'DEFERRED' (SQLite's
+          default), 'IMMEDIATE' or 'EXCLUSIVE'.
+
+    With 'IMMEDIATE', a transaction takes the write lock when it begins,
+    waiting for it up to busy_timeout. A deferred transaction which reads
+    before it writes can't wait : if another connection has written in the
+    meantime, its first write fails at once with "database is locked".
+    Read-only transactions don't need the lock, though, so rather than
+    setting it for every transaction, write paths can begin theirs
+    IMMEDIATE with `immediate()`.
+    """
+
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
+        self._immediate = 0
+
+    @contextmanager
+    def immediate(self):
+        """
+        Begin transactions which start in the block IMMEDIATE, unless
+        transaction_mode is stricter. It only changes transactions begun
+        there; a block inside a transaction is a savepoint of it.
+        """
+
+        self._immediate += 1
+        try:
+            yield
+        finally:
+            self._immediate -= 1
+
+    def get_connection_params(self):
+
+        kwargs = super().get_connection_params()
+        kwargs.pop('pragmas', None)
+        kwargs.pop('transaction_mode', None)
+
+        return kwargs
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(factory=SQLiteCursorWrapper)
+
+    def get_new_connection(self, conn_params):
+
+        conn = super().get_new_connection(conn_params)
+
+        for name, value in self.settings_dict['OPTIONS'].get(
+            'pragmas', {},
+        ).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+        return conn
+
+    @property
+    def transaction_mode(self):
+
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+
+        if mode is None:
+            return None
+
+        mode = mode.upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                'transaction_mode must be one of '
+                f'{", ".join(TRANSACTION_MODES)}, not {mode}.'
+            )
+
+        return mode
+
+    def _start_transaction_under_autocommit(self):
+
+        mode = self.transaction_mode
+        if self._immediate and mode in (None, 'DEFERRED'):
+            mode = 'IMMEDIATE'
+
+        if mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            # Time spent waiting for the write lock, up to busy_timeout.
+            start = perf_counter()
+            self.cursor().execute(f'BEGIN {mode}')
+            metrics.observe('sqlite_lock_wait_seconds', perf_counter() - start)
+
+    def _commit(self):
+
+        try:
+            return super()._commit()
+        except OperationalError as error:
+            _count_busy(error)
+            raise
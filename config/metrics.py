@@ -0,0 +1,507 @@
+import hmac
+import mmap
+import os
+import struct
+from hashlib import sha256
+from socket import gethostname
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import get_resolver
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : slots are claimed without locking the file.
+    fcntl = None
+
+
+# Upper bounds of histogram buckets, in seconds; +Inf is added.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name : (type, label name or None, help)
+METRICS = {
+    'http_request_duration_seconds': (
+        'histogram', 'url_name', 'Time to answer requests, by URL name.',
+    ),
+    'http_requests_in_flight': (
+        'gauge', None, 'Requests being answered.',
+    ),
+    'db_connections_open': (
+        'gauge', 'alias', 'Open database connections, by alias.',
+    ),
+    'sqlite_lock_wait_seconds': (
+        'histogram', None,
+        'Time to get the write lock when a transaction begins.',
+    ),
+    'sqlite_busy_errors_total': (
+        'counter', None, 'Statements which failed with database is locked.',
+    ),
+    'match_seats_reserved_total': (
+        'counter', None, 'Seats reserved by buyers.',
+    ),
+    'match_reservation_conflicts_total': (
+        'counter', None, 'Reservations which lost seats to other buyers.',
+    ),
+    'match_seats_paid_total': (
+        'counter', None, 'Reserved seats which were paid.',
+    ),
+    'match_seats_released_total': (
+        'counter', None, 'Seats released when their hold expired.',
+    ),
+    # Sampled requests measured by config/profiling.py.
+    'profiled_requests_total': (
+        'counter', 'url_name', 'Profiled requests, by URL name.',
+    ),
+    'profiled_request_seconds_total': (
+        'counter', 'url_name', 'Time to answer profiled requests.',
+    ),
+    'profiled_db_seconds_total': (
+        'counter', 'url_name', 'Time in queries of profiled requests.',
+    ),
+    'profiled_db_queries_total': (
+        'counter', 'url_name', 'Queries of profiled requests.',
+    ),
+    'profiled_db_duplicate_queries_total': (
+        'counter', 'url_name',
+        'Queries of profiled requests run again with the same parameters.',
+    ),
+    'profiled_db_similar_queries_total': (
+        'counter', 'url_name',
+        'Queries of profiled requests run again with other parameters.',
+    ),
+    'profiled_serializer_seconds_total': (
+        'counter', 'url_name', 'Time in serializers of profiled requests.',
+    ),
+}
+
+MAGIC = b'METRICS1'
+
+# Magic, hash of the layout, number of slots.
+HEADER = struct.Struct('8s8sQ')
+
+# Pids are below it on Linux; with 30 bits of a host hash, owners of slots
+# are still exact in a float64.
+PID_LIMIT = 2 ** 22
+
+
+def _label_values(label):
+    """
+    Values a label can take; every process must find the same ones, in the
+    same order, since they decide where values are in the file.
+    """
+
+    if label == 'url_name':
+        names = {
+            name for name in get_resolver().reverse_dict.keys()
+            if isinstance(name, str)
+        }
+        for resolver in _resolvers(get_resolver()):
+            names.update(
+                name for name in resolver.reverse_dict.keys()
+                if isinstance(name, str)
+            )
+        return sorted(names) + ['']
+
+    if label == 'alias':
+        return sorted(settings.DATABASES)
+
+    return ['']
+
+
+def _resolvers(resolver):
+
+    for _, sub_resolver in resolver.namespace_dict.values():
+        yield sub_resolver
+        yield from _resolvers(sub_resolver)
+
+
+class Layout:
+    """
+    Where the value of each series is in a slot : `offsets` maps
+    (name, label value) to the index of its first value. A histogram has
+    a value per bucket (not cumulative), then its sum and its count.
+    """
+
+    def __init__(self):
+
+        self.offsets = {}
+        self.gauges = []
+        size = 1  # The process which owns the slot (see _owner).
+
+        for name, (kind, label, _) in METRICS.items():
+            for value in _label_values(label):
+                self.offsets[name, value] = size
+                if kind == 'histogram':
+                    size += len(BUCKETS) + 3
+                else:
+                    if kind == 'gauge':
+                        self.gauges.append(size)
+                    size += 1
+
+        self.size = size
+        self.hash = sha256(
+            repr(sorted(self.offsets.items())).encode(),
+        ).digest()
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms of every process of the server in one
+    file, mapped in memory, without any external service.
+
+    The file has METRICS['SLOTS'] slots of float64 values, one slot per
+    process (e.g. gunicorn worker). A process only ever writes its own
+    slot, so processes never wait for each other; its threads share a
+    lock. The file is only locked to claim a slot, once per process.
+    /metrics sums the slots of every process : counters and histograms of
+    dead processes are still counted, so they never go down, and a new
+    process takes over such a slot with its values. Gauges of dead
+    processes are left out.
+
+    The file is made again when the metrics change, e.g. URL names. Without
+    METRICS['PATH'], metrics are kept in the memory of the process.
+    """
+
+    def __init__(self):
+
+        self._lock = Lock()
+        self._layout = None
+        self._map = None
+        self._slots = None
+        self._values = None
+        os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self):
+        """
+        A forked process must claim a slot of its own.
+        """
+
+        self._lock = Lock()
+        self._values = None
+
+    @property
+    def layout(self):
+
+        if self._layout is None:
+            self._layout = Layout()
+
+        return self._layout
+
+    def _open(self):
+
+        layout = self.layout
+        path = settings.METRICS['PATH']
+        slots = settings.METRICS['SLOTS'] if path is not None else 1
+        size = HEADER.size + slots * layout.size * 8
+        header = HEADER.pack(MAGIC, layout.hash[:8], slots)
+
+        if path is None:
+            self._map = mmap.mmap(-1, size)
+            self._slots = self._split(slots)
+            self._values = self._claim()
+            return
+
+        while True:
+
+            with open(path, 'a+b') as file:
+
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_EX)
+
+                try:
+                    if os.fstat(file.fileno()).st_ino != os.stat(path).st_ino:
+                        # Replaced while this process waited for the lock.
+                        continue
+
+                    file.seek(0)
+                    if (
+                        file.read(HEADER.size) != header or
+                        os.fstat(file.fileno()).st_size != size
+                    ):
+                        # Processes which still map the old file keep it;
+                        # truncating it would crash them.
+                        temporary = f'{path}.{os.getpid()}'
+                        with open(temporary, 'wb') as new:
+                            new.truncate(size)
+                            new.write(header)
+                        os.replace(temporary, path)
+                        continue
+
+                    self._map = mmap.mmap(file.fileno(), size)
+                    self._slots = self._split(slots)
+                    self._values = self._claim()
+                    return
+
+                finally:
+                    # mmap keeps a duplicate of the descriptor, so closing
+                    # the file wouldn't release the lock.
+                    if fcntl is not None:
+                        fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _split(self, slots):
+
+        size = self.layout.size
+        values = memoryview(self._map)[HEADER.size:].cast('d')
+
+        return [
+            values[index * size:(index + 1) * size] for index in range(slots)
+        ]
+
+    def _claim(self):
+        """
+        The slot of this process : its own, a free one, or one of a dead
+        process.
+        """
+
+        owner_id = _owner()
+        free = dead = None
+
+        for slot in self._slots:
+            owner = int(slot[0])
+            if owner == owner_id:
+                return slot
+            if owner == 0:
+                if free is None:
+                    free = slot
+            elif dead is None and not _alive(owner):
+                dead = slot
+
+        slot = free if free is not None else dead
+        if slot is None:
+            # Every slot is taken : metrics of this process stay private.
+            slot = memoryview(bytearray(self.layout.size * 8)).cast('d')
+            self._slots.append(slot)
+
+        for offset in self.layout.gauges:
+            slot[offset] = 0
+        slot[0] = owner_id
+
+        return slot
+
+    def _write(self, name, label, update):
+
+        offset = self.layout.offsets.get((name, label))
+        if offset is None:
+            return
+
+        with self._lock:
+            if self._values is None:
+                self._open()
+            update(self._values, offset)
+
+    def inc(self, name, value=1, label=''):
+
+        def update(values, offset):
+            values[offset] += value
+
+        self._write(name, label, update)
+
+    def set(self, name, value, label=''):
+
+        def update(values, offset):
+            values[offset] = value
+
+        self._write(name, label, update)
+
+    def observe(self, name, value, label=''):
+
+        def update(values, offset):
+            bucket = 0
+            while bucket < len(BUCKETS) and value > BUCKETS[bucket]:
+                bucket += 1
+            values[offset + bucket] += 1
+            values[offset + len(BUCKETS) + 1] += value
+            values[offset + len(BUCKETS) + 2] += 1
+
+        self._write(name, label, update)
+
+    def collect(self):
+        """
+        Sums of the values of every process, by index in a slot.
+        """
+
+        with self._lock:
+
+            if self._values is None:
+                self._open()
+
+            gauges = set(self.layout.gauges)
+            totals = [0.0] * self.layout.size
+
+            for slot in self._slots:
+                owner = int(slot[0])
+                if owner == 0:
+                    continue
+                alive = _alive(owner)
+                for index in range(1, self.layout.size):
+                    if alive or index not in gauges:
+                        totals[index] += slot[index]
+
+        return totals
+
+    def render(self):
+        """
+        Metrics in the text format of Prometheus.
+        """
+
+        totals = self.collect()
+        lines = []
+
+        for name, (kind, label, help) in METRICS.items():
+
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+
+            for value in _label_values(label):
+
+                offset = self.layout.offsets[name, value]
+                labels = {label: value} if label else {}
+
+                if kind != 'histogram':
+                    lines.append(_sample(name, labels, totals[offset]))
+                    continue
+
+                cumulative = 0
+                for bucket, bound in enumerate((*BUCKETS, '+Inf')):
+                    cumulative += totals[offset + bucket]
+                    lines.append(
+                        _sample(
+                            f'{name}_bucket',
+                            {**labels, 'le': str(bound)},
+                            cumulative,
+                        )
+                    )
+
+                lines.append(
+                    _sample(
+                        f'{name}_sum',
+                        labels,
+                        totals[offset + len(BUCKETS) + 1],
+                    )
+                )
+                lines.append(
+                    _sample(
+                        f'{name}_count',
+                        labels,
+                        totals[offset + len(BUCKETS) + 2],
+                    )
+                )
+
+        return '\n'.join(lines) + '\n'
+
+
+def _owner():
+    """
+    Id of this process in the file : its pid, and a hash of the host name,
+    since containers sharing the file have pids of their own.
+    """
+
+    host = int.from_bytes(
+        sha256(gethostname().encode()).digest()[:4],
+        'big',
+    )
+
+    return (host >> 2) * PID_LIMIT + os.getpid()
+
+
+def _alive(owner):
+    """
+    Whether the process which owns a slot runs; processes of other hosts
+    can't be seen, so they're taken as running.
+    """
+
+    host, pid = divmod(owner, PID_LIMIT)
+    if host != _owner() // PID_LIMIT:
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+
+    return True
+
+
+def _sample(name, labels, value):
+
+    if labels:
+        name += '{%s}' % ','.join(
+            f'{label}="{_escape(text)}"' for label, text in labels.items()
+        )
+
+    return f'{name} {int(value) if value == int(value) else value!r}'
+
+
+def _escape(value):
+    return (
+        value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+    )
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """
+    Time every request by the name of its URL, and keep gauges of requests
+    in flight and open database connections up to date.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        metrics.inc('http_requests_in_flight')
+        start = perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.inc('http_requests_in_flight', -1)
+
+        match = request.resolver_match
+        metrics.observe(
+            'http_request_duration_seconds',
+            perf_counter() - start,
+            label=(match.url_name or '') if match else '',
+        )
+
+        for connection in connections.all():
+            metrics.set(
+                'db_connections_open',
+                connection.connection is not None,
+                label=connection.alias,
+            )
+
+        return response
+
+
+def metrics_view(request):
+    """
+    Metrics of every process, for Prometheus to scrape.
+    Permission : Bearer METRICS['TOKEN'] in Authorization header, if set,
+    else METRICS['PUBLIC'].
+    """
+
+    token = settings.METRICS['TOKEN']
+
+    if token is None:
+        if not settings.METRICS['PUBLIC']:
+            return HttpResponse(status=401)
+    elif not hmac.compare_digest(
+        request.headers.get('Authorization', ''),
+        f'Bearer {token}',
+    ):
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
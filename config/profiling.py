@@ -0,0 +1,182 @@
+from contextlib import ExitStack
+from contextvars import ContextVar
+from random import random
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from rest_framework.fields import empty
+
+from config.metrics import metrics
+
+
+# Profile of the request being measured in this thread or task, if any.
+_current = ContextVar('profile', default=None)
+
+
+class Profile:
+    """
+    Measures of one request. Times are in seconds.
+
+    `duplicates` are queries run again with the same SQL and parameters,
+    which could have been reused; `similar` are queries run again with the
+    same SQL and other parameters, which is how N+1 queries look.
+    """
+
+    __slots__ = (
+        'wall', 'db', 'queries', 'duplicates', 'similar', 'serializer',
+        'seen', 'statements', 'in_serializer',
+    )
+
+    def __init__(self):
+
+        self.wall = self.db = self.serializer = 0.0
+        self.queries = self.duplicates = self.similar = 0
+        self.seen = set()
+        self.statements = set()
+        self.in_serializer = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """
+        Execute wrapper of database connections (see execute_wrapper).
+        """
+
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - start
+            self.queries += 1
+
+            alias = context['connection'].alias
+            query = (alias, sql, repr(params))
+            if query in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(query)
+                if (alias, sql) in self.statements:
+                    self.similar += 1
+                else:
+                    self.statements.add((alias, sql))
+
+    def server_timing(self):
+        """
+        Value of the Server-Timing header, with durations in milliseconds.
+        """
+
+        return (
+            f'total;dur={self.wall * 1000:.1f}, '
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries, '
+            f'{self.duplicates} duplicates, {self.similar} similar", '
+            f'serializer;dur={self.serializer * 1000:.1f}'
+        )
+
+
+# Series of config/metrics.py which measures of profiled requests are added
+# to, by URL name, and the attribute of Profile each one takes.
+SERIES = (
+    ('profiled_request_seconds_total', 'wall'),
+    ('profiled_db_seconds_total', 'db'),
+    ('profiled_db_queries_total', 'queries'),
+    ('profiled_db_duplicate_queries_total', 'duplicates'),
+    ('profiled_db_similar_queries_total', 'similar'),
+    ('profiled_serializer_seconds_total', 'serializer'),
+)
+
+
+def _timed(method, *args):
+    """
+    Call a serializer method, adding the time spent in it to the profile of
+    the request, if it's profiled; serializers called from inside it are
+    counted once.
+    """
+
+    profile = _current.get()
+    if profile is None or profile.in_serializer:
+        return method(*args)
+
+    profile.in_serializer = True
+    start = perf_counter()
+    try:
+        return method(*args)
+    finally:
+        profile.serializer += perf_counter() - start
+        profile.in_serializer = False
+
+
+class ProfiledSerializerMixin:
+    """
+    Time validation, saving and representation of a DRF serializer in
+    profiled requests. Only serializers inheriting it are timed, and only
+    while ProfilingMiddleware measures a request. With many=True, the list
+    serializer runs these methods of its child, so it's timed too.
+    """
+
+    def run_validation(self, data=empty):
+        return _timed(super().run_validation, data)
+
+    def to_representation(self, instance):
+        return _timed(super().to_representation, instance)
+
+    def create(self, validated_data):
+        return _timed(super().create, validated_data)
+
+    def update(self, instance, validated_data):
+        return _timed(super().update, instance, validated_data)
+
+
+class ProfilingMiddleware:
+    """
+    Measure a sample of requests : wall time, time and number of queries
+    on every database, duplicate and similar queries (see Profile), and
+    time in serializers (see ProfiledSerializerMixin). Measures are added
+    to the `profiled_*` series of /metrics, by URL name, so they're summed
+    over every process. They're also sent back in a Server-Timing header,
+    to staff users only (or anyone with DEBUG), since they tell how a view
+    works.
+
+    PROFILING['SAMPLE_RATE'] of requests are measured; the others only cost
+    a random number. When PROFILING['ENABLED'] is false, the middleware
+    is left out entirely.
+    """
+
+    def __init__(self, get_response):
+
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING['SAMPLE_RATE']
+
+    def __call__(self, request):
+
+        if random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = Profile()
+        token = _current.set(profile)
+        start = perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            profile.wall = perf_counter() - start
+            _current.reset(token)
+
+        match = request.resolver_match
+        label = (match.url_name or '') if match else ''
+        metrics.inc('profiled_requests_total', label=label)
+        for name, field in SERIES:
+            metrics.inc(name, getattr(profile, field), label=label)
+
+        # DRF sets the user it authenticated on the request too.
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = profile.server_timing()
+
+        return response
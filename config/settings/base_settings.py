@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.metrics.MetricsMiddleware',
+    'config.profiling.ProfilingMiddleware',
+    'config.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -146,7 +150,7 @@ REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
 
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.StatelessJWTAuthentication',
     ),
 
     'DEFAULT_RENDERER_CLASSES': (
@@ -157,6 +161,139 @@ REST_FRAMEWORK = {
 
 }
 
+##################
+# SIMPLE JWT #
+##################
+
+SIMPLE_JWT = {
+
+    # Tokens carry is_staff and is_active claims, so that
+    # StatelessJWTAuthentication doesn't load the user on every request.
+    'TOKEN_OBTAIN_SERIALIZER': (
+        'apps.accounts.serializers.UserTokenObtainPairSerializer'
+    ),
+
+    # Refresh checks the user in the database, so a deactivated user or a
+    # changed password ends sessions within ACCESS_TOKEN_LIFETIME.
+    'TOKEN_REFRESH_SERIALIZER': (
+        'apps.accounts.serializers.UserTokenRefreshSerializer'
+    ),
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+}
+
+##################
+# MATCH #
+##################
+
+# Seats which are reserved but not paid, are released after this time.
+MATCH_SEAT_HOLD_TTL = timedelta(minutes=10)
+
+# Used by `release_expired_seats` command. Each sweep releases expired
+# holds with UPDATEs of at most this many rows, so the write lock is never
+# held for long.
+MATCH_SEAT_RELEASE_BATCH_SIZE = 500
+
+# Seconds between two sweeps when `release_expired_seats` runs as a worker.
+MATCH_SEAT_RELEASE_INTERVAL = 60
+
+# Seconds for which a process trusts its availability bitmap of a match
+# (apps/match/availability.py). Bitmaps are invalidated through the cache
+# when seats are freed or defined; this bounds staleness when the cache
+# isn't shared between processes, like the default LocMemCache.
+MATCH_SEAT_AVAILABILITY_MAX_AGE = 5
+
+# Number of matches whose availability bitmaps a process keeps; the bitmaps
+# of the matches used least recently are dropped first.
+MATCH_SEAT_AVAILABILITY_MAX_MATCHES = 1000
+
+# Seconds for which a process trusts its seat rows of a match, used to pick
+# best available seats (apps/match/allocation.py). Rows change much less
+# often than availability : only when seats are defined or repriced.
+MATCH_SEAT_LAYOUT_MAX_AGE = 60
+
+# Responses of requests with an Idempotency-Key header are replayed to
+# retries for this long (apps/match/idempotency.py).
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+
+# Seconds a retry waits for the first request with the same key to finish.
+IDEMPOTENCY_KEY_WAIT = 5
+
+# A request with a key which hasn't finished after this long (gunicorn's
+# default worker timeout) is taken for dead, and a retry runs again.
+IDEMPOTENCY_KEY_LEASE = timedelta(seconds=30)
+
+# Waiting room of the reservation endpoint (apps/match/admission.py). When
+# enabled, users join the queue of a match and may only reserve seats once
+# admitted, with the signed ticket they got in X-Queue-Ticket header.
+#   - ACTIVE_SHOPPERS : admitted users per match at the start; it moves
+#     between MIN_ and MAX_ACTIVE_SHOPPERS with the commit latency of
+#     reservations, which is aimed at TARGET_COMMIT_LATENCY seconds.
+#   - SESSION_TTL : seconds after which an idle admitted user loses the place.
+# The default backend keeps queues in memory, so it's refused with more than
+# one gunicorn worker process.
+MATCH_ADMISSION = {
+    'ENABLED': False,
+    'BACKEND': 'apps.match.admission.InMemoryAdmissionBackend',
+    'TICKET_MAX_AGE': 60 * 60 * 3,
+    'OPTIONS': {
+        'ACTIVE_SHOPPERS': 200,
+        'MIN_ACTIVE_SHOPPERS': 20,
+        'MAX_ACTIVE_SHOPPERS': 2000,
+        'SESSION_TTL': 60 * 10,
+        'TARGET_COMMIT_LATENCY': 0.05,
+    },
+}
+
+##################
+# PROFILING #
+##################
+
+# Request profiling (config/profiling.py). SAMPLE_RATE of requests, from 0
+# to 1, are measured and added to the profiled_* series of /metrics; staff
+# users (anyone with DEBUG) also get the measures in a Server-Timing header.
+PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.01,
+}
+
+##################
+# METRICS #
+##################
+
+# Metrics served at /metrics (config/metrics.py). Every process of the
+# server (e.g. gunicorn worker) keeps its metrics in a slot of the file at
+# PATH, mapped in memory; SLOTS must be more than the number of processes.
+# Without PATH, each process only serves its own metrics. With TOKEN, the
+# scraper must send it in an "Authorization: Bearer" header; without it,
+# metrics are only served if PUBLIC.
+METRICS = {
+    'PATH': BASE_DIR / 'metrics.mmap',
+    'SLOTS': 64,
+    'TOKEN': None,
+    'PUBLIC': True,
+}
+
+# Tests keep metrics in memory instead of the file at METRICS['PATH'].
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+##################
+# SLOW QUERIES #
+##################
+
+# Statements of requests slower than THRESHOLD seconds are written to the
+# JSON lines file at PATH (config/slow_queries.py), with the view and the
+# code they come from; EXPLAIN_RATE of them, from 0 to 1, with their plan.
+# The file is rotated at MAX_BYTES, keeping BACKUP_COUNT old files.
+# `python manage.py summarize_slow_queries` groups them by statement.
+SLOW_QUERIES = {
+    'ENABLED': True,
+    'THRESHOLD': 0.1,
+    'EXPLAIN_RATE': 0.1,
+    'PATH': BASE_DIR / 'slow_queries.jsonl',
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
+}
+
 ##################
 # DRF Spectacular -> This is for API Documentation
 ##################
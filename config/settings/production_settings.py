@@ -1 +1,52 @@
+import os
+
 from .base_settings import *
+
+
+##################
+# DATABASE #
+##################
+
+# SQLite tuned for several gunicorn workers (config/db_backends/sqlite3).
+#   - WAL : readers don't block the writer, nor the writer readers.
+#   - synchronous NORMAL : safe with WAL; only the last commits may be lost
+#     on power failure, never the consistency of the database.
+#   - busy_timeout : milliseconds a writer waits for the lock before
+#     "database is locked".
+#   - mmap_size / cache_size : reads come from memory instead of read()
+#     calls; cache_size is negative, so it's in KiB.
+# Reservation, checkout and the expiry sweeper begin their transactions
+# IMMEDIATE (see MatchSeatInfoQuerySet), so they wait for the write lock
+# instead of failing when they read before they write; other transactions
+# stay deferred, so reads never take the lock.
+DATABASES = {
+    'default': {
+        'ENGINE': 'config.db_backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+            },
+        },
+    }
+}
+
+##################
+# METRICS #
+##################
+
+# /metrics tells how the site is used, so it's only served to scrapers
+# sending the METRICS_TOKEN environment variable as a Bearer token; without
+# it, to no one.
+METRICS = {
+    **METRICS,
+    'TOKEN': os.environ.get('METRICS_TOKEN') or None,
+    'PUBLIC': False,
+}
@@ -0,0 +1,319 @@
+import json
+import os
+import re
+import sys
+from contextlib import ExitStack
+from contextvars import ContextVar
+from hashlib import sha1
+from random import random
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : files are rotated without locking them.
+    fcntl = None
+
+
+# Request being answered in this thread or task, if any.
+_request = ContextVar('slow_query_request', default=None)
+
+# Set while a plan is explained, so EXPLAIN itself isn't logged.
+_explaining = ContextVar('slow_query_explaining', default=False)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:\?|%s)(?:, (?:\?|%s))*\)', re.IGNORECASE)
+_ROWS = re.compile(r'(\((?:\?|%s)(?:, (?:\?|%s))*\))(?:, \1)+')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """
+    The statement with its values taken out, so statements which only
+    differ by their values are the same : literals become ?, and lists of
+    values (IN lists, rows of a multi-row INSERT) a single item.
+    """
+
+    sql = _SPACES.sub(' ', sql.strip())
+    sql = _LITERALS.sub('?', sql)
+    sql = _IN_LISTS.sub('IN (...)', sql)
+
+    return _ROWS.sub(r'\1, ...', sql)
+
+
+def fingerprint(sql):
+    return sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def _origin():
+    """
+    Frames of the project's apps which led to the statement, innermost
+    first, e.g. 'apps/match/serializers.py:88 validate'.
+    """
+
+    root = os.path.join(str(settings.BASE_DIR), 'apps') + os.sep
+    frames = []
+    frame = sys._getframe(1)
+
+    while frame is not None and len(frames) < 5:
+        filename = frame.f_code.co_filename
+        if filename.startswith(root):
+            frames.append(
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno} {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+
+    return frames
+
+
+def _explain(connection, sql, params):
+    """
+    Plan of the statement as lines of text, or the error which explaining
+    it raised. Inside a transaction, a savepoint keeps the transaction
+    usable when EXPLAIN fails.
+    """
+
+    token = _explaining.set(True)
+
+    try:
+        with ExitStack() as stack:
+            if connection.in_atomic_block:
+                stack.enter_context(transaction.atomic(using=connection.alias))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'{connection.ops.explain_query_prefix()} {sql}',
+                    params,
+                )
+                # The text of a step is the last column (SQLite's rows are
+                # id, parent, notused, detail).
+                return [str(row[-1]) for row in cursor.fetchall()], None
+
+    except DatabaseError as error:
+        return None, str(error)
+
+    finally:
+        _explaining.reset(token)
+
+
+class JsonLinesFile:
+    """
+    A file of JSON lines which several processes append to.
+
+    Each record is one write() to a file opened with O_APPEND, so lines of
+    processes never interleave. When the file grows over `max_bytes`, it's
+    renamed to `path`.1 (and older ones to .2 and so on, up to
+    `backup_count`) by the first process which sees it, with the file
+    locked; the others notice that `path` is another file and reopen it.
+    """
+
+    def __init__(self, path, max_bytes, backup_count):
+
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._fd = None
+        self._lock = Lock()
+
+    def _open(self):
+
+        if self._fd is not None:
+            os.close(self._fd)
+
+        self._fd = os.open(
+            self.path,
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+            0o644,
+        )
+
+    def _is_current(self):
+
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _is_full(self, fd, length):
+        """
+        Whether writing `length` more bytes would make the file larger than
+        max_bytes; a line larger than that is written to an empty file.
+        """
+
+        size = os.fstat(fd).st_size
+
+        return size > 0 and size + length > self.max_bytes
+
+    def _rotate(self, length):
+
+        with open(self.path, 'ab') as file:
+
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+
+            try:
+                # Another process may have rotated it in the meantime.
+                if (
+                    os.fstat(file.fileno()).st_ino ==
+                    os.fstat(self._fd).st_ino and
+                    self._is_full(file.fileno(), length)
+                ):
+                    for number in range(self.backup_count - 1, 0, -1):
+                        source = f'{self.path}.{number}'
+                        if os.path.exists(source):
+                            os.replace(source, f'{self.path}.{number + 1}')
+                    if self.backup_count:
+                        os.replace(self.path, f'{self.path}.1')
+                    else:
+                        os.truncate(self.path, 0)
+
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def write(self, record):
+
+        line = (json.dumps(record, default=str) + '\n').encode()
+
+        with self._lock:
+
+            if self._fd is None or not self._is_current():
+                self._open()
+
+            if self._is_full(self._fd, len(line)):
+                self._rotate(len(line))
+                if not self._is_current():
+                    self._open()
+
+            os.write(self._fd, line)
+
+    def paths(self):
+        """
+        Backups, the oldest first, then the file.
+        """
+
+        return [
+            path for path in (
+                *(
+                    f'{self.path}.{number}'
+                    for number in range(self.backup_count, 0, -1)
+                ),
+                self.path,
+            )
+            if os.path.exists(path)
+        ]
+
+    def read(self):
+        """
+        Records of the backups and the file, the oldest first. Lines which
+        can't be read, e.g. cut by a full disk, are skipped.
+        """
+
+        for path in self.paths():
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+class SlowQueryLog:
+    """
+    Execute wrapper (see connection.execute_wrapper) which logs statements
+    slower than SLOW_QUERIES['THRESHOLD'] seconds, with where they come
+    from : the view of the request and the frames of the project's apps.
+    A SLOW_QUERIES['EXPLAIN_RATE'] share of them is explained as well.
+
+    Parameters aren't logged, since they may be personal data; EXPLAIN
+    gets them, but they never leave the process.
+    """
+
+    def __init__(self):
+
+        options = settings.SLOW_QUERIES
+        self.threshold = options['THRESHOLD']
+        self.explain_rate = options['EXPLAIN_RATE']
+        self.file = JsonLinesFile(
+            options['PATH'],
+            options['MAX_BYTES'],
+            options['BACKUP_COUNT'],
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+
+        if _explaining.get():
+            return execute(sql, params, many, context)
+
+        start = perf_counter()
+        error = None
+
+        try:
+            return execute(sql, params, many, context)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            duration = perf_counter() - start
+            if duration >= self.threshold:
+                self.log(sql, params, many, context, duration, error)
+
+    def log(self, sql, params, many, context, duration, error):
+
+        connection = context['connection']
+        request = _request.get()
+        match = request.resolver_match if request is not None else None
+
+        record = {
+            'time': timezone.now().isoformat(),
+            'duration': round(duration * 1000, 3),
+            'alias': connection.alias,
+            'fingerprint': fingerprint(sql),
+            'sql': normalize(sql),
+            'many': many,
+            'view': match.view_name if match else None,
+            'method': request.method if request is not None else None,
+            'origin': _origin(),
+        }
+
+        if error is not None:
+            record['error'] = str(error)
+
+        elif not many and random() < self.explain_rate:
+            record['plan'], plan_error = _explain(connection, sql, params)
+            if plan_error is not None:
+                record['plan_error'] = plan_error
+
+        self.file.write(record)
+
+
+class SlowQueryMiddleware:
+    """
+    Log slow statements of requests on every database (see SlowQueryLog).
+    When SLOW_QUERIES['ENABLED'] is false, the middleware is left out.
+    """
+
+    def __init__(self, get_response):
+
+        if not settings.SLOW_QUERIES['ENABLED']:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.log = SlowQueryLog()
+
+    def __call__(self, request):
+
+        token = _request.set(request)
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self.log))
+                return self.get_response(request)
+        finally:
+            _request.reset(token)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the tests without the metrics file of METRICS['PATH'], which is
+    the one of the server : each test process keeps its metrics in its own
+    memory. Tests of the file point METRICS['PATH'] at a directory of
+    their own.
+    """
+
+    def setup_test_environment(self, **kwargs):
+
+        super().setup_test_environment(**kwargs)
+        settings.METRICS = {**settings.METRICS, 'PATH': None}
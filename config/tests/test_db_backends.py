@@ -0,0 +1,126 @@
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from config.metrics import BUCKETS, metrics
+
+
+class TestSqliteDatabaseWrapper(SimpleTestCase):
+
+    def setUp(self):
+
+        descriptor, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        self.addCleanup(self.remove)
+
+    def remove(self):
+
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def connect(self, options):
+
+        settings_dict = {
+            'ENGINE': 'config.db_backends.sqlite3',
+            'NAME': self.path,
+            'OPTIONS': options,
+        }
+        wrapper = ConnectionHandler({'default': settings_dict})['default']
+        self.addCleanup(wrapper.close)
+
+        return wrapper
+
+    def test_pragmas(self):
+
+        wrapper = self.connect({
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 1234,
+            },
+        })
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1234)
+
+    def test_transaction_mode(self):
+        """
+        This method checks if transactions take the write lock when they
+        begin, before any statement.
+        """
+
+        wrapper = self.connect({'transaction_mode': 'immediate'})
+        other = self.connect({'pragmas': {'busy_timeout': 0}})
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE "t" ("id" integer)')
+
+        wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            with other.cursor() as cursor:
+                cursor.execute('INSERT INTO "t" VALUES (1)')
+
+    def test_immediate(self):
+        """
+        This method checks if only transactions begun in `immediate()` take
+        the write lock when they begin.
+        """
+
+        wrapper = self.connect({'pragmas': {'journal_mode': 'WAL'}})
+        other = self.connect({'pragmas': {'busy_timeout': 0}})
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE "t" ("id" integer)')
+
+        wrapper._start_transaction_under_autocommit()
+        wrapper.cursor().execute('SELECT * FROM "t"')
+        with other.cursor() as cursor:
+            cursor.execute('INSERT INTO "t" VALUES (1)')
+        wrapper.connection.rollback()
+
+        with wrapper.immediate():
+            wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+
+        with self.assertRaisesMessage(OperationalError, 'locked'):
+            with other.cursor() as cursor:
+                cursor.execute('INSERT INTO "t" VALUES (2)')
+
+    def test_lock_metrics(self):
+
+        wrapper = self.connect({'transaction_mode': 'immediate'})
+        other = self.connect({'pragmas': {'busy_timeout': 0}})
+        busy_errors = metrics.layout.offsets['sqlite_busy_errors_total', '']
+        lock_waits = metrics.layout.offsets['sqlite_lock_wait_seconds', '']
+        count = lock_waits + len(BUCKETS) + 2
+        before = metrics.collect()
+
+        wrapper._start_transaction_under_autocommit()
+        self.addCleanup(wrapper.connection.rollback)
+
+        with self.assertRaises(OperationalError):
+            with other.cursor() as cursor:
+                cursor.execute('CREATE TABLE "t" ("id" integer)')
+
+        after = metrics.collect()
+        self.assertEqual(after[busy_errors] - before[busy_errors], 1)
+        self.assertEqual(after[count] - before[count], 1)
+
+    def test_transaction_mode_invalid(self):
+
+        wrapper = self.connect({'transaction_mode': 'LATER'})
+
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.transaction_mode
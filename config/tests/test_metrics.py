@@ -0,0 +1,242 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from config.metrics import BUCKETS, HEADER, Metrics, metrics
+from apps.match.models import Match, MatchSeatInfo
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+def value(source, name, label=''):
+    return source.collect()[source.layout.offsets[name, label]]
+
+
+class TestMetrics(SimpleTestCase):
+
+    def setUp(self):
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'metrics.mmap')
+
+        settings = override_settings(
+            METRICS={
+                'PATH': self.path,
+                'SLOTS': 4,
+                'TOKEN': None,
+                'PUBLIC': True,
+            },
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_processes_are_added_up(self):
+        """
+        Counters of a process which exited are still counted, its gauges
+        aren't.
+        """
+
+        parent = Metrics()
+        parent.inc('match_seats_reserved_total', 2)
+        parent.inc('http_requests_in_flight')
+
+        pid = os.fork()
+        if pid == 0:
+            child = Metrics()
+            child.inc('match_seats_reserved_total', 3)
+            child.inc('http_requests_in_flight')
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        self.assertEqual(value(parent, 'match_seats_reserved_total'), 5)
+        self.assertEqual(value(parent, 'http_requests_in_flight'), 1)
+
+    def test_slot_of_dead_process_is_taken_over(self):
+
+        pid = os.fork()
+        if pid == 0:
+            Metrics().inc('match_seats_paid_total', 4)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        for _ in range(3):
+            pid = os.fork()
+            if pid == 0:
+                Metrics().inc('match_seats_paid_total')
+                os._exit(0)
+            os.waitpid(pid, 0)
+
+        current = Metrics()
+        current.inc('match_seats_paid_total')
+
+        self.assertEqual(value(current, 'match_seats_paid_total'), 8)
+
+    def test_file_is_replaced_when_metrics_change(self):
+
+        with open(self.path, 'wb') as file:
+            file.write(b'\0' * HEADER.size)
+
+        current = Metrics()
+        current.inc('match_seats_released_total')
+
+        self.assertEqual(value(current, 'match_seats_released_total'), 1)
+        self.assertEqual(
+            os.path.getsize(self.path),
+            HEADER.size + 4 * current.layout.size * 8,
+        )
+
+    def test_render(self):
+
+        current = Metrics()
+        current.observe('sqlite_lock_wait_seconds', 0.001)
+        current.observe('sqlite_lock_wait_seconds', 0.2)
+        current.observe('sqlite_lock_wait_seconds', 60)
+
+        text = current.render()
+
+        self.assertIn('# TYPE sqlite_lock_wait_seconds histogram\n', text)
+        self.assertIn('sqlite_lock_wait_seconds_bucket{le="0.005"} 1\n', text)
+        self.assertIn('sqlite_lock_wait_seconds_bucket{le="0.25"} 2\n', text)
+        self.assertIn(
+            f'sqlite_lock_wait_seconds_bucket{{le="{BUCKETS[-1]}"}} 2\n',
+            text,
+        )
+        self.assertIn('sqlite_lock_wait_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn('sqlite_lock_wait_seconds_sum 60.201\n', text)
+        self.assertIn('sqlite_lock_wait_seconds_count 3\n', text)
+        self.assertIn('match_seats_reserved_total 0\n', text)
+        self.assertIn('db_connections_open{alias="default"} 0\n', text)
+
+
+class TestMetricsView(TestCase):
+
+    def setUp(self):
+
+        self.url = reverse('metrics')
+
+    def test_metrics_view(self):
+
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8',
+        )
+        self.assertIn(
+            'http_request_duration_seconds_count{url_name="metrics"} ',
+            response.content.decode(),
+        )
+
+    def test_metrics_view_invalid(self):
+        """
+        This method checks if the token is asked for when it's set.
+        """
+
+        with self.settings(METRICS={**settings.METRICS, 'TOKEN': 'secret'}):
+
+            self.assertEqual(self.client.get(self.url).status_code, 401)
+            self.assertEqual(
+                self.client.get(
+                    self.url,
+                    HTTP_AUTHORIZATION='Bearer wrong',
+                ).status_code,
+                401,
+            )
+            self.assertEqual(
+                self.client.get(
+                    self.url,
+                    HTTP_AUTHORIZATION='Bearer secret',
+                ).status_code,
+                200,
+            )
+
+    def test_metrics_view_not_public(self):
+        """
+        This method checks if metrics aren't served to anyone without a
+        token when they aren't public, as in production.
+        """
+
+        with self.settings(
+            METRICS={**settings.METRICS, 'TOKEN': None, 'PUBLIC': False},
+        ):
+            self.assertEqual(self.client.get(self.url).status_code, 401)
+            self.assertEqual(
+                self.client.get(
+                    self.url,
+                    HTTP_AUTHORIZATION='Bearer None',
+                ).status_code,
+                401,
+            )
+
+
+class TestBookingCounters(TestCase):
+
+    def setUp(self):
+
+        stadium = Stadium.objects.create(name='Azadi')
+        self.user = User.objects.create_user(
+            email='test@test.com',
+            password='admin12345QQ!!',
+        )
+        self.now = timezone.now()
+        self.match = Match.objects.create(
+            stadium=stadium,
+            host_team=Team.objects.create(name='Esteghlal'),
+            guest_team=Team.objects.create(name='Piroozi'),
+            datetime=self.now,
+        )
+        self.seats = [
+            Seat.objects.create(stadium=stadium, code=f'A{number}').pk
+            for number in range(3)
+        ]
+        MatchSeatInfo.objects.bulk_create(
+            MatchSeatInfo(match=self.match, seat_id=seat, price=4500)
+            for seat in self.seats
+        )
+
+    def counts(self):
+
+        return [
+            value(metrics, name) for name in (
+                'match_seats_reserved_total',
+                'match_reservation_conflicts_total',
+                'match_seats_paid_total',
+                'match_seats_released_total',
+            )
+        ]
+
+    def test_counters(self):
+
+        before = self.counts()
+        objects = MatchSeatInfo.objects
+
+        for seats in (self.seats[:2], self.seats[1:]):
+            with self.captureOnCommitCallbacks(execute=True):
+                objects.reserve(
+                    match_id=self.match.pk,
+                    seats=seats,
+                    buyer_id=self.user.pk,
+                    now=self.now,
+                )
+        with self.captureOnCommitCallbacks(execute=True):
+            objects.confirm(self.match.pk, self.user.pk, self.now)
+
+        objects.filter(seat_id=self.seats[0]).update(is_paid=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            objects.release_expired(self.now + timedelta(days=1), 10)
+
+        self.assertEqual(
+            [after - start for after, start in zip(self.counts(), before)],
+            [2, 1, 2, 1],
+        )
@@ -0,0 +1,189 @@
+from datetime import timedelta
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from rest_framework.serializers import IntegerField, Serializer
+from rest_framework.test import APIClient
+
+from config.metrics import metrics
+from config.profiling import (
+    Profile,
+    ProfiledSerializerMixin,
+    ProfilingMiddleware,
+    _current,
+)
+from apps.match.models import Match
+from apps.stadium.models import Stadium
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+PROFILING = {'ENABLED': True, 'SAMPLE_RATE': 1}
+
+SERVER_TIMING = (
+    r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries, '
+    r'0 duplicates, 0 similar", serializer;dur=[\d.]+$'
+)
+
+
+class TestProfile(TestCase):
+
+    def test_duplicate_and_similar_queries(self):
+
+        profile = Profile()
+
+        with connection.execute_wrapper(profile):
+            with connection.cursor() as cursor:
+                for value in (1, 2, 1, 1):
+                    cursor.execute('SELECT %s', [value])
+                cursor.execute('SELECT 3')
+
+        self.assertEqual(profile.queries, 5)
+        self.assertEqual(profile.duplicates, 2)
+        self.assertEqual(profile.similar, 1)
+        self.assertGreater(profile.db, 0)
+        self.assertIn(
+            '5 queries, 2 duplicates, 1 similar',
+            profile.server_timing(),
+        )
+
+
+class TestProfiledSerializerMixin(SimpleTestCase):
+
+    class PlainSerializer(Serializer):
+        value = IntegerField()
+
+    class ProfiledSerializer(ProfiledSerializerMixin, PlainSerializer):
+        pass
+
+    def test_timing(self):
+
+        profile = Profile()
+        token = _current.set(profile)
+        self.addCleanup(_current.reset, token)
+
+        serializer = self.PlainSerializer(data={'value': 1})
+        serializer.is_valid()
+        self.assertEqual(serializer.data, {'value': 1})
+        self.assertEqual(profile.serializer, 0)
+
+        serializer = self.ProfiledSerializer(
+            data=[{'value': 1}, {'value': 2}],
+            many=True,
+        )
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.data, [{'value': 1}, {'value': 2}])
+        self.assertGreater(profile.serializer, 0)
+        self.assertFalse(profile.in_serializer)
+
+    def test_not_profiled(self):
+        """
+        This method checks if serializers work as usual outside profiled
+        requests.
+        """
+
+        serializer = self.ProfiledSerializer(data={'value': 'x'})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('value', serializer.errors)
+        self.assertEqual(
+            self.ProfiledSerializer({'value': 1}).data,
+            {'value': 1},
+        )
+
+
+@override_settings(PROFILING=PROFILING)
+class TestProfilingMiddleware(TestCase):
+
+    def setUp(self):
+
+        stadium = Stadium.objects.create(name='Azadi')
+        for number in range(3):
+            Match.objects.create(
+                stadium=stadium,
+                host_team=Team.objects.create(name=f'Host {number}'),
+                guest_team=Team.objects.create(name=f'Guest {number}'),
+                datetime=timezone.now() + timedelta(days=number),
+            )
+
+        self.url = reverse('match:api_list_match')
+
+    def profiled(self, name):
+
+        offset = metrics.layout.offsets[name, 'api_list_match']
+
+        return metrics.collect()[offset]
+
+    def test_metrics(self):
+
+        names = (
+            'profiled_requests_total',
+            'profiled_db_queries_total',
+            'profiled_db_duplicate_queries_total',
+        )
+        before = [self.profiled(name) for name in names]
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [self.profiled(name) - old for name, old in zip(names, before)],
+            [1, 2, 0],
+        )
+        self.assertGreater(
+            self.profiled('profiled_serializer_seconds_total'),
+            0,
+        )
+
+    def test_server_timing_of_staff(self):
+
+        client = APIClient()
+        client.force_authenticate(
+            User.objects.create_user(
+                email='test@test.com',
+                password='admin12345QQ!!',
+                is_staff=True,
+            )
+        )
+
+        response = client.get(self.url)
+
+        self.assertRegex(response['Server-Timing'], SERVER_TIMING)
+
+    def test_server_timing_of_others(self):
+        """
+        This method checks if users which aren't staff don't get the
+        Server-Timing header, unless DEBUG is on.
+        """
+
+        response = self.client.get(self.url)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        with self.settings(DEBUG=True):
+            response = self.client.get(self.url)
+
+        self.assertRegex(response['Server-Timing'], SERVER_TIMING)
+
+    @override_settings(PROFILING={**PROFILING, 'SAMPLE_RATE': 0})
+    def test_not_sampled(self):
+
+        before = self.profiled('profiled_requests_total')
+
+        with self.settings(DEBUG=True):
+            response = self.client.get(self.url)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(self.profiled('profiled_requests_total'), before)
+
+    @override_settings(PROFILING={**PROFILING, 'ENABLED': False})
+    def test_disabled(self):
+
+        with self.assertRaises(MiddlewareNotUsed):
+            ProfilingMiddleware(lambda request: None)
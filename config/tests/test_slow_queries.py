@@ -0,0 +1,205 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APIClient
+
+from config.slow_queries import (
+    JsonLinesFile,
+    SlowQueryLog,
+    SlowQueryMiddleware,
+    fingerprint,
+    normalize,
+)
+from apps.match.models import Match
+from apps.stadium.models import Stadium, Seat
+from apps.team.models import Team
+
+User = get_user_model()
+
+
+def slow_queries(path, **options):
+
+    return {
+        'ENABLED': True,
+        'THRESHOLD': 0,
+        'EXPLAIN_RATE': 1,
+        'PATH': path,
+        'MAX_BYTES': 1024 * 1024,
+        'BACKUP_COUNT': 2,
+        **options,
+    }
+
+
+class TestNormalize(SimpleTestCase):
+
+    def test_values_are_taken_out(self):
+
+        self.assertEqual(
+            normalize(
+                'SELECT "id" FROM "match_match"\n  WHERE "code" = \'it\'\'s\' '
+                'AND "id" IN (%s, %s, %s) AND "price" > 10.5 LIMIT 21'
+            ),
+            'SELECT "id" FROM "match_match" WHERE "code" = ? '
+            'AND "id" IN (...) AND "price" > ? LIMIT ?',
+        )
+        self.assertEqual(
+            normalize('INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)'),
+            'INSERT INTO "t" ("a", "b") VALUES (%s, %s), ...',
+        )
+
+    def test_fingerprint(self):
+
+        self.assertEqual(
+            fingerprint('SELECT * FROM "t" WHERE "id" IN (%s, %s)'),
+            fingerprint('SELECT * FROM "t"  WHERE "id" IN (%s)'),
+        )
+        self.assertNotEqual(
+            fingerprint('SELECT * FROM "t1"'),
+            fingerprint('SELECT * FROM "t2"'),
+        )
+
+
+class TestJsonLinesFile(SimpleTestCase):
+
+    def test_rotation(self):
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'log.jsonl')
+
+        file = JsonLinesFile(path, max_bytes=100, backup_count=2)
+        for number in range(10):
+            file.write({'number': number, 'text': 'x' * 20})
+
+        self.assertEqual(
+            file.paths(),
+            [f'{path}.2', f'{path}.1', path],
+        )
+        for name in file.paths():
+            self.assertLessEqual(os.path.getsize(name), 100)
+
+        # Records of the oldest backup are dropped, the others are in order.
+        numbers = [record['number'] for record in file.read()]
+        self.assertEqual(numbers, list(range(10 - len(numbers), 10)))
+
+
+class TestSlowQueryLog(TestCase):
+
+    def setUp(self):
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow_queries.jsonl')
+
+    def read(self):
+        return list(JsonLinesFile(self.path, 1024 * 1024, 2).read())
+
+    def test_threshold(self):
+
+        with override_settings(SLOW_QUERIES=slow_queries(self.path)):
+            log = SlowQueryLog()
+        with override_settings(
+            SLOW_QUERIES=slow_queries(self.path, THRESHOLD=60),
+        ):
+            fast_log = SlowQueryLog()
+
+        with connection.execute_wrapper(log):
+            with connection.execute_wrapper(fast_log):
+                Stadium.objects.filter(name='Azadi').exists()
+
+        records = self.read()
+        self.assertEqual(len(records), 1)
+        self.assertIn('"stadium_stadium"', records[0]['sql'])
+        self.assertNotIn('Azadi', str(records[0]))
+        self.assertTrue(records[0]['plan'])
+        self.assertIsNone(records[0]['view'])
+
+    def test_failed_statement(self):
+        """
+        This method checks if a statement which fails is logged with its
+        error and isn't explained.
+        """
+
+        with override_settings(SLOW_QUERIES=slow_queries(self.path)):
+            log = SlowQueryLog()
+
+        with self.assertRaises(Exception):
+            with connection.execute_wrapper(log):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT * FROM "nowhere"')
+
+        record, = self.read()
+        self.assertIn('nowhere', record['error'])
+        self.assertNotIn('plan', record)
+
+
+class TestSlowQueryMiddleware(TestCase):
+
+    def setUp(self):
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'slow_queries.jsonl')
+
+        settings = override_settings(SLOW_QUERIES=slow_queries(self.path))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        stadium = Stadium.objects.create(name='Azadi')
+        Seat.objects.create(stadium=stadium, code='n1', section='A')
+        self.match = Match.objects.create(
+            stadium=stadium,
+            host_team=Team.objects.create(name='Esteghlal'),
+            guest_team=Team.objects.create(name='Piroozi'),
+            datetime=timezone.now() + timedelta(days=1),
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_user(
+                email='test@test.com',
+                password='admin12345QQ!!',
+                is_staff=True,
+            )
+        )
+
+    def test_origin_and_view(self):
+
+        response = self.client.post(
+            reverse('match:api_create_list_match_seat'),
+            data={'match': self.match.pk, 'price': 100, 'section': 'A'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, 201)
+
+        records = list(JsonLinesFile(self.path, 1024 * 1024, 2).read())
+        validation = [
+            record for record in records
+            if any('validate_match' in frame for frame in record['origin'])
+        ]
+
+        self.assertEqual(len(validation), 1)
+        record = validation[0]
+        self.assertEqual(record['view'], 'match:api_create_list_match_seat')
+        self.assertEqual(record['method'], 'POST')
+        self.assertRegex(
+            record['origin'][0],
+            r'^apps/match/serializers\.py:\d+ validate_match$',
+        )
+        self.assertTrue(record['plan'])
+        self.assertNotIn('plan_error', record)
+
+    @override_settings(SLOW_QUERIES={'ENABLED': False})
+    def test_disabled(self):
+
+        with self.assertRaises(MiddlewareNotUsed):
+            SlowQueryMiddleware(lambda request: None)
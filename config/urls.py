@@ -22,12 +22,15 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from config.metrics import metrics_view
+
 
 urlpatterns = (
     path('admin/', admin.site.urls),
     path('accounts/', include('apps.accounts.urls')),
     path('stadiums/', include('apps.stadium.urls')),
     path('matches/', include('apps.match.urls')),
+    path('metrics', metrics_view, name='metrics'),
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     # Optional UI: